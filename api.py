@@ -1,34 +1,99 @@
 
+# Serve requests from the eventlet server when it is installed; strip I/O is
+# kept off the event loop by the hardware worker
+try:
+    import eventlet
+    eventlet.monkey_patch()
+except ImportError:
+    pass
+
+import argparse
+import atexit
+import time
+
+# Startup is timed from here, before the app and its state are loaded
+started = time.monotonic()
+
 from src import create_app
 from flask import Flask ,current_app
-from rpi_ws281x import PixelStrip, ws
 from flask_socketio import SocketIO
 from src.socket import socketio
+from src.renderer import Renderer
+from src.hardware_worker import HardwareWorker
+from src.channels import led_channels, StripGroup
+from src.backends import create_strip
+from src.util.restore_framebuffer import restore_framebuffer
+from src.color_correction import ColorCorrection
 
-app = create_app()
+app = create_app({'FRAMEBUFFER_SNAPSHOT': 'framebuffer.snapshot'})
 
 
-def initialize_led_strip():
-    # Access the configuration from current_app.config
-    led_counts = current_app.config['LED_COUNTS']
-    led_pin = current_app.config['LED_PIN']
-    led_freqs = current_app.config['LED_FREQS']
-    led_dmas = current_app.config['LED_DMAS']
-    led_invert = current_app.config['LED_INVERT']
-    led_brightness = current_app.config['LED_BRIGHTNESSES']
-    led_channel = current_app.config['LED_CHANNEL']
-    led_strip_types = getattr(ws, current_app.config['LED_STRIP_TYPES'])
+def initialize_led_strips():
+    # One strip per output channel, each described by the configuration
+    strips = []
+    for channel in led_channels(current_app.config):
+        strip = create_strip(channel, current_app.config)
+        strip.begin()
+        strips.append(strip)
+    return strips
 
-    # Initialize the LED strip
-    strip = PixelStrip(led_counts, led_pin, led_freqs, led_dmas, led_invert, led_brightness, led_channel, led_strip_types)
-    strip.begin()
-    return strip
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve the LED controller.")
+    parser.add_argument('--role', choices=['all', 'renderer', 'api'], default='all',
+                        help="'renderer' only drives the strips and persists pixel state, 'api' only serves requests; "
+                             "both need FRAMEBUFFER_SHARED so that several API processes can feed one renderer")
+    parser.add_argument('--port', type=int, default=5000)
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
-    with app.app_context():
-        app.strip = initialize_led_strip()
-        app.pixel_states = [{'red': 0, 'green': 0, 'blue': 0, 'brightness': 0} for _ in range(app.strip.numPixels())]
+    args = parse_args()
+    if args.role != 'all' and not app.framebuffer.shared:
+        raise SystemExit("--role " + args.role + " needs FRAMEBUFFER_SHARED to be set")
+    if args.role != 'all' and not app.config['SOCKETIO_MESSAGE_QUEUE']:
+        raise SystemExit("--role " + args.role + " needs SOCKETIO_MESSAGE_QUEUE so the renderer process can broadcast to API clients")
+
+    if args.role in ('all', 'renderer'):
+        with app.app_context():
+            # Bring back the pixels shown before the restart; the renderer pushes them in its first frame
+            restore_started = time.monotonic()
+            restored_from = restore_framebuffer(app.framebuffer, app.snapshot)
+            restore_time = time.monotonic() - restore_started
+
+            strips = initialize_led_strips()
+            channels = led_channels(app.config)
+            app.strip = StripGroup(strips, [channel['count'] for channel in channels])
+
+            # Each channel gets its own worker, so the strips are shown in parallel
+            app.hardware = [
+                HardwareWorker(strip, app.config['HARDWARE_QUEUE_SIZE'], channel['offset'], channel['count'], ColorCorrection(channel['gamma']))
+                for strip, channel in zip(strips, channels)
+            ]
+            for worker in app.hardware:
+                worker.start()
+            app.renderer = Renderer(app.strip, app.framebuffer, app.color_correction, app.config['LED_FRAME_RATE'], app.hardware)
+            app.renderer.sources.append(app.frame_stream.apply)
+            app.renderer.sources.append(app.effects.tick)
+            app.renderer.sources.append(app.broadcaster.flush)
+            app.renderer.start()
+            app.persister.start()
+            app.compactor.start()
+
+        app.logger.info("Started in {:.1f} ms; pixels restored from {} in {:.1f} ms".format(
+            (time.monotonic() - started) * 1000, restored_from or 'nowhere', restore_time * 1000))
+
+        # Flush pending pixel state to the database on shutdown
+        atexit.register(app.persister.stop)
+
+    if app.renderer is None:
+        # Effects started in this process are drawn into the shared framebuffer on its own clock
+        app.effects.start_loop()
+
+    if args.role == 'renderer':
+        # No web server in this process; keep the background tasks running
+        while True:
+            socketio.sleep(1)
 
     # Run the Flask app
-    socketio.run(app,debug=True, host='0.0.0.0')
+    socketio.run(app,debug=True, host='0.0.0.0', port=args.port)
@@ -0,0 +1,127 @@
+# benchmarks/cases.py
+
+from itertools import cycle
+from src.database import db
+from src.models import Entity
+from src.socket import socketio
+from src.endpoints.color import colorWipe, saveStateToDatabase
+from src.util.has_cyclic_relationship import has_cyclic_relationship
+from src.util.update_light_state_for_entity_and_children import update_light_state_for_entity_and_children
+
+# Benchmark functions by name, in the order they run
+CASES = {}
+
+# Colors cycled through so no call is skipped as "already set"
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+
+
+def case(name):
+    """
+    Register a benchmark.
+
+    A benchmark is called once per configuration with the app and the
+    Fixture describing its entities, and returns the function to time.
+    """
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+class Fixture:
+    """
+    Entities for one benchmark configuration.
+
+    The root entity spans the whole strip. The other entities form chains
+    of up to depth entities below it, each chain covering its own slice of
+    the strip, so the hierarchy is exactly depth + 1 levels deep.
+    """
+
+    def __init__(self, num_pixels, num_entities, depth):
+        self.root_id = 1
+        self.leaf_id = 1
+        chains = max(1, -(-(num_entities - 1) // depth))
+        width = max(1, num_pixels // chains)
+
+        entities = [Entity(id=1, name="root", start_addr=0, end_addr=num_pixels - 1, parent_id=None)]
+        for index in range(num_entities - 1):
+            chain, level = divmod(index, depth)
+            start = min(chain * width, num_pixels - 1)
+            entity_id = index + 2
+            entities.append(Entity(id=entity_id, name="entity " + str(entity_id), start_addr=start,
+                                   end_addr=min(start + width, num_pixels) - 1,
+                                   parent_id=self.root_id if level == 0 else entity_id - 1))
+            if chain == 0:
+                self.leaf_id = entity_id
+
+        db.session.add_all(entities)
+        db.session.commit()
+
+
+@case('colorWipe')
+def color_wipe(app, fixture):
+    colors = cycle(COLORS)
+    def run():
+        red, green, blue = next(colors)
+        colorWipe(app.strip, (red << 16) | (green << 8) | blue, 100, 0, len(app.framebuffer) - 1)
+    return run
+
+
+@case('saveStateToDatabase')
+def save_state_to_database(app, fixture):
+    colors = cycle(COLORS)
+    def run():
+        app.framebuffer.set_range(0, len(app.framebuffer) - 1, *next(colors), 100)
+        saveStateToDatabase()
+    return run
+
+
+@case('POST /color/')
+def post_color(app, fixture):
+    client = app.test_client()
+    colors = cycle(COLORS)
+    def run():
+        red, green, blue = next(colors)
+        response = client.post('/color/', json={'entity': fixture.root_id, 'red': red, 'green': green, 'blue': blue,
+                                                'brightness': 100, 'is_on': True})
+        assert response.status_code == 200, response.json
+    return run
+
+
+@case('socket set_color')
+def socket_set_color(app, fixture):
+    socket_client = socketio.test_client(app, namespace='/ws-color')
+    colors = cycle(COLORS)
+    def run():
+        red, green, blue = next(colors)
+        socket_client.emit('set_color', {'entity': fixture.root_id, 'red': red, 'green': green, 'blue': blue,
+                                         'brightness': 100, 'is_on': True}, namespace='/ws-color')
+        received = socket_client.get_received('/ws-color')
+        assert received[-1]['name'] == 'success', received
+    return run
+
+
+@case('GET /entity/')
+def get_entities(app, fixture):
+    client = app.test_client()
+    def run():
+        response = client.get('/entity/')
+        assert response.status_code == 200
+    return run
+
+
+@case('has_cyclic_relationship')
+def cyclic_relationship(app, fixture):
+    def run():
+        # Walks the deepest chain all the way up to the root
+        has_cyclic_relationship(-1, fixture.leaf_id)
+    return run
+
+
+@case('update_light_state_for_entity_and_children')
+def update_light_state(app, fixture):
+    colors = cycle(COLORS)
+    def run():
+        update_light_state_for_entity_and_children(fixture.root_id, *next(colors), 100, True)
+        db.session.commit()
+    return run
@@ -0,0 +1,169 @@
+# benchmarks/run.py
+"""
+Benchmarks for the color and entity hot paths.
+
+Every benchmark in benchmarks/cases.py runs against a fresh app and database
+for each combination of strip length, entity count and hierarchy depth, on
+simulated strips. Results are written as JSON and, given a baseline from an
+earlier run, compared against it; the exit status is 1 if any benchmark got
+slower than the baseline by more than the tolerance.
+
+Usage, from the repository root:
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from src import create_app
+from src.database import db
+from src.channels import led_channels
+from src.backends import create_strip
+from .cases import CASES, Fixture
+
+
+def result_key(result):
+    return (result['benchmark'], result['pixels'], result['entities'], result['depth'])
+
+
+def measure(run, repeat):
+    """
+    Time repeat calls of a function after one untimed warm-up call.
+
+    Returns:
+    dict: The minimum, median, mean and maximum time per call in milliseconds.
+    """
+    run()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'min_ms': min(timings),
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.mean(timings),
+        'max_ms': max(timings)
+    }
+
+
+def run_configuration(num_pixels, num_entities, depth, names, repeat, wire_time):
+    """
+    Run the named benchmarks against a fresh app for one configuration.
+
+    Returns:
+    list: One result dictionary per benchmark.
+    """
+    results = []
+    for name in names:
+        with tempfile.TemporaryDirectory() as directory:
+            app = create_app({
+                'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'benchmark.db'),
+                'FRAMEBUFFER_SNAPSHOT': os.path.join(directory, 'framebuffer.snapshot'),
+                'LED_COUNTS': num_pixels,
+                'LED_BACKEND': 'simulated',
+                'SIMULATED_STRIP_PIXEL_TIME': 30e-6 if wire_time else 0,
+                'SIMULATED_STRIP_RESET_TIME': 300e-6 if wire_time else 0
+            })
+            with app.app_context():
+                app.strip = create_strip(led_channels(app.config)[0], app.config)
+                fixture = Fixture(num_pixels, num_entities, depth)
+                timings = measure(CASES[name](app, fixture), repeat)
+                db.session.remove()
+                db.engine.dispose()
+                app.snapshot.close()
+
+        result = {'benchmark': name, 'pixels': num_pixels, 'entities': num_entities, 'depth': depth, 'repeat': repeat}
+        result.update(timings)
+        results.append(result)
+        print("{:<45} pixels={:<6} entities={:<5} depth={:<3} median={:.3f} ms".format(
+            name, num_pixels, num_entities, depth, timings['median_ms']), file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare median timings against a baseline.
+
+    Returns:
+    list: (result, baseline median, ratio) for each benchmark slower than the baseline
+          by more than the tolerance.
+    """
+    baseline_medians = {result_key(result): result['median_ms'] for result in baseline['results']}
+    regressions = []
+    for result in results:
+        baseline_median = baseline_medians.get(result_key(result))
+        if not baseline_median:
+            continue
+        ratio = result['median_ms'] / baseline_median
+        if ratio > 1 + tolerance:
+            regressions.append((result, baseline_median, ratio))
+    return regressions
+
+
+def integers(value):
+    return [int(item) for item in value.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the color and entity hot paths.")
+    parser.add_argument('--pixels', type=integers, default=[100, 1000, 10000], help="Strip lengths, comma separated")
+    parser.add_argument('--entities', type=integers, default=[10, 100, 1000], help="Entity counts, comma separated")
+    parser.add_argument('--depth', type=integers, default=[1, 4, 16], help="Hierarchy depths, comma separated")
+    parser.add_argument('--benchmark', action='append', choices=list(CASES), help="Only run these benchmarks")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed calls per benchmark")
+    parser.add_argument('--wire-time', action='store_true', help="Model the ws281x wire time in show()")
+    parser.add_argument('--output', help="Write the results to this JSON file instead of stdout")
+    parser.add_argument('--baseline', help="Compare against the results in this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument('--save-baseline', help="Also write the results to this JSON file as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = []
+    for num_pixels, num_entities, depth in itertools.product(args.pixels, args.entities, args.depth):
+        if depth >= num_entities:
+            continue
+        results.extend(run_configuration(num_pixels, num_entities, depth, args.benchmark or list(CASES),
+                                         args.repeat, args.wire_time))
+
+    report = {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'wire_time': args.wire_time
+        },
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            file.write(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for result, baseline_median, ratio in regressions:
+            print("REGRESSION {} pixels={} entities={} depth={}: {:.3f} ms vs {:.3f} ms baseline ({:.0%})".format(
+                result['benchmark'], result['pixels'], result['entities'], result['depth'],
+                result['median_ms'], baseline_median, ratio), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,26 +1,92 @@
 # src/__init__.py
 
+import os
 from flask import Flask ,current_app
-from rpi_ws281x import PixelStrip, ws
 from flask_sqlalchemy import SQLAlchemy
 from .config import Config
 from .endpoints.entity import entity_bp
 from .endpoints.color import color_bp
+from .endpoints.scene import scene_bp
+from .endpoints.effect import effect_bp
 from .database import db
 from .socket import socketio
+from .framebuffer import FrameBuffer
+from .shared_framebuffer import SharedFrameBuffer
+from .color_correction import ColorCorrection
+from .persistence import AddressPersister
+from .compaction import HistoryCompactor
+from .entity_index import entity_index
+from .compositor import Compositor
+from .effects import EffectEngine
+from .frame_stream import FrameStream
+from .broadcast import DeltaBroadcaster, SharedDeltaLog
+from .channels import led_channels
+from .snapshot import FramebufferSnapshot
 
 
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     app.config.from_object(Config)
-    socketio.init_app(app)
+    # Settings overriding Config, e.g. a different database for benchmarks
+    if config:
+        app.config.update(config)
+    socketio.init_app(app, message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'])
     app.register_blueprint(entity_bp, url_prefix='')
     app.register_blueprint(color_bp, url_prefix='')
+    app.register_blueprint(scene_bp, url_prefix='')
+    app.register_blueprint(effect_bp, url_prefix='')
 
     db.init_app(app)
 
+    # In-memory pixel state shared by all endpoints, spanning every output channel
+    channels = led_channels(app.config)
+    num_pixels = sum(channel['count'] for channel in channels)
+    if app.config['FRAMEBUFFER_SHARED']:
+        # Shared with the other API processes and the renderer process
+        app.framebuffer = SharedFrameBuffer(app.config['FRAMEBUFFER_SHARED'], num_pixels)
+    else:
+        app.framebuffer = FrameBuffer(num_pixels)
+    app.color_correction = ColorCorrection(channels[0]['gamma'])
+
+    # Set once the strip is initialized; until then colorWipe renders inline
+    app.renderer = None
+
+    # Raw frames streamed over /ws-color, applied by the renderer once per frame
+    app.frame_stream = FrameStream(app)
+
+    # Entity light state changes are broadcast to /ws-color subscribers once per frame;
+    # processes sharing the framebuffer share the log of changes next to it
+    log = None
+    if app.framebuffer.shared:
+        log = SharedDeltaLog(app.config['FRAMEBUFFER_SHARED'] + '.deltas', app.config['BROADCAST_SHARED_RECORDS'])
+    app.broadcaster = DeltaBroadcaster(app, app.config['BROADCAST_HISTORY'], log)
+
+    # Pixel state is also kept in a memory-mapped snapshot, restored first on startup
+    snapshot_path = app.config['FRAMEBUFFER_SNAPSHOT']
+    app.snapshot = FramebufferSnapshot(os.path.join(app.instance_path, snapshot_path), len(app.framebuffer)) if snapshot_path else None
+
+    # Pixel state is written to the Address table behind the request path
+    app.persister = AddressPersister(app, app.config['ADDRESS_FLUSH_INTERVAL'])
+
+    # LightState history is pruned and downsampled in the background
+    app.compactor = HistoryCompactor(app, app.config['LIGHT_STATE_COMPACTION_INTERVAL'])
+
     with app.app_context():
         db.create_all()
+
+    # Serialized entity responses, reused until the state version changes
+    app.response_cache = {}
+
+    # Entities are resolved from memory on the color path
+    entity_index.init_app(app)
+
+    # Entity light states are layered into the framebuffer by hierarchy depth
+    app.compositor = Compositor(app)
+    with app.app_context():
+        app.compositor.load()
+
+    # Animated effects, drawn on the frame clock over entity ranges
+    app.effects = EffectEngine(app, app.config['LED_FRAME_RATE'])
         
     return app
\ No newline at end of file
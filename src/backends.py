@@ -0,0 +1,131 @@
+# src/backends.py
+
+import struct
+import time
+from array import array
+from collections import deque
+
+
+class SimulatedStrip:
+    """
+    Stand-in for a ws281x strip that needs no hardware.
+
+    Implements the subset of the rpi_ws281x PixelStrip interface the app
+    uses. show() takes as long as pushing the frame down the wire would:
+    pixel_time per pixel (24 bits at 800 kHz is 30 us) plus the reset time
+    that latches it. The frames shown are recorded in memory, the most
+    recent max_frames of them, and optionally appended to a dump file that
+    load_frames() reads back.
+    """
+
+    def __init__(self, num_pixels, pixel_time=30e-6, reset_time=300e-6, max_frames=100, dump_path=None):
+        self.num_pixels = num_pixels
+        self.pixel_time = pixel_time
+        self.reset_time = reset_time
+        self.brightness = 255
+        self.frames = deque(maxlen=max_frames)
+        self.shown = 0
+        self.dump_path = dump_path
+        self._pixels = array('I', bytes(num_pixels * 4))
+        self._dump = None
+
+    def begin(self):
+        if self.dump_path is not None and self._dump is None:
+            self._dump = open(self.dump_path, 'ab')
+
+    def numPixels(self):
+        return self.num_pixels
+
+    def setPixelColor(self, n, color):
+        self._pixels[n] = color
+
+    def getPixelColor(self, n):
+        return self._pixels[n]
+
+    def setBrightness(self, brightness):
+        self.brightness = brightness
+
+    def getBrightness(self):
+        return self.brightness
+
+    def show(self):
+        """
+        Record the current frame and wait for as long as the wire transfer would take.
+        """
+        started = time.monotonic()
+        frame = self._pixels.tobytes()
+        self.frames.append((started, frame))
+        self.shown += 1
+        if self._dump is not None:
+            self._dump.write(struct.pack('<dI', started, self.num_pixels) + frame)
+            self._dump.flush()
+
+        remaining = started + self.num_pixels * self.pixel_time + self.reset_time - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def close(self):
+        if self._dump is not None:
+            self._dump.close()
+            self._dump = None
+
+
+def load_frames(path):
+    """
+    Read back the frames dumped by a SimulatedStrip.
+
+    Parameters:
+    path (str): The dump file.
+
+    Returns:
+    list: (timestamp, colors) pairs, colors being an array of packed 0xRRGGBB words.
+    """
+    frames = []
+    with open(path, 'rb') as dump:
+        while True:
+            header = dump.read(12)
+            if len(header) < 12:
+                return frames
+            timestamp, num_pixels = struct.unpack('<dI', header)
+            colors = array('I')
+            colors.frombytes(dump.read(num_pixels * 4))
+            frames.append((timestamp, colors))
+
+
+def ws281x_strip(channel, config):
+    # Imported here so the app runs without the hardware library installed
+    from rpi_ws281x import PixelStrip, ws
+    return PixelStrip(channel['count'], channel['pin'], channel['freq'], channel['dma'], channel['invert'],
+                      channel['brightness'], channel['channel'], getattr(ws, channel['strip_type']))
+
+
+def simulated_strip(channel, config):
+    dump_path = config['SIMULATED_STRIP_DUMP']
+    if dump_path is not None:
+        dump_path = dump_path.format(channel=channel['index'])
+    return SimulatedStrip(channel['count'], config['SIMULATED_STRIP_PIXEL_TIME'], config['SIMULATED_STRIP_RESET_TIME'],
+                          dump_path=dump_path)
+
+
+# Output backends by name; each builds the strip for one channel from (channel, config)
+BACKENDS = {
+    'ws281x': ws281x_strip,
+    'simulated': simulated_strip,
+}
+
+
+def create_strip(channel, config):
+    """
+    Build the strip for an output channel with the backend named by LED_BACKEND.
+
+    Parameters:
+    channel (dict): The channel, as described by led_channels.
+    config (dict): The application configuration.
+
+    Returns:
+    object: A strip implementing begin(), numPixels(), setPixelColor() and show().
+    """
+    backend = config['LED_BACKEND']
+    if backend not in BACKENDS:
+        raise ValueError("Unknown LED backend: " + str(backend))
+    return BACKENDS[backend](channel, config)
@@ -0,0 +1,271 @@
+# src/broadcast.py
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import uuid
+from collections import deque
+from .models import CurrentLightState
+from .socket import socketio
+from .shared_framebuffer import ProcessLock
+
+NAMESPACE = '/ws-color'
+ROOM = 'subscribers'
+
+MAGIC = b'LEDLOG\x00\x01'
+# magic, epoch, last sequence number, records appended, records sequenced, record capacity
+LOG_HEADER = struct.Struct('<8s8sQQQQ')
+# sequence number (0 until broadcast), entity ID, is_on, red, green, blue, brightness
+RECORD = struct.Struct('<QI5B3x')
+
+
+class SharedDeltaLog:
+    """
+    Light state changes of several processes, broadcast by one of them.
+
+    API processes sharing a framebuffer append the states they publish to a
+    ring of records in a memory-mapped file. The process running the renderer
+    is the only one that broadcasts: once per frame it gives every record
+    appended since its last frame the next sequence number and emits them as
+    one delta. The epoch and the sequence number live in the file, so every
+    process sees the same ones and any of them can answer a resuming client
+    from the records still in the ring.
+    """
+
+    def __init__(self, path, capacity):
+        self.path = path
+        self.capacity = capacity
+        self.size = LOG_HEADER.size + capacity * RECORD.size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != self.size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self.size)
+            self._map = mmap.mmap(self._fd, self.size)
+            magic, epoch, seq, head, sequenced, records = LOG_HEADER.unpack_from(self._map, 0)
+            if (magic, records) != (MAGIC, capacity):
+                self._map[:] = bytes(self.size)
+                self._reset()
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        self.lock = ProcessLock(self._fd, lambda: None, lambda: None)
+
+    def _reset(self):
+        # A new epoch tells resuming clients that earlier sequence numbers mean nothing any more
+        LOG_HEADER.pack_into(self._map, 0, MAGIC, uuid.uuid4().hex[:8].encode(), 0, 0, 0, self.capacity)
+
+    def _header(self):
+        magic, epoch, seq, head, sequenced, records = LOG_HEADER.unpack_from(self._map, 0)
+        return epoch.decode(), seq, head, sequenced
+
+    @property
+    def epoch(self):
+        return self._header()[0]
+
+    @property
+    def seq(self):
+        return self._header()[1]
+
+    def append(self, rows):
+        """
+        Append [entity_id, is_on, red, green, blue, brightness] rows to be broadcast with the next delta.
+        """
+        with self.lock:
+            epoch, seq, head, sequenced = self._header()
+            for row in rows:
+                RECORD.pack_into(self._map, LOG_HEADER.size + head % self.capacity * RECORD.size, 0, *row)
+                head += 1
+            LOG_HEADER.pack_into(self._map, 0, MAGIC, epoch.encode(), seq, head, sequenced, self.capacity)
+
+    def sequence(self):
+        """
+        Give the records appended since the last call the next sequence number.
+
+        Returns:
+        dict: The delta to broadcast, None if nothing was appended, or False if more was
+              appended than the ring holds, in which case a new epoch was started and
+              subscribers need a snapshot.
+        """
+        with self.lock:
+            epoch, seq, head, sequenced = self._header()
+            if head == sequenced:
+                return None
+            if head - sequenced > self.capacity:
+                self._reset()
+                return False
+
+            seq += 1
+            states = {}
+            for index in range(sequenced, head):
+                offset = LOG_HEADER.size + index % self.capacity * RECORD.size
+                record = RECORD.unpack_from(self._map, offset)
+                RECORD.pack_into(self._map, offset, seq, *record[1:])
+                states[record[1]] = record[1:]
+            LOG_HEADER.pack_into(self._map, 0, MAGIC, epoch.encode(), seq, head, head, self.capacity)
+        return _delta(epoch, seq, states)
+
+    def since(self, epoch, seq):
+        """
+        Return the deltas broadcast after a sequence number, rebuilt from the ring.
+
+        Returns:
+        list: The missed deltas in order, or None if they are no longer all in the ring.
+        """
+        with self.lock:
+            current_epoch, current_seq, head, sequenced = self._header()
+            if epoch != current_epoch or seq is None or seq > current_seq:
+                return None
+
+            deltas = {}
+            oldest = max(0, head - self.capacity)
+            if oldest > sequenced:
+                # Appends overran the ring; the next broadcast starts a new epoch
+                return None
+            for index in range(oldest, sequenced):
+                record = RECORD.unpack_from(self._map, LOG_HEADER.size + index % self.capacity * RECORD.size)
+                if index == oldest and oldest > 0 and record[0] > seq:
+                    # Records of the next delta the client needs were overwritten
+                    return None
+                if record[0] > seq:
+                    deltas.setdefault(record[0], {})[record[1]] = record[1:]
+        return [_delta(current_epoch, delta_seq, states) for delta_seq, states in sorted(deltas.items())]
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+def _delta(epoch, seq, states):
+    return {
+        'epoch': epoch,
+        'seq': seq,
+        'states': [[entity_id, bool(is_on), red, green, blue, brightness]
+                   for entity_id, is_on, red, green, blue, brightness in sorted(states.values())]
+    }
+
+
+class DeltaBroadcaster:
+    """
+    Broadcasts entity light state changes to subscribed Socket.IO clients.
+
+    Changes published during a frame are coalesced into a single 'delta'
+    event carrying a monotonically increasing sequence number and compact
+    [entity_id, is_on, red, green, blue, brightness] rows. Recent deltas are
+    kept so a reconnecting client can resume from the last sequence number
+    it saw; a client that is too far behind, or that saw a previous server
+    run (a different epoch), gets a full snapshot instead.
+
+    Processes sharing a framebuffer share a SharedDeltaLog instead: they
+    append what they publish to it, and only the process running the
+    renderer broadcasts, through the Socket.IO message queue so that the
+    subscribers of every process receive the deltas.
+    """
+
+    def __init__(self, app, history=256, log=None):
+        self.app = app
+        self.log = log
+        self._epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self.lock = threading.Lock()
+        self._pending = {}
+        self._history = deque(maxlen=history)
+
+    @property
+    def epoch(self):
+        return self.log.epoch if self.log is not None else self._epoch
+
+    @property
+    def seq(self):
+        return self.log.seq if self.log is not None else self._seq
+
+    def publish(self, entity_ids, red, green, blue, brightness, is_on):
+        """
+        Record the new light state of several entities for the next delta.
+        """
+        row = [bool(is_on), red, green, blue, int(brightness)]
+        with self.lock:
+            for entity_id in entity_ids:
+                self._pending[entity_id] = row
+
+    def flush(self):
+        """
+        Broadcast the changes published since the last flush as one delta.
+
+        With a shared log, the changes are appended to it, and they are only
+        broadcast when the process runs the renderer, along with those of the
+        other processes.
+
+        Returns:
+        dict: The delta that was broadcast, or None if nothing was broadcast.
+        """
+        if self.log is not None:
+            return self._flush_shared()
+
+        with self.lock:
+            if not self._pending:
+                return None
+            self._seq += 1
+            delta = {
+                'epoch': self._epoch,
+                'seq': self._seq,
+                'states': [[entity_id] + row for entity_id, row in sorted(self._pending.items())]
+            }
+            self._pending = {}
+            self._history.append(delta)
+
+        socketio.emit('delta', delta, namespace=NAMESPACE, to=ROOM)
+        return delta
+
+    def _flush_shared(self):
+        with self.lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            self.log.append([[entity_id] + row for entity_id, row in sorted(pending.items())])
+        if self.app.renderer is None:
+            return None
+
+        delta = self.log.sequence()
+        if delta is False:
+            # Changes were lost from the log; every subscriber starts over from the current states
+            with self.app.app_context():
+                socketio.emit('snapshot', self.snapshot(), namespace=NAMESPACE, to=ROOM)
+            return None
+        if delta is not None:
+            socketio.emit('delta', delta, namespace=NAMESPACE, to=ROOM)
+        return delta
+
+    def since(self, epoch, seq):
+        """
+        Return the deltas broadcast after a sequence number.
+
+        Returns:
+        list: The missed deltas in order, or None if they are no longer all available.
+        """
+        if self.log is not None:
+            return self.log.since(epoch, seq)
+
+        with self.lock:
+            if epoch != self._epoch or seq is None or seq > self._seq:
+                return None
+            missed = [delta for delta in self._history if delta['seq'] > seq]
+            if len(missed) != self._seq - seq:
+                return None
+            return missed
+
+    def snapshot(self):
+        """
+        Return the current light state of every entity with the sequence number it is current as of.
+        """
+        with self.lock:
+            epoch, seq = self.epoch, self.seq
+        states = CurrentLightState.query.order_by(CurrentLightState.entity_id).all()
+        return {
+            'epoch': epoch,
+            'seq': seq,
+            'states': [[state.entity_id, state.is_on, state.red, state.green, state.blue, state.brightness] for state in states]
+        }
@@ -0,0 +1,91 @@
+# src/channels.py
+
+import bisect
+
+# Config keys describing an output channel, by the name used for them in each channel
+CHANNEL_KEYS = {
+    'count': 'LED_COUNTS',
+    'pin': 'LED_PIN',
+    'freq': 'LED_FREQS',
+    'dma': 'LED_DMAS',
+    'invert': 'LED_INVERT',
+    'brightness': 'LED_BRIGHTNESSES',
+    'channel': 'LED_CHANNEL',
+    'strip_type': 'LED_STRIP_TYPES',
+    'gamma': 'LED_GAMMAS',
+}
+
+
+def led_channels(config):
+    """
+    Describe every LED output channel in the configuration.
+
+    Each LED_* setting holds either a single value, shared by every channel,
+    or a list with one value per channel. The channels are laid out one after
+    the other in a single global address space, in the order of LED_COUNTS.
+
+    Parameters:
+    config (dict): The application configuration.
+
+    Returns:
+    list: One dictionary per channel with the keys of CHANNEL_KEYS plus 'index', its position,
+          and 'offset', the global address of its first pixel.
+    """
+    counts = config['LED_COUNTS']
+    num_channels = len(counts) if isinstance(counts, (list, tuple)) else 1
+
+    channels = []
+    offset = 0
+    for index in range(num_channels):
+        channel = {'index': index, 'offset': offset}
+        for name, key in CHANNEL_KEYS.items():
+            value = config[key]
+            if isinstance(value, (list, tuple)):
+                if len(value) != num_channels:
+                    raise ValueError(key + " must have one value per channel")
+                value = value[index]
+            channel[name] = value
+        offset += channel['count']
+        channels.append(channel)
+    return channels
+
+
+def total_pixels(config):
+    """
+    Return the size of the global address space spanned by every channel.
+    """
+    return sum(channel['count'] for channel in led_channels(config))
+
+
+class StripGroup:
+    """
+    Several LED strips addressed as one.
+
+    Pixel addresses are global: they run through the strips in order, so an
+    entity range may span strips. Used where the app drives the strips
+    directly rather than through one HardwareWorker per channel.
+    """
+
+    def __init__(self, strips, counts):
+        self.strips = list(strips)
+        self.offsets = []
+        offset = 0
+        for count in counts:
+            self.offsets.append(offset)
+            offset += count
+        self.num_pixels = offset
+
+    def numPixels(self):
+        return self.num_pixels
+
+    def begin(self):
+        for strip in self.strips:
+            strip.begin()
+
+    def setPixelColor(self, n, color):
+        index = bisect.bisect_right(self.offsets, n) - 1
+        self.strips[index].setPixelColor(n - self.offsets[index], color)
+
+    def show(self):
+        for strip in self.strips:
+            strip.show()
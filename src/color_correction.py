@@ -0,0 +1,47 @@
+# src/color_correction.py
+
+import re
+
+# Matches runs of identical bytes, used to find spans of equal brightness
+_RUN = re.compile(rb'(.)\1*', re.DOTALL)
+
+
+class ColorCorrection:
+    """
+    Per-strip color correction applied in software before pixels reach the driver.
+
+    The hardware brightness of a ws281x strip is global, so per-pixel
+    brightness is applied here instead. One 256-entry translation table is
+    precomputed for every brightness level, combining the brightness scaling
+    with gamma correction, and applied to whole runs of pixels at once with
+    bytes.translate.
+    """
+
+    def __init__(self, gamma=1.0):
+        self.gamma = gamma
+        # Gamma correction alone, the table of full brightness
+        self.gamma_table = bytes(self._correct(value, 100) for value in range(256))
+        # Brightness is a percentage; anything above 100 is treated as full brightness
+        self.tables = [bytes(self._correct(value, level) for value in range(256)) for level in range(100)] + [self.gamma_table] * 156
+
+    def _correct(self, value, level):
+        return round(255 * ((value * level / 100) / 255) ** self.gamma)
+
+    def apply(self, pixels):
+        """
+        Correct a run of packed pixels (blue, green, red, brightness per pixel).
+
+        Parameters:
+        pixels (bytes-like): The packed pixels to correct.
+
+        Returns:
+        bytearray: The corrected pixels in the same layout, with the brightness byte cleared
+                   so every pixel reads as a plain 0x00RRGGBB word.
+        """
+        pixels = bytes(pixels)
+        corrected = bytearray(len(pixels))
+        for run in _RUN.finditer(pixels[3::4]):
+            start, end = run.start() * 4, run.end() * 4
+            corrected[start:end] = pixels[start:end].translate(self.tables[pixels[start + 3]])
+        corrected[3::4] = bytes(len(pixels) // 4)
+        return corrected
@@ -0,0 +1,51 @@
+# src/compaction.py
+
+from .database import db
+from .socket import socketio
+from .util.compact_light_state_history import compact_light_state_history
+
+
+class HistoryCompactor:
+    """
+    Background job applying the LightState retention policy at a fixed interval.
+    """
+
+    def __init__(self, app, interval=3600):
+        self.app = app
+        self.interval = interval
+        self.running = False
+
+    def compact(self):
+        """
+        Run one compaction pass.
+
+        Returns:
+        int: The number of LightState rows deleted.
+        """
+        with self.app.app_context():
+            deleted = compact_light_state_history()
+            db.session.commit()
+        if deleted:
+            self.app.logger.info("Compacted light state history: " + str(deleted) + " rows deleted")
+        return deleted
+
+    def run(self):
+        """
+        Compact at the configured interval until stop() is called.
+        """
+        self.running = True
+        while self.running:
+            try:
+                self.compact()
+            except Exception as e:
+                self.app.logger.error("Failed to compact light state history: " + str(e))
+            socketio.sleep(self.interval)
+
+    def start(self):
+        """
+        Start the compaction loop as a background task.
+        """
+        return socketio.start_background_task(self.run)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,162 @@
+# src/compositor.py
+
+import threading
+from collections import namedtuple
+from .entity_index import entity_index
+from .models import CurrentLightState
+
+Layer = namedtuple('Layer', ['state', 'start', 'end', 'pixels'])
+
+
+class Compositor:
+    """
+    Resolves the light states of overlapping entities into the framebuffer.
+
+    Every entity with a known light state is a layer. Where layers overlap,
+    the entity deepest in the hierarchy wins (see EntityIndex.owners), so the
+    strip always shows the resolved hierarchy regardless of the order in
+    which colors were set. Each layer caches its rendered pixels, and a
+    change to one layer only recomposes the pixels of its range. A change to
+    the entity hierarchy recomposes every layer.
+
+    Pixels not covered by any layer are left untouched.
+
+    With a SharedFrameBuffer, other processes set light states too. Layers
+    are then changed under the framebuffer lock, and reloaded from the
+    database first whenever another process bumped the 'states' generation.
+
+    The framebuffer lock is always taken before the compositor's own (see
+    FrameBuffer for the order of the locks).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.layers = {}
+        self.lock = threading.RLock()
+        self._entity_version = None
+        self._states_generation = None
+
+    @property
+    def framebuffer(self):
+        return self.app.framebuffer
+
+    def load(self):
+        """
+        Load a layer for every entity from the current light states and compose them.
+        """
+        with self.framebuffer.lock, self.lock:
+            self._load_layers()
+            self.compose_all()
+
+    def _load_layers(self):
+        if self.framebuffer.shared:
+            self._states_generation = self.framebuffer.counter('states')
+        self.layers = {}
+        for state in CurrentLightState.query.populate_existing().all():
+            self._set(state.entity_id, (state.red, state.green, state.blue, state.brightness, state.is_on))
+
+    def set_layer(self, entity_id, red, green, blue, brightness, is_on):
+        """
+        Set the light state of a single entity and recompose its range.
+        """
+        self.set_layers([entity_id], red, green, blue, brightness, is_on)
+
+    def set_layers(self, entity_ids, red, green, blue, brightness, is_on, compose=True):
+        """
+        Set the same light state on several entities and recompose their ranges.
+
+        Parameters:
+        entity_ids (iterable): The IDs of the entities to update.
+        red (int): The red component of the color (0-255).
+        green (int): The green component of the color (0-255).
+        blue (int): The blue component of the color (0-255).
+        brightness (int): The brightness level of the color (0-100).
+        is_on (bool): The state of the light; layers that are off render black.
+        compose (bool): Whether to recompose the framebuffer, e.g. False when it was
+                        restored from a snapshot that already shows these states.
+        """
+        framebuffer = self.framebuffer
+        with framebuffer.lock, self.lock:
+            if framebuffer.shared and framebuffer.counter('states') != self._states_generation:
+                # Another process set light states since the layers were loaded
+                self._load_layers()
+
+            ranges = []
+            for entity_id in entity_ids:
+                layer = self._set(entity_id, (red, green, blue, int(brightness), bool(is_on)))
+                if layer:
+                    ranges.append((layer.start, layer.end))
+
+            if compose:
+                if self._entity_version != entity_index.version:
+                    self.compose_all()
+                else:
+                    for start, end in _merge(ranges):
+                        self.compose(start, end)
+
+            if framebuffer.shared:
+                self._states_generation = framebuffer.bump('states')
+
+    def _set(self, entity_id, state):
+        entity = entity_index.get(entity_id)
+        if not entity:
+            self.layers.pop(entity_id, None)
+            return None
+        layer = _render(state, entity.start_addr, entity.end_addr)
+        self.layers[entity.id] = layer
+        return layer
+
+    def _layer(self, entity_id):
+        # Re-render a cached layer whose entity range changed since it was rendered
+        layer = self.layers[entity_id]
+        entity = entity_index.get(entity_id)
+        if (layer.start, layer.end) != (entity.start_addr, entity.end_addr):
+            layer = _render(layer.state, entity.start_addr, entity.end_addr)
+            self.layers[entity_id] = layer
+        return layer
+
+    def compose(self, range_start, range_end):
+        """
+        Recompose an inclusive pixel range of the framebuffer from the layers that own it.
+        """
+        clipped = self.framebuffer.clip(range_start, range_end)
+        if clipped is None:
+            return
+        with self.framebuffer.lock, self.lock:
+            for start, end, entity_id in entity_index.owners(clipped[0], clipped[1], include=self.layers):
+                layer = self._layer(entity_id)
+                self.framebuffer.write(start, layer.pixels[(start - layer.start) * 4:(end - layer.start + 1) * 4])
+
+    def compose_all(self):
+        """
+        Drop layers of deleted entities and recompose every layer.
+        """
+        with self.framebuffer.lock, self.lock:
+            self._entity_version = entity_index.version
+            ranges = []
+            for entity_id in list(self.layers):
+                entity = entity_index.get(entity_id)
+                if entity:
+                    ranges.append((entity.start_addr, entity.end_addr))
+                else:
+                    del self.layers[entity_id]
+
+            for start, end in _merge(ranges):
+                self.compose(start, end)
+
+
+def _render(state, start, end):
+    red, green, blue, brightness, is_on = state
+    pixel = bytes((blue, green, red, brightness)) if is_on else bytes(4)
+    return Layer(state, start, end, pixel * max(end - start + 1, 0))
+
+
+def _merge(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
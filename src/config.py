@@ -4,6 +4,8 @@ class Config:
     SERVER_NAME = '10.0.0.71:5000'
     APPLICATION_ROOT = '/'
     PREFERRED_URL_SCHEME = 'http'
+    # Each LED_* setting takes a single value or a list with one value per output channel;
+    # the channels are addressed one after the other in the order of LED_COUNTS
     LED_PIN = 18
     LED_INVERT = False
     LED_CHANNEL = 0
@@ -12,5 +14,31 @@ class Config:
     LED_DMAS = 5
     LED_BRIGHTNESSES = 100
     LED_STRIP_TYPES = 'WS2811_STRIP_GRB'
+    LED_GAMMAS = 1.0
+    LED_FRAME_RATE = 60
+    # 'ws281x' drives the hardware; 'simulated' runs without it (see src/backends.py)
+    LED_BACKEND = 'ws281x'
+    SIMULATED_STRIP_PIXEL_TIME = 30e-6
+    SIMULATED_STRIP_RESET_TIME = 300e-6
+    # Path the simulated strips append their frames to, formatted with {channel}; None keeps them in memory only
+    SIMULATED_STRIP_DUMP = None
+    HARDWARE_QUEUE_SIZE = 2
+    BROADCAST_HISTORY = 256
+    # Entity states kept for resuming clients when the framebuffer is shared (see SharedDeltaLog)
+    BROADCAST_SHARED_RECORDS = 16384
+    # Socket.IO message queue (e.g. 'redis://localhost:6379/0') through which a renderer process
+    # broadcasts to the clients of the API processes; needed with FRAMEBUFFER_SHARED
+    SOCKETIO_MESSAGE_QUEUE = None
+    ADDRESS_FLUSH_INTERVAL = 1.0
+    # Path of a memory-mapped framebuffer shared by several processes (e.g. under /dev/shm); None keeps it in process
+    FRAMEBUFFER_SHARED = None
+    # Memory-mapped copy of the framebuffer restored on startup, relative to the instance folder; None disables it.
+    # api.py enables it, so apps created elsewhere (tests, benchmarks) leave no file behind unless they ask for one
+    FRAMEBUFFER_SNAPSHOT = None
+    LIGHT_STATE_MAX_AGE_DAYS = 90
+    LIGHT_STATE_MAX_ROWS_PER_ENTITY = 1000
+    LIGHT_STATE_DOWNSAMPLE_AFTER_DAYS = 1
+    LIGHT_STATE_DOWNSAMPLE_BUCKET_SECONDS = 3600
+    LIGHT_STATE_COMPACTION_INTERVAL = 3600
     SQLALCHEMY_DATABASE_URI = 'sqlite:///light.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -0,0 +1,501 @@
+# src/effects.py
+
+import math
+import random
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+from .entity_index import entity_index
+from .socket import socketio
+
+# A running effect, drawn over an entity's range or, without an entity, a fixed range
+Running = namedtuple('Running', ['effect', 'started', 'entity_id', 'range_start', 'range_end'])
+
+
+def _interleave(num_pixels, blue, green, red, brightness):
+    """
+    Pack four channel planes of num_pixels bytes each into framebuffer pixels.
+    """
+    frame = bytearray(num_pixels * 4)
+    frame[0::4] = blue
+    frame[1::4] = green
+    frame[2::4] = red
+    frame[3::4] = brightness
+    return frame
+
+
+def _widen(data):
+    # Read the bytes as one integer of little-endian 16-bit lanes, one byte per lane
+    wide = bytearray(len(data) * 2)
+    wide[0::2] = data
+    return int.from_bytes(wide, 'little')
+
+
+@lru_cache(maxsize=4096)
+def _lerp_table(target, step):
+    # Translation table moving every byte value step/255 of the way to target
+    return bytes(value + ((target - value) * step + 127) // 255 for value in range(256))
+
+
+@lru_cache(maxsize=256)
+def _scale_table(level):
+    # Translation table scaling every byte value by level/255
+    return bytes(value * level // 255 for value in range(256))
+
+
+def _wheel(position):
+    if position < 85:
+        return position * 3, 255 - position * 3, 0
+    if position < 170:
+        position -= 85
+        return 255 - position * 3, 0, position * 3
+    position -= 170
+    return 0, position * 3, 255 - position * 3
+
+
+def _parameter(value, name, low, high):
+    """
+    Convert an effect parameter to a float and check that it lies between low and high.
+
+    Parameters come straight from request bodies, so values that are not
+    finite, or too large to turn into pixel positions, are refused here
+    rather than failing on every frame.
+    """
+    value = float(value)
+    if not low <= value <= high:
+        raise ValueError("{} must be between {:g} and {:g}".format(name, low, high))
+    return value
+
+
+# Red, green and blue of every hue on the color wheel, as translation tables
+WHEEL = [bytes(channel) for channel in zip(*(_wheel(position) for position in range(256)))]
+
+
+class Effect:
+    """
+    Base class of the effects.
+
+    An effect computes whole frames of packed framebuffer pixels for a range
+    of num_pixels pixels at a given time since it started. Frames are built
+    with bulk bytes operations (repetition, strided slices and translation
+    tables) over the whole range, never pixel by pixel in Python, so dozens
+    of effects fit in the frame budget.
+
+    Effects without a duration run until they are stopped. When an effect
+    ends, its range goes back to the entity light states, unless the effect
+    holds its last frame, which then stays until the range is next painted.
+    """
+
+    name = None
+    hold = False
+
+    def __init__(self, red=255, green=255, blue=255, brightness=100, duration=None):
+        self.color = (int(red), int(green), int(blue))
+        self.brightness = int(brightness)
+        self.duration = duration
+        for value in self.color:
+            if not 0 <= value <= 255:
+                raise ValueError("Color values must be between 0 and 255")
+        if not 0 <= self.brightness <= 100:
+            raise ValueError("Brightness must be between 0 and 100")
+        if duration is not None and not 0 < duration < math.inf:
+            raise ValueError("Duration must be positive")
+
+    def begin(self, pixels):
+        """
+        Called when the effect starts with the pixels it is drawn over.
+        """
+
+    def frame(self, elapsed, num_pixels):
+        """
+        Return the pixels of the frame elapsed seconds after the effect started.
+        """
+        raise NotImplementedError
+
+    def describe(self):
+        return {'effect': self.name, 'red': self.color[0], 'green': self.color[1], 'blue': self.color[2],
+                'brightness': self.brightness, 'duration': self.duration}
+
+
+class Fade(Effect):
+    """
+    Fade every pixel of the range from its current value to a color over the duration.
+    """
+
+    name = 'fade'
+    hold = True
+
+    def __init__(self, duration=1.0, **params):
+        super().__init__(duration=duration, **params)
+        self._planes = None
+
+    def begin(self, pixels):
+        self._planes = [bytes(pixels[channel::4]) for channel in range(4)]
+
+    def frame(self, elapsed, num_pixels):
+        red, green, blue = self.color
+        targets = (blue, green, red, self.brightness)
+        if self._planes is None or len(self._planes[0]) != num_pixels:
+            # The range changed size since the fade started; it can only show the target
+            return bytes((blue, green, red, self.brightness)) * num_pixels
+
+        step = min(255, int(255 * elapsed / self.duration))
+        return _interleave(num_pixels, *(plane.translate(_lerp_table(target, step))
+                                         for plane, target in zip(self._planes, targets)))
+
+
+class Breathe(Effect):
+    """
+    Pulse the brightness of a color between min_brightness and brightness, once every period seconds.
+    """
+
+    name = 'breathe'
+
+    def __init__(self, period=4.0, min_brightness=0, **params):
+        super().__init__(**params)
+        self.period = _parameter(period, "Period", 0, 3600)
+        self.min_brightness = int(min_brightness)
+        if self.period <= 0:
+            raise ValueError("Period must be positive")
+        if not 0 <= self.min_brightness <= self.brightness:
+            raise ValueError("Minimum brightness must be between 0 and brightness")
+
+    def frame(self, elapsed, num_pixels):
+        wave = (1 - math.cos(2 * math.pi * elapsed / self.period)) / 2
+        level = self.min_brightness + int(round((self.brightness - self.min_brightness) * wave))
+        red, green, blue = self.color
+        return bytes((blue, green, red, level)) * num_pixels
+
+    def describe(self):
+        return dict(super().describe(), period=self.period, min_brightness=self.min_brightness)
+
+
+class Chase(Effect):
+    """
+    Move groups of width lit pixels, spacing pixels apart, along the range at speed pixels per second.
+    """
+
+    name = 'chase'
+
+    def __init__(self, width=3, spacing=10, speed=30.0, **params):
+        super().__init__(**params)
+        self.width = int(_parameter(width, "Width", 1, 2 ** 31))
+        self.spacing = int(_parameter(spacing, "Spacing", 1, 2 ** 31))
+        self.speed = _parameter(speed, "Speed", -10000, 10000)
+        if not 0 < self.width <= self.spacing:
+            raise ValueError("Width must be positive and no larger than spacing")
+        self._tile = None
+
+    def frame(self, elapsed, num_pixels):
+        red, green, blue = self.color
+        position = int(elapsed * self.speed) % self.spacing
+        if self.spacing > num_pixels:
+            # At most two groups reach into the range; draw them rather than a tile longer than the range
+            frame = bytearray(num_pixels * 4)
+            for start in (position - self.spacing, position):
+                first, last = max(start, 0), min(start + self.width, num_pixels)
+                if first < last:
+                    frame[first * 4:last * 4] = bytes((blue, green, red, self.brightness)) * (last - first)
+            return frame
+
+        if self._tile is None:
+            self._tile = bytes((blue, green, red, self.brightness)) * self.width + bytes(4 * (self.spacing - self.width))
+        # Rotating the repeating tile moves every group at once
+        shift = (self.spacing - position) % self.spacing * 4
+        tile = self._tile[shift:] + self._tile[:shift]
+        return (tile * (num_pixels // self.spacing + 1))[:num_pixels * 4]
+
+    def describe(self):
+        return dict(super().describe(), width=self.width, spacing=self.spacing, speed=self.speed)
+
+
+class Rainbow(Effect):
+    """
+    Spread cycles turns of the color wheel over the range, turning at speed turns per second.
+    """
+
+    name = 'rainbow'
+
+    def __init__(self, speed=0.2, cycles=1.0, **params):
+        super().__init__(**params)
+        self.speed = _parameter(speed, "Speed", -100, 100)
+        self.cycles = _parameter(cycles, "Cycles", -1000, 1000)
+        self._hues = {}
+
+    def frame(self, elapsed, num_pixels):
+        hues = self._hues.get(num_pixels)
+        if hues is None:
+            hues = self._hues[num_pixels] = bytes(int(index * 256 * self.cycles / num_pixels) % 256 for index in range(num_pixels))
+
+        offset = int(elapsed * self.speed * 256) % 256
+        shifted = hues.translate(bytes((hue + offset) % 256 for hue in range(256)))
+        red, green, blue = (shifted.translate(table) for table in WHEEL)
+        return _interleave(num_pixels, blue, green, red, bytes((self.brightness,)) * num_pixels)
+
+    def describe(self):
+        return dict(super().describe(), speed=self.speed, cycles=self.cycles)
+
+
+class Twinkle(Effect):
+    """
+    Light random pixels, density of them per pixel and second, each fading out over decay seconds.
+    """
+
+    name = 'twinkle'
+
+    def __init__(self, density=0.5, decay=1.0, seed=None, **params):
+        super().__init__(**params)
+        self.density = _parameter(density, "Density", 0, 1000)
+        self.decay = _parameter(decay, "Decay", 0, 3600)
+        if self.density < 0 or self.decay <= 0:
+            raise ValueError("Density must not be negative and decay must be positive")
+        self._random = random.Random(seed)
+        self._levels = None
+        self._elapsed = 0.0
+
+    def frame(self, elapsed, num_pixels):
+        if self._levels is None or len(self._levels) != num_pixels:
+            self._levels = bytearray(num_pixels)
+        interval = max(elapsed - self._elapsed, 0.0)
+        self._elapsed = elapsed
+
+        # Every level decays by the same factor, then a few new sparks are lit
+        self._levels = bytearray(self._levels.translate(_scale_table(int(255 * math.exp(-interval / self.decay)))))
+        sparks = min(num_pixels, int(num_pixels * self.density * interval + self._random.random()))
+        for index in self._random.sample(range(num_pixels), sparks):
+            self._levels[index] = 255
+
+        red, green, blue = self.color
+        brightness = self._levels.translate(_scale_table(self.brightness))
+        return _interleave(num_pixels, bytes((blue,)) * num_pixels, bytes((green,)) * num_pixels,
+                           bytes((red,)) * num_pixels, brightness)
+
+    def describe(self):
+        return dict(super().describe(), density=self.density, decay=self.decay)
+
+
+class Wipe(Effect):
+    """
+    Paint a color over the range one pixel every wait_ms milliseconds, from its start.
+    """
+
+    name = 'wipe'
+    hold = True
+
+    def __init__(self, wait_ms=5, num_pixels=1, **params):
+        if wait_ms <= 0:
+            raise ValueError("wait_ms must be positive")
+        super().__init__(duration=num_pixels * wait_ms / 1000.0, **params)
+        self.wait_ms = wait_ms
+        self._pixels = b''
+
+    def begin(self, pixels):
+        self._pixels = bytes(pixels)
+
+    def frame(self, elapsed, num_pixels):
+        red, green, blue = self.color
+        painted = min(num_pixels, int(elapsed * 1000 / self.wait_ms) + 1)
+        rest = self._pixels[painted * 4:num_pixels * 4]
+        return bytes((blue, green, red, self.brightness)) * painted + rest + bytes(num_pixels * 4 - painted * 4 - len(rest))
+
+    def describe(self):
+        return dict(super().describe(), wait_ms=self.wait_ms)
+
+
+class Crossfade(Effect):
+    """
+    Blend the range from the pixels it showed before a change to the pixels it shows after, over the duration.
+
+    The effect is started right after the new pixels are composed, so begin()
+    receives the target frame; the source frame is given up front. Every
+    frame blends the two with one big-integer multiply-add: each byte is
+    widened to a 16-bit lane, so a lane holding source * (256 - weight) +
+    target * weight never carries into its neighbour, and the high bytes of
+    the lanes are the blended pixels.
+    """
+
+    name = 'crossfade'
+
+    def __init__(self, source, duration=1.0):
+        super().__init__(duration=duration)
+        self.source = bytes(source)
+        self._target = None
+
+    def begin(self, pixels):
+        self._target = bytes(pixels)
+        self._lanes = (_widen(self.source), _widen(self._target), _widen(b'\x80' * len(self.source)))
+
+    def frame(self, elapsed, num_pixels):
+        if self._target is None or not len(self.source) == len(self._target) == num_pixels * 4:
+            # The range changed size since the change; there is nothing to blend
+            return self._target if self._target is not None and len(self._target) == num_pixels * 4 else bytes(num_pixels * 4)
+
+        weight = min(256, int(256 * elapsed / self.duration))
+        source, target, rounding = self._lanes
+        blended = (source * (256 - weight) + target * weight + rounding).to_bytes(num_pixels * 8, 'little')
+        return blended[1::2]
+
+    def describe(self):
+        return {'effect': self.name, 'duration': self.duration}
+
+
+# Effects that can be started through the effect endpoint, by name
+EFFECTS = {effect.name: effect for effect in (Fade, Breathe, Chase, Rainbow, Twinkle)}
+
+
+class EffectEngine:
+    """
+    Runs effects on the frame clock.
+
+    tick() draws the current frame of every running effect into the
+    framebuffer. It runs as a source of the renderer, once per frame, or in
+    its own background task at the frame rate when there is no renderer in
+    the process. Effects are drawn shallowest entity first, so an effect on
+    a child shows over one on its parent.
+
+    When an entity effect is stopped, or ends without holding its last
+    frame, its range is recomposed from the entity light states, so the
+    strip returns to what they say.
+
+    The engine's lock comes first in the order of the locks (see FrameBuffer).
+    """
+
+    def __init__(self, app, frame_rate=60):
+        self.app = app
+        self.frame_interval = 1.0 / frame_rate
+        self.effects = {}
+        self.lock = threading.RLock()
+        self.running = False
+
+    def _bounds(self, running):
+        if running.entity_id is None:
+            return running.range_start, running.range_end
+        entity = entity_index.get(running.entity_id)
+        if not entity:
+            return None
+        return entity.start_addr, entity.end_addr
+
+    def start(self, entity_id, effect, now=None):
+        """
+        Start an effect on an entity, replacing any effect already running on it.
+        """
+        entity = entity_index.get(entity_id)
+        with self.lock:
+            self.effects[entity.id] = self._begin(effect, now, entity.id, entity.start_addr, entity.end_addr)
+
+    def start_range(self, range_start, range_end, effect, now=None):
+        """
+        Start an effect on an inclusive pixel range not tied to an entity.
+        """
+        with self.lock:
+            self.effects[('range', range_start, range_end)] = self._begin(effect, now, None, range_start, range_end)
+
+    def _begin(self, effect, now, entity_id, range_start, range_end):
+        framebuffer = self.app.framebuffer
+        clipped = framebuffer.clip(range_start, range_end)
+        effect.begin(bytes(framebuffer.view(*clipped)) if clipped else b'')
+        return Running(effect, time.monotonic() if now is None else now, entity_id, range_start, range_end)
+
+    def stop(self, entity_id):
+        """
+        Stop the effect on an entity and show its light state again.
+
+        Returns:
+        bool: Whether an effect was running on the entity.
+        """
+        with self.lock:
+            running = self.effects.pop(entity_id, None)
+            if running is None:
+                return False
+            self._restore(running)
+        return True
+
+    def cancel(self, entity_ids):
+        """
+        Drop the effects on several entities without redrawing their ranges, for callers about to repaint them.
+        """
+        with self.lock:
+            for entity_id in entity_ids:
+                self.effects.pop(entity_id, None)
+
+    def _restore(self, running):
+        bounds = self._bounds(running)
+        if running.entity_id is not None and bounds:
+            self.app.compositor.compose(*bounds)
+
+    def describe(self):
+        """
+        Return the running entity effects with their parameters.
+        """
+        with self.lock:
+            return [dict(running.effect.describe(), entity_id=running.entity_id)
+                    for running in self.effects.values() if running.entity_id is not None]
+
+    def tick(self, now=None):
+        """
+        Draw the current frame of every running effect into the framebuffer.
+
+        Returns:
+        int: The number of effects drawn.
+        """
+        now = time.monotonic() if now is None else now
+        framebuffer = self.app.framebuffer
+        with self.lock:
+            if not self.effects:
+                return 0
+
+            depth = lambda item: len(entity_index.ancestors(item[1].entity_id)) if item[1].entity_id is not None else -1
+            drawn = 0
+            finished = []
+            failed = []
+            for key, running in sorted(self.effects.items(), key=depth):
+                bounds = self._bounds(running)
+                clipped = framebuffer.clip(*bounds) if bounds else None
+                if clipped is None:
+                    # The entity was deleted or moved off the strip
+                    finished.append(key)
+                    continue
+
+                effect = running.effect
+                # An effect started after now was read, while waiting for the lock, is at its first frame
+                elapsed = max(0, now - running.started)
+                ended = effect.duration is not None and elapsed >= effect.duration
+                try:
+                    framebuffer.write(clipped[0], effect.frame(min(elapsed, effect.duration) if ended else elapsed,
+                                                               clipped[1] - clipped[0] + 1))
+                except Exception as e:
+                    # A broken effect is dropped so it cannot hold up the others on every frame
+                    self.app.logger.error("Stopped failing " + str(effect.name) + " effect: " + str(e))
+                    failed.append(key)
+                    continue
+                drawn += 1
+                if ended:
+                    finished.append(key)
+
+            for key in finished + failed:
+                running = self.effects.pop(key)
+                if key in failed or not running.effect.hold:
+                    self._restore(running)
+            return drawn
+
+    def run(self):
+        """
+        Tick at the frame rate until stop() is called.
+        """
+        self.running = True
+        while self.running:
+            try:
+                self.tick()
+            except Exception as e:
+                self.app.logger.error("Failed to draw effects: " + str(e))
+            socketio.sleep(self.frame_interval)
+
+    def start_loop(self):
+        """
+        Start ticking in a background task, for processes without a renderer.
+        """
+        return socketio.start_background_task(self.run)
+
+    def stop_loop(self):
+        self.running = False
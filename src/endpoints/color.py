@@ -1,13 +1,16 @@
 # src/endpoints/color.py
 
 from flask import Blueprint, request, jsonify, current_app
-from rpi_ws281x import Color
 from ..util.update_light_state_for_entity_and_children import update_light_state_for_entity_and_children
 from ..util.validate_color_values import validate_color_values
-from ..models import Entity, LightState, Address
+from ..util.render_dirty_ranges import render_dirty_ranges
+from ..models import CurrentLightState
+from ..entity_index import entity_index
+from ..effects import Wipe, Crossfade
 from ..database import db
-from flask_socketio import emit
+from flask_socketio import emit, join_room, leave_room
 from ..socket import socketio
+from ..broadcast import ROOM as BROADCAST_ROOM
 
 
 color_bp = Blueprint('color', __name__)
@@ -23,12 +26,39 @@ def handle_disconnect():
     # Additional logic as needed (e.g., authentication, logging)
 
 
+@socketio.on('subscribe', namespace='/ws-color')
+def handle_subscribe(data=None):
+    """
+    Subscribe to the 'delta' events broadcast when entity light states change.
+
+    A client resuming after a disconnect sends the 'epoch' and 'seq' of the
+    last delta it applied and is sent the deltas it missed. A new client, or
+    one too far behind to catch up, is sent a 'snapshot' of every entity's
+    current light state instead; deltas with a seq at or below the
+    snapshot's are already reflected in it.
+    """
+    data = data if isinstance(data, dict) else {}
+    broadcaster = current_app.broadcaster
+    join_room(BROADCAST_ROOM)
+
+    missed = broadcaster.since(data.get('epoch'), data.get('seq'))
+    if missed is None:
+        emit('snapshot', broadcaster.snapshot())
+        return
+    for delta in missed:
+        emit('delta', delta)
+
+@socketio.on('unsubscribe', namespace='/ws-color')
+def handle_unsubscribe():
+    leave_room(BROADCAST_ROOM)
+
 @socketio.on('set_color', namespace='/ws-color')
 def handle_set_color(data):
     """
     Endpoint to set the color for a specified entity and its children.
 
-    Expects a JSON payload with keys 'entity', 'red', 'green', 'blue', 'brightness', and 'is_on'.
+    Expects a JSON payload with keys 'entity', 'red', 'green', 'blue', 'brightness', and 'is_on',
+    and optionally 'transition_ms', the time in milliseconds over which to crossfade to the new color.
 
     Returns:
     Flask Response: JSON response indicating the success or failure of the color update.
@@ -41,7 +71,7 @@ def handle_set_color(data):
         return
 
     # Fetch the entity by its ID
-    entity = Entity.query.filter_by(id=entity_id).first()
+    entity = entity_index.get(entity_id)
     if not entity:
         emit('error', {'message': 'Entity not found'})
         return
@@ -51,6 +81,7 @@ def handle_set_color(data):
         green = int(data.get('green', 0))
         blue = int(data.get('blue', 0))
         brightness = int(data.get('brightness', 100))
+        transition_ms = int(data.get('transition_ms') or 0)
 
         if data.get('is_on') in ['false', False, None]:
             is_on = False
@@ -62,9 +93,12 @@ def handle_set_color(data):
         if not valid:
             emit('error', {'message': message})
             return
+        if transition_ms < 0:
+            emit('error', {'message': 'transition_ms must not be negative'})
+            return
 
         # Check current state before updating
-        current_state = LightState.query.filter_by(entity_id=entity.id).order_by(LightState.timestamp.desc()).first()
+        current_state = db.session.get(CurrentLightState, entity.id, populate_existing=True)
         if current_state and not any([current_state.is_on != is_on,
                                       current_state.red != red,
                                       current_state.green != green,
@@ -78,19 +112,75 @@ def handle_set_color(data):
         db.session.commit()
 
         # Apply the color to the LED strip
-        colorWipe(current_app.strip, Color(red, green, blue), brightness, entity.start_addr, entity.end_addr, is_on)
+        paintEntity(entity, red, green, blue, brightness, is_on, transition_ms)
+        showFrame(current_app.strip)
         emit('success', {'message': 'Color updated successfully', 'entity_id': entity.id, 'red': red, 'green': green, 'blue': blue, 'brightness': brightness, 'is_on': is_on})
 
     except Exception as e:
         emit('error', {'message': str(e)})
     
 
+@socketio.on('set_colors', namespace='/ws-color')
+def handle_set_colors(data):
+    """
+    Endpoint to set the color of several entities and their children at once.
+
+    Expects a JSON payload with a 'colors' list, each item holding the keys of a set_color event.
+    All items are validated before any is applied; they are recorded in one transaction
+    and rendered as a single frame.
+    """
+    try:
+        updated, error = apply_colors(data.get('colors'))
+        if error:
+            emit('error', {'message': error})
+            return
+        emit('success', {'message': 'Colors updated successfully', 'updated': updated})
+
+    except Exception as e:
+        emit('error', {'message': str(e)})
+    
+
+@socketio.on('frame', namespace='/ws-color')
+def handle_frame(pixels, offset=0):
+    """
+    Endpoint to stream a raw frame straight into the framebuffer.
+
+    Expects a binary payload of packed red, green, blue bytes (three per
+    pixel) and an optional pixel offset for partial frames. Frames that
+    arrive faster than the strip renders them replace each other, so only
+    the newest is shown.
+
+    Returns:
+    dict: Acknowledgement with the number of frames received and dropped so far.
+    """
+    if not isinstance(pixels, (bytes, bytearray)):
+        emit('error', {'message': 'Frame must be binary'})
+        return
+
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        emit('error', {'message': 'Offset must be an integer'})
+        return
+
+    frame_stream = current_app.frame_stream
+    frame_stream.push(pixels, offset)
+
+    # Without a running renderer, show the frame right away
+    if current_app.renderer is None:
+        frame_stream.apply()
+        showFrame(current_app.strip)
+
+    return {'received': frame_stream.received, 'dropped': frame_stream.dropped}
+    
+
 @color_bp.route('/color/', methods=['POST'])
 def set_color():
     """
     Endpoint to set the color for a specified entity and its children.
 
-    Expects a JSON payload with keys 'entity', 'red', 'green', 'blue', 'brightness', and 'is_on'.
+    Expects a JSON payload with keys 'entity', 'red', 'green', 'blue', 'brightness', and 'is_on',
+    and optionally 'transition_ms', the time in milliseconds over which to crossfade to the new color.
 
     Returns:
     Flask Response: JSON response indicating the success or failure of the color update.
@@ -104,7 +194,7 @@ def set_color():
         return jsonify({"error": "Missing entity"}), 400
 
     # Fetch the entity by its ID
-    entity = Entity.query.filter_by(id=entity_id).first()
+    entity = entity_index.get(entity_id)
     if not entity:
         return jsonify({"error": "Entity not found"}), 404
     
@@ -116,7 +206,7 @@ def set_color():
         blue = int(data.get('blue'))
         brightness = int(data.get('brightness'))
     except TypeError:
-        existing = LightState.query.filter_by(entity_id=entity.id).order_by(LightState.timestamp.desc()).first()
+        existing = db.session.get(CurrentLightState, entity.id, populate_existing=True)
         red = existing.red
         green = existing.green
         blue = existing.blue
@@ -127,6 +217,13 @@ def set_color():
     else:
         is_on = True
 
+    try:
+        transition_ms = int(data.get('transition_ms') or 0)
+    except (TypeError, ValueError):
+        return jsonify({"error": "transition_ms must be an integer"}), 400
+    if transition_ms < 0:
+        return jsonify({"error": "transition_ms must not be negative"}), 400
+
     # Validate color values
     if [red, green, blue, brightness]:
         valid, message = validate_color_values(red, green, blue, brightness)
@@ -135,7 +232,7 @@ def set_color():
             return jsonify({"error": message + " values: red: " + str(red) + " green: " + str(green) + " blue: " + str(blue) + " brightness: " + str(brightness)}), 400
 
     # Check current state before updating
-    current_state = LightState.query.filter_by(entity_id=entity.id).order_by(LightState.timestamp.desc()).first()
+    current_state = db.session.get(CurrentLightState, entity.id, populate_existing=True)
     if current_state and not any([current_state.is_on != is_on,
                                   current_state.red != red,
                                   current_state.green != green,
@@ -150,48 +247,168 @@ def set_color():
 
     # Apply the color to the LED strip
     if is_on is True:
-        current_app.logger.info("current_state: red: " + str(current_state.red) + ", green: " + str(current_state.green) + ", blue: " + str(current_state.blue) + ", brightness: " + str(current_state.brightness)
+        current_app.logger.info("new_state: red: " + str(red) + ", green: " + str(green) + ", blue: " + str(blue) + ", brightness: " + str(brightness)
             + ", start_addr: " + str(entity.start_addr) + ", end_addr: " + str(entity.end_addr))
-        colorWipe(current_app.strip, Color(current_state.red, current_state.green, current_state.blue), 
-                  int(current_state.brightness), entity.start_addr, entity.end_addr)
     if is_on is False:
         current_app.logger.info("turning off: " + str(entity.start_addr) + ", " + str(entity.end_addr))
-        colorWipe(current_app.strip, Color(0, 0, 0), 0, entity.start_addr, entity.end_addr)
+    paintEntity(entity, red, green, blue, brightness, is_on, transition_ms)
+    showFrame(current_app.strip)
     return jsonify({"success": "Color updated successfully", "entity_id": entity.id, "red": red, "green": green, "blue": blue, "brightness": brightness, "is_on": is_on}), 200
 
+@color_bp.route('/color/batch/', methods=['POST'])
+def set_colors():
+    """
+    Endpoint to set the color of several entities and their children at once.
+
+    Expects a JSON payload with a 'colors' list, each item holding the keys 'entity', 'red',
+    'green', 'blue', 'brightness' and 'is_on' as for set_color. All items are validated
+    before any is applied; they are recorded in one transaction and rendered as a single frame.
+
+    Returns:
+    Flask Response: JSON response indicating the success or failure of the color update.
+    """
+
+    data = request.json
+    updated, error = apply_colors(data.get('colors') if isinstance(data, dict) else None)
+    if error:
+        current_app.logger.error("error: " + error)
+        return jsonify({"error": error}), 400
+
+    return jsonify({"success": "Colors updated successfully", "updated": updated}), 200
+
+def apply_colors(colors):
+    """
+    Validate and apply a list of entity color assignments as one update.
+
+    Parameters:
+    colors (list): Dictionaries with the keys 'entity', 'red', 'green', 'blue', 'brightness'
+                   and 'is_on'. Later items win where they set the same entity.
+
+    Returns:
+    tuple: The IDs of the entities whose light state changed and an error message,
+           which is None unless validation failed (in which case nothing was applied).
+    """
+
+    if not isinstance(colors, list) or not colors:
+        return [], "Missing colors"
+
+    # Validate every assignment before applying any of them
+    assignments = []
+    for index, data in enumerate(colors):
+        entity = entity_index.get(data.get('entity')) if isinstance(data, dict) else None
+        if not entity:
+            return [], "Entity not found at index " + str(index)
+
+        try:
+            red = int(data.get('red', 0))
+            green = int(data.get('green', 0))
+            blue = int(data.get('blue', 0))
+            brightness = int(data.get('brightness', 100))
+        except (TypeError, ValueError):
+            return [], "All values must be integers at index " + str(index)
+
+        valid, message = validate_color_values(red, green, blue, brightness)
+        if not valid:
+            return [], message + " at index " + str(index)
+
+        is_on = data.get('is_on') not in ['false', False, None]
+        assignments.append((entity, red, green, blue, brightness, is_on))
+
+    # Record the history of all assignments in a single transaction
+    updated = []
+    for entity, red, green, blue, brightness, is_on in assignments:
+        updated.extend(update_light_state_for_entity_and_children(entity.id, red, green, blue, brightness, is_on))
+    db.session.commit()
+
+    # Compose every assignment into the framebuffer, then render them as one frame
+    for entity, red, green, blue, brightness, is_on in assignments:
+        paintEntity(entity, red, green, blue, brightness, is_on)
+    showFrame(current_app.strip)
+
+    return sorted(set(updated)), None
+
+def paintEntity(entity, red, green, blue, brightness, is_on, transition_ms=None):
+    """
+    Compose the new light state of an entity and its children into the framebuffer.
+
+    The entity and its descendants all take the new state, matching
+    update_light_state_for_entity_and_children; where their ranges overlap
+    other entities, the compositor resolves which one shows.
+
+    With a transition_ms and a running frame clock, the entity's range is
+    crossfaded from the pixels it showed to the new ones over that many
+    milliseconds instead of changing at once. Only the final state is
+    recorded; the intermediate frames exist only in the framebuffer.
+    """
+    entity_ids = entity_index.subtree(entity.id)
+    framebuffer = current_app.framebuffer
+    effects = current_app.effects
+    clipped = framebuffer.clip(entity.start_addr, entity.end_addr)
+    fade = bool(transition_ms) and clipped is not None and (current_app.renderer is not None or effects.running)
+
+    # Holding the framebuffer lock keeps the renderer from showing the new pixels before the crossfade
+    # starts; the effects lock is taken first (see FrameBuffer for the order of the locks)
+    with effects.lock, framebuffer.lock:
+        source = bytes(framebuffer.view(*clipped)) if fade else None
+        # A new color replaces any effect running on the entity or its children
+        effects.cancel(entity_ids)
+        current_app.compositor.set_layers(entity_ids, red, green, blue, brightness, is_on)
+        if fade:
+            effects.start(entity.id, Crossfade(source, duration=transition_ms / 1000.0))
+            framebuffer.write(clipped[0], source)
+    current_app.broadcaster.publish(entity_ids, red, green, blue, brightness, is_on)
+
 def colorWipe(strip, new_color, new_brightness, range_start, range_end, wait_ms=5):
+    """
+    Paint a color over an inclusive pixel range.
+
+    When effects are drawn on a frame clock (a renderer or the effect loop
+    is running), the color is wiped in one pixel every wait_ms milliseconds.
+    Otherwise, or without a wait, the whole range is painted at once.
+    """
     with current_app.app_context():
-        for i in range(strip.numPixels()):
-            if range_start <= i <= range_end:
-                color_to_set = new_color
-                brightness_to_set = new_brightness
-                # Update the in-memory data structure
-                current_app.pixel_states[i] = {'red': new_color.r, 'green': new_color.g, 'blue': new_color.b, 'brightness': new_brightness}
-            else:
-                state = current_app.pixel_states[i]
-                color_to_set = Color(state['red'], state['green'], state['blue'])
-                brightness_to_set = state['brightness']
-
-            # Set color and brightness for the pixel
-            strip.setPixelColor(i, color_to_set)
-            strip.setBrightness(brightness_to_set)
-        strip.show()
-        
-        saveStateToDatabase()
+        red, green, blue = (new_color >> 16) & 0xFF, (new_color >> 8) & 0xFF, new_color & 0xFF
+        clipped = current_app.framebuffer.clip(range_start, range_end)
+        if wait_ms and clipped and (current_app.renderer is not None or current_app.effects.running):
+            current_app.effects.start_range(clipped[0], clipped[1], Wipe(wait_ms, clipped[1] - clipped[0] + 1, red=red, green=green, blue=blue, brightness=new_brightness))
+            return
+
+        # Update the in-memory data structure in a single slice assignment
+        current_app.framebuffer.set_range(range_start, range_end, red, green, blue, new_brightness)
+        showFrame(strip)
+
+def showFrame(strip):
+    """
+    Make the pending framebuffer changes visible and persistent.
+
+    The renderer picks up the changes on its next frame. Without a running
+    renderer, only the changed pixels are pushed, brightness-scaled in
+    software, and latched with a single show(), and the published state
+    changes are broadcast to subscribers right away. Without the write-behind
+    loop running, the changes are also persisted right away.
+
+    A shared framebuffer is rendered and persisted by the renderer process
+    that owns the strip, so other processes only broadcast their changes.
+
+    Parameters:
+    strip (PixelStrip): The LED strip to render to when no renderer is running.
+    """
+    with current_app.app_context():
+        shared = current_app.framebuffer.shared
+        if current_app.renderer is None:
+            if not shared:
+                render_dirty_ranges(strip, current_app.framebuffer, current_app.color_correction)
+            current_app.broadcaster.flush()
+
+        if not current_app.persister.running and not shared:
+            saveStateToDatabase()
 
 def saveStateToDatabase():
+    """
+    Persist the pixels changed since the last save to the Address table in one bulk upsert.
+
+    Returns:
+    int: The number of Address rows written.
+    """
     with current_app.app_context():
-        for i, state in enumerate(current_app.pixel_states):
-            address_record = Address.query.filter_by(id=i).first()
-            if address_record:
-                # Update existing record
-                address_record.red = state['red']
-                address_record.green = state['green']
-                address_record.blue = state['blue']
-                address_record.brightness = state['brightness']
-            else:
-                # Create a new record if it doesn't exist
-                new_address = Address(id=i, red=state['red'], green=state['green'], blue=state['blue'], brightness=state['brightness'])
-                db.session.add(new_address)
-
-        db.session.commit()
\ No newline at end of file
+        return current_app.persister.flush()
\ No newline at end of file
@@ -0,0 +1,97 @@
+# src/endpoints/effect.py
+
+from flask import Blueprint, request, jsonify, current_app
+from ..effects import EFFECTS
+from ..entity_index import entity_index
+
+
+effect_bp = Blueprint('effect', __name__)
+
+@effect_bp.route('/effect/', methods=['POST', 'DELETE', 'GET'])
+def manage_effect():
+    """
+    Endpoint to start, stop, or list effects running on entities.
+
+    Depending on the request method, different operations are performed:
+    POST - Start an effect on an entity
+    DELETE - Stop the effect running on an entity
+    GET - List the running effects
+
+    Returns:
+    Flask Response: JSON response indicating the success or failure of the operation.
+    """
+
+    if request.method == 'GET':
+        return jsonify(current_app.effects.describe()), 200
+
+    data = request.json
+    if request.method == 'POST':
+        return start_effect(data)
+    elif request.method == 'DELETE':
+        return stop_effect(data)
+
+def start_effect(data):
+    """
+    Start an effect on an entity, replacing any effect already running on it.
+
+    The effect is drawn over the entity's range only; its light state and
+    that of its children are left as they are, and show again when the
+    effect ends or is stopped.
+
+    Parameters:
+    data (dict): A dictionary containing the following keys:
+        - entity (int): The ID of the entity.
+        - effect (str): One of 'fade', 'breathe', 'chase', 'rainbow' and 'twinkle'.
+        - duration_ms (int, optional): How long the effect runs; without it, until stopped.
+        - red, green, blue, brightness (int, optional): The color of the effect.
+        - Any parameter of the effect, such as 'period' for breathe or 'speed' for chase.
+
+    Returns:
+    Flask Response: JSON response indicating the success or failure of starting the effect.
+    """
+
+    if not isinstance(data, dict) or 'entity' not in data or 'effect' not in data:
+        return jsonify({"error": "Missing data"}), 400
+
+    entity = entity_index.get(data['entity'])
+    if not entity:
+        return jsonify({"error": "Entity not found"}), 404
+
+    effect_class = EFFECTS.get(data['effect'])
+    if effect_class is None:
+        return jsonify({"error": "Unknown effect, expected one of: " + ", ".join(sorted(EFFECTS))}), 400
+
+    params = {key: value for key, value in data.items() if key not in ('entity', 'effect', 'duration_ms')}
+    try:
+        if data.get('duration_ms') is not None:
+            params['duration'] = float(data['duration_ms']) / 1000
+        effect = effect_class(**params)
+    except TypeError as e:
+        return jsonify({"error": "Invalid effect parameters: " + str(e)}), 400
+    except (ValueError, OverflowError) as e:
+        # OverflowError: an infinite color or brightness
+        return jsonify({"error": str(e)}), 400
+
+    current_app.effects.start(entity.id, effect)
+    return jsonify({"success": "Effect started successfully", "entity_id": entity.id, "effect": effect.describe()}), 201
+
+def stop_effect(data):
+    """
+    Stop the effect running on an entity.
+
+    Parameters:
+    data (dict): A dictionary containing the following key:
+        - entity (int): The ID of the entity.
+
+    Returns:
+    Flask Response: JSON response indicating the success or failure of stopping the effect.
+    """
+
+    if not isinstance(data, dict) or 'entity' not in data:
+        return jsonify({"error": "Missing data"}), 400
+
+    entity = entity_index.get(data['entity'])
+    if not entity or not current_app.effects.stop(entity.id):
+        return jsonify({"error": "No effect running on entity"}), 404
+
+    return jsonify({"success": "Effect stopped successfully"}), 200
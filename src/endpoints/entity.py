@@ -1,11 +1,14 @@
 # src/endpoints/entity.py
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, has_request_context
 from ..util.has_cyclic_relationship import has_cyclic_relationship
-from ..models import Entity, LightState
+from ..models import Entity, LightState, CurrentLightState
+from ..entity_index import entity_index
+from ..state_version import state_version
 from ..database import db
 import gc
 from sqlalchemy import inspect
+from sqlalchemy.orm import aliased
 
 
 entity_bp = Blueprint('entity', __name__)
@@ -31,7 +34,7 @@ def manage_entity():
         if entity_id is None:
             return get_entities()
         else:
-            return get_entity({'id': entity_id})
+            return get_entity(entity_id)
 
     # For POST, PUT, DELETE, the JSON body is expected
     data = request.json
@@ -80,7 +83,7 @@ def create_entity(data):
 
     # Check for parent entity if parent_id is provided
     if entity.parent_id:
-        parent_entity = Entity.query.filter_by(id=parent_id).first()
+        parent_entity = entity_index.get(parent_id)
         if not parent_entity:
             entity.parent_id = None
             db.session.commit()
@@ -100,8 +103,12 @@ def create_entity(data):
         db.session.add(new_state)
         db.session.commit()
 
-    # Return a success response with the new entity's ID
+    # Return a success response with the new entity's ID, warning about unrelated overlapping ranges
     if entity.id:
+        overlaps = entity_index.unrelated_overlaps(entity.id, entity.start_addr, entity.end_addr)
+        if overlaps:
+            return jsonify({"success": "Entity created successfully", "id": entity.id,
+                            "warning": "Entity range overlaps unrelated entities", "overlaps": overlaps}), 201
         return jsonify({"success": "Entity created successfully", "id": entity.id}), 201
     else:
         return jsonify({"error": "Entity creation failed"}), 400
@@ -141,7 +148,7 @@ def update_entity(data):
 
         # Update parent_id only if parent_id is provided
         if parent_id:
-            parent_entity = Entity.query.filter_by(id=parent_id).first()
+            parent_entity = entity_index.get(parent_id)
             if not parent_entity:
                 return jsonify({"error": "Parent entity not found"}), 404
 
@@ -171,7 +178,11 @@ def update_entity(data):
         
         db.session.expunge_all()
 
-    # Return a success response after updating the entity
+    # Return a success response after updating the entity, warning about unrelated overlapping ranges
+    overlaps = entity_index.unrelated_overlaps(updated_entity.id, start_addr, end_addr)
+    if overlaps:
+        return jsonify({"success": "Entity updated successfully",
+                        "warning": "Entity range overlaps unrelated entities", "overlaps": overlaps}), 200
     return jsonify({"success": "Entity updated successfully"}), 200
 
 def delete_entity(data):
@@ -215,40 +226,11 @@ def get_entities():
     Flask Response: JSON response containing a list of all entities and their states.
     """
 
-    # Fetching all entities from the database
-    entities = Entity.query.all()
-    entities_data = []
-
-    for entity in entities:
-        # Fetching the most recent light state for each entity
-        entity_state = LightState.query.filter_by(entity_id=entity.id).order_by(LightState.timestamp.desc()).first()
-
-        # Preparing the state data in JSON format
-        if entity_state:
-            entity_state_json = {
-                "is_on": entity_state.is_on, 
-                "red": entity_state.red, 
-                "green": entity_state.green, 
-                "blue": entity_state.blue, 
-                "brightness": entity_state.brightness
-            }
-        else:
-            entity_state_json = {"is_on": False, "red": 0, "green": 0, "blue": 0, "brightness": 0}
-
-        # Preparing the entity data including its state
-        entity_data = {
-            "id": entity.id,
-            "name": entity.name,
-            "start_addr": entity.start_addr,
-            "end_addr": entity.end_addr,
-            "parent_id": entity.parent.id if entity.parent else None,
-            "state": entity_state_json
-        }
-
-        entities_data.append(entity_data)
+    def build():
+        # Fetching all entities, their parent and their current light state in a single query
+        return [serialize_entity(entity, parent_id, entity_state) for entity, parent_id, entity_state in query_entities().all()], 200
 
-    # Return a response with the list of entities and their states
-    return jsonify(entities_data), 200
+    return cached_response('entities', build)
 
 def get_entity(entity_id):
     """
@@ -261,14 +243,75 @@ def get_entity(entity_id):
     Flask Response: JSON response containing the entity and its state.
     """
 
-    # Fetch the entity by its ID
-    entity = Entity.query.filter_by(id=entity_id).first()
+    def build():
+        # Fetch the entity, its parent and its current light state in a single query
+        row = query_entities().filter(Entity.id == entity_id).first()
+        if not row:
+            return {"error": "Entity not found"}, 404
+        return serialize_entity(*row), 200
+
+    return cached_response(('entity', entity_id), build)
+
+def cached_response(key, build):
+    """
+    Serve a JSON response that only changes with the state version.
+
+    The response carries the version as its ETag; a request whose
+    If-None-Match holds it gets an empty 304. Otherwise a successful body
+    serialized for the current version is reused, and build() only runs
+    after the version changed. Each body is stored with the version it was
+    built for, so a body built while the version moved on is never served
+    under the newer ETag; error responses are not cached at all.
+
+    Parameters:
+    key (hashable): Identifies the response among those cached.
+    build (function): Returns the (data, status) of the response.
+
+    Returns:
+    tuple: The JSON response, or an empty one for a 304, and the status code.
+    """
+
+    # Read the version before building, so a concurrent change can only make the body newer than its tag
+    etag = state_version.etag(current_app.framebuffer)
+    if has_request_context() and request.if_none_match.contains(etag):
+        response, status = Response(), 304
+    else:
+        cache = current_app.response_cache
+        if cache.get('etag') != etag:
+            # Bodies of older versions are never served again
+            cache.clear()
+            cache['etag'] = etag
+        cached = cache.get(key)
+        if cached is not None and cached[0] == etag:
+            body, status = cached[1:]
+        else:
+            data, status = build()
+            body = current_app.json.dumps(data)
+            if status == 200 and cache.get('etag') == etag:
+                cache[key] = (etag, body, status)
+        response = Response(body, mimetype='application/json')
 
-    if not entity:
-        return jsonify({"error": "Entity not found"}), 404
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response, status
 
-    # Fetch the most recent light state for the entity
-    entity_state = LightState.query.filter_by(entity_id=entity.id).order_by(LightState.timestamp.desc()).first()
+def query_entities():
+    """
+    Build a query of (Entity, parent ID, CurrentLightState) rows ordered by entity ID.
+
+    The parent is joined rather than loaded through the relationship so that
+    a parent which no longer exists is reported as None, without a query per entity.
+    """
+    parent = aliased(Entity)
+    return db.session.query(Entity, parent.id, CurrentLightState) \
+        .outerjoin(parent, Entity.parent_id == parent.id) \
+        .outerjoin(CurrentLightState, CurrentLightState.entity_id == Entity.id) \
+        .order_by(Entity.id)
+
+def serialize_entity(entity, parent_id, entity_state):
+    """
+    Prepare the JSON data of an entity including its state.
+    """
 
     # Preparing the state data in JSON format
     if entity_state:
@@ -282,15 +325,11 @@ def get_entity(entity_id):
     else:
         entity_state_json = {"is_on": False, "red": 0, "green": 0, "blue": 0, "brightness": 0}
 
-    # Preparing the entity data including its state
-    entity_data = {
+    return {
         "id": entity.id,
         "name": entity.name,
         "start_addr": entity.start_addr,
         "end_addr": entity.end_addr,
-        "parent_id": entity.parent.id if entity.parent else None,
+        "parent_id": parent_id,
         "state": entity_state_json
     }
-
-    # Return a response with the entity and its state
-    return jsonify(entity_data), 200
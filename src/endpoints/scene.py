@@ -0,0 +1,166 @@
+# src/endpoints/scene.py
+
+import zlib
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import insert
+from ..util.latest_light_states import latest_light_states
+from ..models import Scene, LightState, CurrentLightState
+from ..entity_index import entity_index
+from ..database import db
+from .color import showFrame
+
+
+scene_bp = Blueprint('scene', __name__)
+
+@scene_bp.route('/scene/', methods=['POST', 'DELETE', 'GET'])
+def manage_scene():
+    """
+    Endpoint to capture, delete, or list scenes.
+
+    Depending on the request method, different operations are performed:
+    POST - Capture the current strip and entity states as a new scene
+    DELETE - Delete a scene
+    GET - List the stored scenes
+
+    Returns:
+    Flask Response: JSON response indicating the success or failure of the operation.
+    """
+
+    if request.method == 'GET':
+        return get_scenes()
+
+    data = request.json
+    if request.method == 'POST':
+        return capture_scene(data)
+    elif request.method == 'DELETE':
+        return delete_scene(data)
+
+@scene_bp.route('/scene/apply/', methods=['POST'])
+def apply_scene_endpoint():
+    """
+    Endpoint to apply a stored scene.
+
+    Expects a JSON payload with the key 'id' of the scene to apply.
+
+    Returns:
+    Flask Response: JSON response indicating the success or failure of applying the scene.
+    """
+    return apply_scene(request.json)
+
+def capture_scene(data):
+    """
+    Capture the current framebuffer and entity light states as a new Scene.
+
+    Parameters:
+    data (dict): A dictionary containing the following key:
+        - name (str): The name of the scene.
+
+    Returns:
+    Flask Response: JSON response indicating the success or failure of the capture.
+    """
+
+    name = data.get('name')
+    if not name:
+        return jsonify({"error": "Missing data"}), 400
+
+    # The whole strip is stored as one compressed snapshot of the framebuffer
+    frame = zlib.compress(current_app.framebuffer.snapshot())
+    entity_states = [
+        {"entity_id": state.entity_id, "is_on": state.is_on, "red": state.red, "green": state.green, "blue": state.blue, "brightness": state.brightness}
+        for state in CurrentLightState.query.order_by(CurrentLightState.entity_id).all()
+    ]
+
+    scene = Scene(name=name, frame=frame, entity_states=entity_states)
+    db.session.add(scene)
+    db.session.commit()
+
+    return jsonify({"success": "Scene captured successfully", "id": scene.id}), 201
+
+def get_scenes():
+    """
+    List the stored scenes without their snapshots.
+
+    Returns:
+    Flask Response: JSON response containing the ID, name and capture time of each scene.
+    """
+
+    scenes = db.session.query(Scene.id, Scene.name, Scene.timestamp).order_by(Scene.id).all()
+    return jsonify([
+        {"id": scene.id, "name": scene.name, "timestamp": scene.timestamp.isoformat() if scene.timestamp else None}
+        for scene in scenes
+    ]), 200
+
+def delete_scene(data):
+    """
+    Delete a stored scene.
+
+    Parameters:
+    data (dict): A dictionary containing the following key:
+        - id (int): The ID of the scene to delete.
+
+    Returns:
+    Flask Response: JSON response indicating the success or failure of the deletion.
+    """
+
+    scene_id = data.get('id')
+    if not scene_id:
+        return jsonify({"error": "Missing data"}), 400
+
+    scene = db.session.get(Scene, scene_id)
+    if not scene:
+        return jsonify({"error": "Scene not found"}), 404
+
+    db.session.delete(scene)
+    db.session.commit()
+    return jsonify({"success": "Scene deleted successfully"}), 200
+
+def apply_scene(data):
+    """
+    Restore the strip and the entity light states stored in a scene.
+
+    The snapshot is copied into the framebuffer in one operation and rendered
+    as a single frame, and the light states that differ from the current ones
+    are recorded with a single bulk insert.
+
+    Parameters:
+    data (dict): A dictionary containing the following key:
+        - id (int): The ID of the scene to apply.
+
+    Returns:
+    Flask Response: JSON response indicating the success or failure of applying the scene.
+    """
+
+    scene_id = data.get('id')
+    if not scene_id:
+        return jsonify({"error": "Missing data"}), 400
+
+    scene = db.session.get(Scene, scene_id)
+    if not scene:
+        return jsonify({"error": "Scene not found"}), 404
+
+    # Record the states that changed, skipping entities deleted since the capture
+    entity_states = [state for state in scene.entity_states if entity_index.get(state['entity_id'])]
+    current_states = latest_light_states(state['entity_id'] for state in entity_states)
+    changed = []
+    for state in entity_states:
+        current_state = current_states.get(state['entity_id'])
+        if not current_state or any(getattr(current_state, key) != state[key] for key in ('is_on', 'red', 'green', 'blue', 'brightness')):
+            changed.append(state)
+
+    if changed:
+        db.session.execute(insert(LightState), changed)
+    db.session.commit()
+
+    # Apply the snapshot to the strip; it already shows the composed layers
+    effects = current_app.effects
+    with effects.lock, current_app.framebuffer.lock:
+        # Effects running on the scene's entities would draw over it on their next frame
+        effects.cancel([state['entity_id'] for state in entity_states])
+        current_app.framebuffer.write(0, zlib.decompress(scene.frame))
+        for state in entity_states:
+            current_app.compositor.set_layers([state['entity_id']], state['red'], state['green'], state['blue'], state['brightness'], state['is_on'], compose=False)
+    for state in changed:
+        current_app.broadcaster.publish([state['entity_id']], state['red'], state['green'], state['blue'], state['brightness'], state['is_on'])
+    showFrame(current_app.strip)
+
+    return jsonify({"success": "Scene applied successfully", "id": scene.id, "updated": [state['entity_id'] for state in changed]}), 200
@@ -0,0 +1,293 @@
+# src/entity_index.py
+
+import threading
+from collections import namedtuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .models import Entity
+from .interval_tree import IntervalTree
+
+EntityRecord = namedtuple('EntityRecord', ['id', 'name', 'start_addr', 'end_addr', 'parent_id'])
+
+
+def entity_record(entity):
+    """
+    Build an immutable EntityRecord from an Entity model instance.
+    """
+    return EntityRecord(entity.id, entity.name, entity.start_addr, entity.end_addr, entity.parent_id)
+
+
+class EntityIndex:
+    """
+    Process-wide in-memory index of the entity hierarchy.
+
+    Holds every entity keyed by ID together with the children of each parent,
+    the precomputed ancestor chain and descendant set of each entity and an
+    interval tree over the entity address ranges, so the color path can
+    resolve entities and pixel ownership without querying the database.
+
+    The index is loaded once per app and kept current by the mapper events
+    below, which fire for every Entity insert, update and delete flushed by
+    the session (including those made by the entity endpoints). Changes are
+    batched and applied with a single rebuild on the next read, so bulk
+    imports stay linear. A rollback drops the index so it is reloaded from
+    the database on next use.
+
+    With a SharedFrameBuffer, other processes may change entities too. A
+    commit that changed entities bumps the 'entities' generation in the
+    shared segment, and every process reloads its index when it sees the
+    generation move.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._entities = None
+        self._pending = {}
+        self._children = {}
+        self._ancestors = {}
+        self._descendants = {}
+        self._intervals = IntervalTree([])
+        # Incremented on every rebuild so dependents can tell the hierarchy changed
+        self.version = 0
+        self.shared = None
+        self._shared_generation = None
+        self._uncommitted = False
+
+    def init_app(self, app):
+        self.shared = app.framebuffer if app.framebuffer.shared else None
+        with app.app_context():
+            self.load()
+
+    def load(self):
+        """
+        Load every entity from the database and rebuild the index.
+        """
+        with self.lock:
+            self._pending = {}
+            if self.shared is not None:
+                self._shared_generation = self.shared.counter('entities')
+            self._rebuild({entity.id: entity_record(entity) for entity in Entity.query.all()})
+
+    def invalidate(self):
+        """
+        Drop the index so it is reloaded from the database on next use.
+        """
+        with self.lock:
+            self._entities = None
+            self._pending = {}
+            self._uncommitted = False
+
+    def put(self, record):
+        """
+        Add or replace a single entity in the index.
+        """
+        with self.lock:
+            self._uncommitted = True
+            if self._entities is not None:
+                self._pending[record.id] = record
+
+    def remove(self, entity_id):
+        """
+        Remove a single entity from the index.
+        """
+        with self.lock:
+            self._uncommitted = True
+            if self._entities is not None:
+                self._pending[entity_id] = None
+
+    def committed(self):
+        """
+        Tell other processes sharing the framebuffer that entities changed, if any did.
+        """
+        with self.lock:
+            uncommitted, self._uncommitted = self._uncommitted, False
+            seen = self._shared_generation
+        if not uncommitted or self.shared is None:
+            return
+
+        # The framebuffer lock comes before the index lock (see FrameBuffer), so it is not taken while holding it
+        with self.shared.lock:
+            # The index already holds this commit's changes, so keep it unless another process changed entities too
+            current = self.shared.counter('entities') == seen
+            generation = self.shared.bump('entities')
+            with self.lock:
+                if current and self._shared_generation == seen:
+                    self._shared_generation = generation
+
+    def _rebuild(self, entities):
+        children = {}
+        for record in sorted(entities.values()):
+            if record.parent_id is not None:
+                children.setdefault(record.parent_id, []).append(record.id)
+
+        # Walk up from every entity, stopping at a missing parent or when an ID repeats (a cycle)
+        ancestors = {}
+        descendants = {entity_id: set() for entity_id in entities}
+        for entity_id, record in entities.items():
+            chain = []
+            seen = {entity_id}
+            parent_id = record.parent_id
+            while parent_id is not None and parent_id not in seen and parent_id in entities:
+                chain.append(parent_id)
+                seen.add(parent_id)
+                descendants[parent_id].add(entity_id)
+                parent_id = entities[parent_id].parent_id
+            ancestors[entity_id] = tuple(chain)
+
+        self._children = children
+        self._ancestors = ancestors
+        self._descendants = {entity_id: frozenset(ids) for entity_id, ids in descendants.items()}
+        self._intervals = IntervalTree((record.start_addr, record.end_addr, record.id) for record in entities.values())
+        self._entities = entities
+        self.version += 1
+
+    def _loaded(self):
+        with self.lock:
+            if self.shared is not None and self.shared.counter('entities') != self._shared_generation:
+                # Another process changed entities; its changes are only in the database
+                self._entities = None
+            if self._entities is None:
+                self.load()
+            elif self._pending:
+                # Apply the changes batched up since the last read in a single rebuild
+                entities = dict(self._entities)
+                for entity_id, record in self._pending.items():
+                    if record is None:
+                        entities.pop(entity_id, None)
+                    else:
+                        entities[entity_id] = record
+                self._pending = {}
+                self._rebuild(entities)
+            return self._entities
+
+    def get(self, entity_id):
+        """
+        Return the EntityRecord for an ID, or None if there is no such entity.
+        """
+        try:
+            entity_id = int(entity_id)
+        except (TypeError, ValueError):
+            return None
+        return self._loaded().get(entity_id)
+
+    def all(self):
+        """
+        Return every EntityRecord ordered by ID.
+        """
+        entities = self._loaded()
+        return [entities[entity_id] for entity_id in sorted(entities)]
+
+    def children(self, entity_id):
+        """
+        Return the IDs of the direct children of an entity.
+        """
+        self._loaded()
+        return list(self._children.get(entity_id, ()))
+
+    def ancestors(self, entity_id):
+        """
+        Return the IDs of the ancestors of an entity, nearest first.
+        """
+        self._loaded()
+        return self._ancestors.get(entity_id, ())
+
+    def subtree(self, entity_id):
+        """
+        Return the ID of an entity followed by the IDs of all its descendants.
+        """
+        return [entity_id] + sorted(self.descendants(entity_id))
+
+    def descendants(self, entity_id):
+        """
+        Return the IDs of every entity below an entity in the hierarchy.
+        """
+        self._loaded()
+        return self._descendants.get(entity_id, frozenset())
+
+    def entities_at(self, pixel):
+        """
+        Return the IDs of every entity whose address range contains a pixel.
+        """
+        self._loaded()
+        return sorted(self._intervals.at(pixel))
+
+    def overlapping(self, range_start, range_end):
+        """
+        Return the IDs of every entity whose address range overlaps an inclusive range.
+        """
+        self._loaded()
+        return sorted(self._intervals.overlapping(range_start, range_end))
+
+    def unrelated_overlaps(self, entity_id, range_start, range_end):
+        """
+        Return the IDs of the entities overlapping a range, other than the entity itself
+        and its ancestors and descendants, whose ranges are expected to overlap it.
+        """
+        related = {entity_id} | set(self.ancestors(entity_id)) | self.descendants(entity_id)
+        return [other_id for other_id in self.overlapping(range_start, range_end) if other_id not in related]
+
+    def owners(self, range_start, range_end, include=None):
+        """
+        Resolve which entity owns each pixel of an inclusive range.
+
+        Where ranges overlap, the entity deepest in the hierarchy owns the
+        pixel; between entities at the same depth the one starting later wins,
+        then the one with the higher ID.
+
+        Parameters:
+        range_start (int): The first pixel of the range.
+        range_end (int): The last pixel of the range (inclusive).
+        include (container, optional): Only entities with an ID in include can own pixels.
+
+        Returns:
+        list: (start, end, entity ID) runs covering the owned pixels of the range, in order.
+        """
+        entities = self._loaded()
+        candidates = [entities[entity_id] for entity_id in self._intervals.overlapping(range_start, range_end)
+                      if include is None or entity_id in include]
+        if not candidates:
+            return []
+
+        # Split the range wherever an entity range starts or ends
+        points = {range_start, range_end + 1}
+        for record in candidates:
+            points.add(max(record.start_addr, range_start))
+            points.add(min(record.end_addr, range_end) + 1)
+        points = sorted(points)
+
+        runs = []
+        for start, next_start in zip(points, points[1:]):
+            end = next_start - 1
+            covering = [record for record in candidates if record.start_addr <= start and record.end_addr >= end]
+            if not covering:
+                continue
+            owner = max(covering, key=lambda record: (len(self._ancestors.get(record.id, ())), record.start_addr, record.id)).id
+            if runs and runs[-1][2] == owner and runs[-1][1] == start - 1:
+                runs[-1] = (runs[-1][0], end, owner)
+            else:
+                runs.append((start, end, owner))
+        return runs
+
+
+entity_index = EntityIndex()
+
+
+@event.listens_for(Entity, 'after_insert')
+@event.listens_for(Entity, 'after_update')
+def _entity_saved(mapper, connection, target):
+    entity_index.put(entity_record(target))
+
+
+@event.listens_for(Entity, 'after_delete')
+def _entity_deleted(mapper, connection, target):
+    entity_index.remove(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _session_committed(session):
+    entity_index.committed()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _session_rolled_back(session):
+    entity_index.invalidate()
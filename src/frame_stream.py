@@ -0,0 +1,54 @@
+# src/frame_stream.py
+
+import threading
+
+
+class FrameStream:
+    """
+    Latest-frame-wins buffer for raw frames streamed over Socket.IO.
+
+    Incoming frames wait until the renderer takes them, once per frame. A
+    frame that arrives before an earlier one was rendered replaces it if it
+    covers all of its pixels, so a client sending faster than the strip can
+    show() has its stale frames dropped instead of queued. Partial frames for
+    other parts of the strip are kept and written in the order they arrived.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.lock = threading.Lock()
+        # (first pixel, last pixel, pixels, offset) of the frames not yet rendered, oldest first
+        self._pending = []
+        self.received = 0
+        self.dropped = 0
+        self.applied = 0
+
+    def push(self, pixels, offset=0):
+        """
+        Queue a packed RGB frame, replacing the frames not yet rendered that it covers.
+
+        Parameters:
+        pixels (bytes): Packed red, green, blue bytes, three per pixel.
+        offset (int): The pixel at which the frame starts, for partial frames.
+        """
+        start, end = offset, offset + len(pixels) // 3 - 1
+        with self.lock:
+            kept = [frame for frame in self._pending if frame[0] < start or frame[1] > end]
+            self.dropped += len(self._pending) - len(kept)
+            kept.append((start, end, pixels, offset))
+            self._pending = kept
+            self.received += 1
+
+    def apply(self):
+        """
+        Write the pending frames, if any, into the framebuffer.
+
+        Returns:
+        bool: True if a frame was written.
+        """
+        with self.lock:
+            pending, self._pending = self._pending, []
+        for start, end, pixels, offset in pending:
+            self.app.framebuffer.write_rgb(offset, pixels)
+            self.applied += 1
+        return bool(pending)
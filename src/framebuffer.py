@@ -0,0 +1,205 @@
+# src/framebuffer.py
+
+import threading
+
+
+class FrameBuffer:
+    """
+    Compact in-memory state of every pixel on the LED strip.
+
+    Each pixel occupies four contiguous bytes laid out as blue, green, red,
+    brightness. On little-endian hosts (the Raspberry Pi included) this makes
+    the buffer readable as the packed uint32 ``0xWWRRGGBB`` words used by
+    rpi_ws281x without copying, with the per-pixel brightness held in the
+    white byte.
+
+    Writes record the touched pixel ranges so the renderer and the database
+    writer only have to look at what changed since they last ran. Each of
+    them consumes its own list of dirty ranges, named by ``trackers``.
+
+    The framebuffer lock is one of several that paths through the color,
+    scene and effect code hold together. To keep them from deadlocking, any
+    code holding more than one takes them in this order, and never the other
+    way around:
+
+    1. the effect engine's lock (EffectEngine.lock),
+    2. the framebuffer lock (this class, or SharedFrameBuffer's ProcessLock),
+    3. the compositor's lock (Compositor.lock),
+    4. the entity index lock (EntityIndex.lock).
+    """
+
+    BYTES_PER_PIXEL = 4
+
+    # Whether the pixels live in memory shared with other processes (see SharedFrameBuffer)
+    shared = False
+
+    def __init__(self, num_pixels, trackers=('render', 'persist')):
+        self.num_pixels = num_pixels
+        self._buffer = bytearray(num_pixels * self.BYTES_PER_PIXEL)
+        self._dirty = {tracker: [] for tracker in trackers}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return self.num_pixels
+
+    def clip(self, range_start, range_end):
+        """
+        Clip an inclusive pixel range to the bounds of the buffer.
+
+        Parameters:
+        range_start (int): The first pixel of the range.
+        range_end (int): The last pixel of the range (inclusive).
+
+        Returns:
+        tuple: The clipped (start, end) pair, or None if the range lies outside the buffer.
+        """
+        start = max(int(range_start), 0)
+        end = min(int(range_end), self.num_pixels - 1)
+        if start > end:
+            return None
+        return start, end
+
+    def set_range(self, range_start, range_end, red, green, blue, brightness):
+        """
+        Set every pixel in an inclusive range to a single color and brightness.
+
+        Parameters:
+        range_start (int): The first pixel of the range.
+        range_end (int): The last pixel of the range (inclusive).
+        red (int): The red component of the color (0-255).
+        green (int): The green component of the color (0-255).
+        blue (int): The blue component of the color (0-255).
+        brightness (int): The brightness level of the color (0-100).
+
+        Returns:
+        tuple: The (start, end) pair actually written, or None if nothing was written.
+        """
+        clipped = self.clip(range_start, range_end)
+        if clipped is None:
+            return None
+        start, end = clipped
+        pixel = bytes((blue, green, red, brightness))
+        with self.lock:
+            self._buffer[start * 4:(end + 1) * 4] = pixel * (end - start + 1)
+            self.mark_dirty(start, end)
+        return clipped
+
+    def write(self, offset, data):
+        """
+        Copy raw pixel bytes (blue, green, red, brightness per pixel) into the buffer.
+
+        Parameters:
+        offset (int): The pixel at which the copy starts.
+        data (bytes-like): Packed pixel data; anything past the end of the buffer is dropped.
+
+        Returns:
+        tuple: The (start, end) pair actually written, or None if nothing was written.
+        """
+        count = min(len(data) // 4, self.num_pixels - offset)
+        if offset < 0 or count <= 0:
+            return None
+        with self.lock:
+            self._buffer[offset * 4:(offset + count) * 4] = memoryview(data)[:count * 4]
+            self.mark_dirty(offset, offset + count - 1)
+        return offset, offset + count - 1
+
+    def write_rgb(self, offset, data, brightness=100):
+        """
+        Copy packed RGB pixel data (three bytes per pixel) into the buffer.
+
+        The channels are reordered with strided slice assignments, so no
+        per-pixel Python objects are created.
+
+        Parameters:
+        offset (int): The pixel at which the copy starts.
+        data (bytes-like): Packed red, green, blue bytes; anything past the end of the buffer is dropped.
+        brightness (int): The brightness given to every written pixel (0-100).
+
+        Returns:
+        tuple: The (start, end) pair actually written, or None if nothing was written.
+        """
+        count = min(len(data) // 3, self.num_pixels - offset)
+        if offset < 0 or count <= 0:
+            return None
+        rgb = memoryview(data)[:count * 3]
+        pixels = bytearray(count * 4)
+        pixels[0::4] = rgb[2::3]
+        pixels[1::4] = rgb[1::3]
+        pixels[2::4] = rgb[0::3]
+        pixels[3::4] = bytes((brightness,)) * count
+        return self.write(offset, pixels)
+
+    def get_pixel(self, index):
+        """
+        Return the state of a single pixel as a dictionary.
+
+        Parameters:
+        index (int): The pixel index.
+
+        Returns:
+        dict: The 'red', 'green', 'blue' and 'brightness' values of the pixel.
+        """
+        blue, green, red, brightness = self._buffer[index * 4:index * 4 + 4]
+        return {'red': red, 'green': green, 'blue': blue, 'brightness': brightness}
+
+    def view(self, range_start=0, range_end=None):
+        """
+        Return a zero-copy byte view over an inclusive pixel range.
+        """
+        if range_end is None:
+            range_end = self.num_pixels - 1
+        return memoryview(self._buffer)[range_start * 4:(range_end + 1) * 4]
+
+    def colors(self, range_start=0, range_end=None):
+        """
+        Return a zero-copy view of an inclusive pixel range as packed uint32 words.
+
+        The brightness sits in the top byte of every word, so mask with
+        0xFFFFFF before handing a value to the strip.
+        """
+        return self.view(range_start, range_end).cast('I')
+
+    def snapshot(self):
+        """
+        Return a copy of the whole buffer as bytes.
+        """
+        with self.lock:
+            return bytes(self._buffer)
+
+    def swap(self, other):
+        """
+        Exchange the pixel storage of two framebuffers of the same size.
+
+        Only the storage is exchanged; each buffer keeps its own lock and dirty ranges.
+        """
+        self._buffer, other._buffer = other._buffer, self._buffer
+
+    def mark_dirty(self, range_start, range_end):
+        """
+        Record that an inclusive pixel range has changed.
+        """
+        with self.lock:
+            for ranges in self._dirty.values():
+                ranges.append((range_start, range_end))
+
+    def take_dirty(self, tracker='render'):
+        """
+        Return the merged list of ranges changed since the last call and reset it.
+
+        Parameters:
+        tracker (str): The consumer whose dirty ranges are taken.
+
+        Returns:
+        list: Sorted, non-overlapping inclusive (start, end) pairs.
+        """
+        with self.lock:
+            ranges, self._dirty[tracker] = self._dirty[tracker], []
+
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
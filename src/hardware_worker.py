@@ -0,0 +1,146 @@
+# src/hardware_worker.py
+
+import logging
+import queue
+from .socket import socketio
+
+logger = logging.getLogger(__name__)
+
+
+def blocking_call(async_mode):
+    """
+    Return a function that makes a blocking call without stalling the server.
+
+    Under eventlet and gevent a call into the LED driver would hold up every
+    green thread until it returns, so it is handed to a native thread pool.
+    Under threading the call is simply made.
+
+    Parameters:
+    async_mode (str): The async mode the Socket.IO server runs under.
+
+    Returns:
+    function: Called as call(function, *args), returning the result of function(*args).
+    """
+    if async_mode == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute
+    if async_mode == 'gevent':
+        import gevent
+        return lambda function, *args: gevent.get_hub().threadpool.apply(function, args)
+    return lambda function, *args: function(*args)
+
+
+class HardwareWorker:
+    """
+    Single writer to the LED strip.
+
+    Every strip operation is sent to the worker as a command over a bounded
+    queue and run, one at a time, by its background task, so request
+    handlers and the render loop never wait on the strip and no two callers
+    ever drive it at once. A command is a callable taking the strip as its
+    first argument.
+
+    submit() never blocks: when the queue is full the command is refused and
+    the caller decides what to do with it.
+
+    With several output channels there is one worker per channel, so their
+    show() calls overlap. Each worker covers num_pixels pixels of the global
+    address space starting at offset, and may correct colors for its own
+    strip with its own color_correction.
+    """
+
+    def __init__(self, strip, queue_size=2, offset=0, num_pixels=None, color_correction=None):
+        self.strip = strip
+        self.offset = offset
+        self.num_pixels = num_pixels
+        self.color_correction = color_correction
+        self.queue = queue.Queue(queue_size)
+        self.commands = 0
+        self.refused = 0
+        self.running = False
+        self._call = blocking_call(getattr(socketio, 'async_mode', None))
+
+    def submit(self, command, *args):
+        """
+        Queue a command to be run against the strip.
+
+        Parameters:
+        command (callable): Called as command(strip, *args) by the worker.
+
+        Returns:
+        bool: Whether the command was queued; False if the queue is full.
+        """
+        try:
+            self.queue.put_nowait((command, args))
+        except queue.Full:
+            self.refused += 1
+            return False
+        return True
+
+    def window(self, ranges, total_pixels):
+        """
+        Clip global pixel ranges to the part of the address space this worker covers.
+
+        Parameters:
+        ranges (list): Sorted inclusive (start, end) pairs of global addresses.
+        total_pixels (int): The size of the global address space.
+
+        Returns:
+        list: The clipped inclusive (start, end) pairs, in addresses local to the strip.
+        """
+        first = self.offset
+        last = first + (self.num_pixels if self.num_pixels is not None else total_pixels - first) - 1
+        return [(max(start, first) - first, min(end, last) - first)
+                for start, end in ranges if start <= last and end >= first]
+
+    def busy(self):
+        """
+        Return whether the queue is full, so the next command would be refused.
+        """
+        return self.queue.full()
+
+    def run_pending(self):
+        """
+        Run the queued commands in the calling thread.
+
+        Only for use while the background task is not running.
+
+        Returns:
+        int: The number of commands run.
+        """
+        count = 0
+        while True:
+            try:
+                command, args = self.queue.get_nowait()
+            except queue.Empty:
+                return count
+            self._execute(command, args)
+            count += 1
+
+    def _execute(self, command, args):
+        try:
+            self._call(command, self.strip, *args)
+        except Exception as e:
+            logger.error("Strip command failed: " + str(e))
+        self.commands += 1
+
+    def run(self):
+        """
+        Run queued commands as they arrive until stop() is called.
+        """
+        self.running = True
+        while self.running:
+            try:
+                command, args = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self._execute(command, args)
+
+    def start(self):
+        """
+        Start the worker as a background task.
+        """
+        return socketio.start_background_task(self.run)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,82 @@
+# src/interval_tree.py
+
+
+class IntervalTree:
+    """
+    Static centered interval tree over inclusive integer intervals.
+
+    Built once from a list of (start, end, value) tuples; answers which
+    intervals contain a point or overlap a range in O(log n + k).
+    """
+
+    def __init__(self, intervals):
+        intervals = [(start, end, value) for start, end, value in intervals if start <= end]
+        self.size = len(intervals)
+        self._root = self._build(intervals)
+
+    def __len__(self):
+        return self.size
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+
+        # Split around the median endpoint; intervals containing it stay in this node
+        endpoints = sorted(point for start, end, _ in intervals for point in (start, end))
+        center = endpoints[len(endpoints) // 2]
+
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        return (
+            center,
+            sorted(here, key=lambda interval: interval[0]),
+            sorted(here, key=lambda interval: interval[1], reverse=True),
+            self._build(left),
+            self._build(right)
+        )
+
+    def at(self, point):
+        """
+        Return the values of every interval containing a point.
+        """
+        return self.overlapping(point, point)
+
+    def overlapping(self, range_start, range_end):
+        """
+        Return the values of every interval overlapping an inclusive range.
+        """
+        found = []
+        pending = [self._root]
+        while pending:
+            node = pending.pop()
+            if node is None:
+                continue
+            center, by_start, by_end, left, right = node
+
+            if range_end < center:
+                # Only intervals starting at or before the end of the range can overlap it
+                for start, end, value in by_start:
+                    if start > range_end:
+                        break
+                    found.append(value)
+                pending.append(left)
+            elif range_start > center:
+                # Only intervals ending at or after the start of the range can overlap it
+                for start, end, value in by_end:
+                    if end < range_start:
+                        break
+                    found.append(value)
+                pending.append(right)
+            else:
+                # The range contains the center, and so overlaps every interval here
+                found.extend(value for _, _, value in by_start)
+                pending.append(left)
+                pending.append(right)
+        return found
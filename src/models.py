@@ -1,3 +1,4 @@
+from sqlalchemy import event, text
 from .database import db
 
 class LightState(db.Model):
@@ -10,6 +11,26 @@ class LightState(db.Model):
     brightness = db.Column(db.Integer, default=0)
     timestamp = db.Column(db.DateTime, default=db.func.current_timestamp())
 
+    __table_args__ = (
+        db.Index('ix_light_state_entity_id_timestamp', 'entity_id', 'timestamp'),
+    )
+
+class CurrentLightState(db.Model):
+    """
+    The most recent LightState of each entity.
+
+    Maintained by a database trigger on light_state inserts, so it is always
+    written in the same transaction as the history row.
+    """
+    entity_id = db.Column(db.Integer, db.ForeignKey('entity.id'), primary_key=True)
+    light_state_id = db.Column(db.Integer, nullable=False)
+    is_on = db.Column(db.Boolean, default=False)
+    red = db.Column(db.Integer, default=0)
+    green = db.Column(db.Integer, default=0)
+    blue = db.Column(db.Integer, default=0)
+    brightness = db.Column(db.Integer, default=0)
+    timestamp = db.Column(db.DateTime)
+
 class Entity(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
@@ -20,9 +41,42 @@ class Entity(db.Model):
     # Define the relationship (self-referential)
     parent = db.relationship('Entity', remote_side=[id], backref=db.backref('children', lazy='dynamic'))
 
+class Scene(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    # zlib-compressed framebuffer snapshot, four bytes per pixel
+    frame = db.Column(db.LargeBinary, nullable=False)
+    # The light state of every entity when the scene was captured
+    entity_states = db.Column(db.JSON, nullable=False, default=list)
+    timestamp = db.Column(db.DateTime, default=db.func.current_timestamp())
+
 class Address(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     red = db.Column(db.Integer, default=0)
     green = db.Column(db.Integer, default=0)
     blue = db.Column(db.Integer, default=0)
-    brightness = db.Column(db.Integer, default=0)
\ No newline at end of file
+    brightness = db.Column(db.Integer, default=0)
+
+@event.listens_for(db.metadata, 'after_create')
+def create_current_light_state_trigger(target, connection, tables=(), **kw):
+    # Databases created before the index was declared only get it here
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_light_state_entity_id_timestamp ON light_state (entity_id, timestamp)"))
+
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS light_state_set_current AFTER INSERT ON light_state
+        WHEN NEW.entity_id IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO current_light_state (entity_id, light_state_id, is_on, red, green, blue, brightness, timestamp)
+            VALUES (NEW.entity_id, NEW.id, NEW.is_on, NEW.red, NEW.green, NEW.blue, NEW.brightness, NEW.timestamp);
+        END
+    """))
+
+    # Fill a newly created projection from any history recorded before it existed
+    if CurrentLightState.__table__ in tables:
+        connection.execute(text("""
+            INSERT OR REPLACE INTO current_light_state (entity_id, light_state_id, is_on, red, green, blue, brightness, timestamp)
+            SELECT entity_id, id, is_on, red, green, blue, brightness, timestamp FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY entity_id ORDER BY timestamp DESC, id DESC) AS rank
+                FROM light_state WHERE entity_id IS NOT NULL
+            ) WHERE rank = 1
+        """))
\ No newline at end of file
@@ -0,0 +1,95 @@
+# src/persistence.py
+
+import threading
+from sqlalchemy.dialects.sqlite import insert
+from .database import db
+from .models import Address
+from .socket import socketio
+
+
+class AddressPersister:
+    """
+    Write-behind persistence of the framebuffer to the Address table.
+
+    Only the pixels changed since the last flush are written, as a single
+    bulk upsert, and copied into the framebuffer snapshot file. When
+    started, flushes happen in a background task every ``interval``
+    seconds, so request handlers never wait on the database; stop()
+    performs a final flush so no state is lost on shutdown.
+    """
+
+    def __init__(self, app, interval=1.0):
+        self.app = app
+        self.interval = interval
+        self.running = False
+        self.lock = threading.Lock()
+
+    def flush(self):
+        """
+        Write the pixels changed since the last flush to the database.
+
+        Returns:
+        int: The number of Address rows written.
+        """
+        with self.lock:
+            framebuffer = self.app.framebuffer
+            ranges = framebuffer.take_dirty('persist')
+            if not ranges:
+                return 0
+
+            rows = []
+            with framebuffer.lock:
+                for start, end in ranges:
+                    pixels = framebuffer.view(start, end)
+                    for offset in range(end - start + 1):
+                        blue, green, red, brightness = pixels[offset * 4:offset * 4 + 4]
+                        rows.append({'id': start + offset, 'red': red, 'green': green, 'blue': blue, 'brightness': brightness})
+
+                # The snapshot is restored from first on startup, so keep it in step with the table
+                if self.app.snapshot is not None:
+                    self.app.snapshot.save(framebuffer, ranges)
+
+            statement = insert(Address)
+            statement = statement.on_conflict_do_update(
+                index_elements=[Address.id],
+                set_={column: statement.excluded[column] for column in ('red', 'green', 'blue', 'brightness')}
+            )
+
+            try:
+                with self.app.app_context():
+                    db.session.execute(statement, rows)
+                    db.session.commit()
+            except Exception:
+                # Keep the ranges pending so the next flush retries them
+                for start, end in ranges:
+                    framebuffer.mark_dirty(start, end)
+                raise
+
+            if self.app.snapshot is not None:
+                self.app.snapshot.flush()
+            return len(rows)
+
+    def run(self):
+        """
+        Flush at the configured interval until stop() is called.
+        """
+        self.running = True
+        while self.running:
+            socketio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error("Failed to persist pixel state: " + str(e))
+
+    def start(self):
+        """
+        Start the write-behind loop as a background task.
+        """
+        return socketio.start_background_task(self.run)
+
+    def stop(self):
+        """
+        Stop the write-behind loop and flush any pending changes.
+        """
+        self.running = False
+        return self.flush()
@@ -0,0 +1,170 @@
+# src/renderer.py
+
+import logging
+import threading
+import time
+from .framebuffer import FrameBuffer
+from .socket import socketio
+from .util.render_dirty_ranges import render_dirty_ranges
+
+logger = logging.getLogger(__name__)
+
+
+class Renderer:
+    """
+    Single owner of the LED strip, rendering the framebuffer at a fixed frame rate.
+
+    Request handlers write into the back buffer (app.framebuffer) and return.
+    When the back buffer is a SharedFrameBuffer, they may run in other processes.
+    Once per frame the renderer swaps the back buffer with its private front
+    buffer, so every change made since the previous frame is published at
+    once, and pushes the changed ranges of the front buffer to the strip with
+    a single show().
+
+    Sources are callables run at the start of every frame, before the swap,
+    for producers that write into the back buffer on the frame clock.
+
+    With HardwareWorkers, one per output channel, the renderer only keeps
+    the frame clock: each frame is split by channel and handed to the
+    workers, which own the strips, as copies of the changed ranges. While any
+    worker is still busy with earlier frames the swap is skipped, so the
+    changes stay pending and are coalesced into the next frame, keeping the
+    channels in step.
+    """
+
+    def __init__(self, strip, framebuffer, color_correction=None, frame_rate=60, workers=None):
+        self.strip = strip
+        self.workers = list(workers or [])
+        self.back = framebuffer
+        # Only the renderer consumes the front buffer's changes, so it tracks them for rendering alone
+        self.front = FrameBuffer(len(framebuffer), trackers=('render',))
+        self.front.write(0, framebuffer.view())
+        self.front.take_dirty()
+        self._sequence = None
+        self.color_correction = color_correction
+        self.frame_interval = 1.0 / frame_rate
+        self.frames = 0
+        self.sources = []
+        self.running = False
+        self.lock = threading.Lock()
+
+    def swap(self):
+        """
+        Publish the changes made to the back buffer since the last frame.
+
+        Returns:
+        list: The inclusive (start, end) pixel ranges that changed.
+        """
+        back, front = self.back, self.front
+        if back.shared:
+            return self._copy_shared()
+
+        with back.lock:
+            ranges = back.take_dirty()
+            if not ranges:
+                return ranges
+
+            back.swap(front)
+
+            # The new back buffer is one frame behind; catch up on the ranges that changed
+            for start, end in ranges:
+                back.view(start, end)[:] = front.view(start, end)
+                front.mark_dirty(start, end)
+        return ranges
+
+    def _copy_shared(self):
+        # A shared back buffer cannot trade storage with the front buffer, so the
+        # changed ranges are copied out instead; an unchanged sequence number
+        # means nothing was written, which is checked without taking the lock
+        back, front = self.back, self.front
+        if back.sequence() == self._sequence:
+            return []
+        with back.lock:
+            ranges = back.take_dirty()
+            for start, end in ranges:
+                front.view(start, end)[:] = back.view(start, end)
+                front.mark_dirty(start, end)
+            # Releasing the lock bumps the sequence number once more
+            self._sequence = back.sequence() + 1
+        return ranges
+
+    def render_frame(self):
+        """
+        Swap the buffers and render the resulting frame to the strip.
+
+        Returns:
+        list: The inclusive (start, end) pixel ranges that were rendered.
+        """
+        with self.lock:
+            for source in list(self.sources):
+                try:
+                    source()
+                except Exception as e:
+                    # The changes of the other sources are still shown
+                    logger.error("Frame source failed: " + str(e))
+            if not self.workers:
+                if not self.swap():
+                    return []
+                ranges = render_dirty_ranges(self.strip, self.front, self.color_correction)
+            else:
+                if any(worker.busy() for worker in self.workers):
+                    return []
+                ranges = self.swap()
+                if not ranges:
+                    return []
+                self.submit_frame()
+            self.frames += 1
+            return ranges
+
+    def submit_frame(self):
+        """
+        Hand the ranges of the front buffer changed by the last swap to the workers.
+
+        Each worker gets a copy of the part of the ranges on its strip, as the
+        front buffer is swapped again next frame. If a worker refuses it, its
+        ranges are marked dirty again so the next frame picks them up.
+        """
+        ranges = self.front.take_dirty()
+        for worker in self.workers:
+            local = worker.window(ranges, len(self.front))
+            if not local:
+                continue
+
+            frame = FrameBuffer(local[-1][1] + 1, trackers=('render',))
+            for start, end in local:
+                frame.write(start, self.front.view(worker.offset + start, worker.offset + end))
+
+            color_correction = worker.color_correction or self.color_correction
+            if not worker.submit(render_dirty_ranges, frame, color_correction):
+                for start, end in local:
+                    self.back.mark_dirty(worker.offset + start, worker.offset + end)
+
+    def run(self):
+        """
+        Render frames at the configured rate until stop() is called.
+        """
+        self.running = True
+        next_frame = time.monotonic()
+        while self.running:
+            try:
+                self.render_frame()
+            except Exception as e:
+                # Keep rendering later frames rather than freezing the strip until a restart
+                logger.error("Failed to render frame: " + str(e))
+
+            next_frame += self.frame_interval
+            delay = next_frame - time.monotonic()
+            if delay > 0:
+                socketio.sleep(delay)
+            else:
+                # Rendering fell behind; start counting from now instead of bursting to catch up
+                next_frame = time.monotonic()
+
+    def start(self):
+        """
+        Start the render loop as a background task.
+        """
+        return socketio.start_background_task(self.run)
+
+    def stop(self):
+        self.running = False
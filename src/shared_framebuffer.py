@@ -0,0 +1,202 @@
+# src/shared_framebuffer.py
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+from .framebuffer import FrameBuffer
+
+MAGIC = b'LEDSHM\x00\x01'
+# magic, pixel count, tracker count, dirty range capacity, sequence, then one generation per name in COUNTERS
+HEADER = struct.Struct('<8sIII4xQQQ')
+COUNTERS = ('entities', 'states')
+SEQUENCE_OFFSET = 24
+RANGES = struct.Struct('<II')
+
+
+class ProcessLock:
+    """
+    Re-entrant lock held across threads and processes.
+
+    Threads of one process are serialized by an RLock; the outermost
+    acquisition in a process also takes an exclusive flock() on the shared
+    file, which serializes processes. on_acquire and on_release run while
+    the lock is held exclusively.
+    """
+
+    def __init__(self, fd, on_acquire, on_release):
+        self._fd = fd
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._owner = None
+        self._on_acquire = on_acquire
+        self._on_release = on_release
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            self._owner = threading.get_ident()
+            self._on_acquire()
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._on_release()
+            self._owner = None
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+
+    def held(self):
+        """
+        Return whether the calling thread holds the lock.
+        """
+        return self._owner == threading.get_ident()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class SharedFrameBuffer(FrameBuffer):
+    """
+    FrameBuffer kept in a memory-mapped file shared between processes.
+
+    Several API processes write into the same segment and one renderer
+    process, the only one driving the strip, reads it. The segment holds a
+    header, a bounded list of dirty ranges per tracker (overflowing to "all
+    dirty") and the pixels in the same layout as FrameBuffer.
+
+    Writers serialize on a ProcessLock and bump the sequence number in the
+    header on entering and leaving it, so it is odd while a write is under
+    way. snapshot() uses it as a seqlock to copy the pixels without taking
+    the lock, and the renderer compares it between frames to skip idle
+    frames without contending with writers.
+
+    The header also holds generation counters that processes bump to tell
+    the others that entities or light states changed in the database.
+    """
+
+    shared = True
+
+    def __init__(self, path, num_pixels, trackers=('render', 'persist'), capacity=1024):
+        self.path = path
+        self.num_pixels = num_pixels
+        self.trackers = tuple(trackers)
+        self.capacity = capacity
+        self._tracker_size = RANGES.size + capacity * RANGES.size
+        self._pixels_offset = HEADER.size + len(self.trackers) * self._tracker_size
+        self.size = self._pixels_offset + num_pixels * self.BYTES_PER_PIXEL
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != self.size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self.size)
+            self._map = mmap.mmap(self._fd, self.size)
+            magic, pixels, num_trackers, ranges = HEADER.unpack_from(self._map, 0)[:4]
+            if (magic, pixels, num_trackers, ranges) != (MAGIC, num_pixels, len(self.trackers), capacity):
+                # Created by a process with another layout; start from a blank segment
+                self._map[:] = bytes(self.size)
+                HEADER.pack_into(self._map, 0, MAGIC, num_pixels, len(self.trackers), capacity, 0, 0, 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        self._buffer = memoryview(self._map)[self._pixels_offset:self.size]
+        self.lock = ProcessLock(self._fd, self._bump_sequence, self._bump_sequence)
+
+    def _bump_sequence(self):
+        struct.pack_into('<Q', self._map, SEQUENCE_OFFSET, self.sequence() + 1)
+
+    def sequence(self):
+        """
+        Return the sequence number, which changes whenever the lock is taken and is odd while it is held.
+        """
+        return struct.unpack_from('<Q', self._map, SEQUENCE_OFFSET)[0]
+
+    def counter(self, name):
+        """
+        Return a generation counter from the header.
+        """
+        return struct.unpack_from('<Q', self._map, SEQUENCE_OFFSET + 8 * (1 + COUNTERS.index(name)))[0]
+
+    def bump(self, name):
+        """
+        Increment a generation counter, telling the other processes something changed.
+
+        Returns:
+        int: The new value of the counter.
+        """
+        offset = SEQUENCE_OFFSET + 8 * (1 + COUNTERS.index(name))
+        with self.lock:
+            value = struct.unpack_from('<Q', self._map, offset)[0] + 1
+            struct.pack_into('<Q', self._map, offset, value)
+        return value
+
+    def snapshot(self):
+        """
+        Return a consistent copy of the whole buffer without taking the lock.
+
+        The copy is retried until no write overlapped it.
+        """
+        if self.lock.held():
+            return bytes(self._buffer)
+        while True:
+            sequence = self.sequence()
+            if sequence % 2 == 0:
+                data = bytes(self._buffer)
+                if self.sequence() == sequence:
+                    return data
+            os.sched_yield()
+
+    def swap(self, other):
+        # Trading the mapped storage for a private buffer would detach this process from the segment
+        raise TypeError("Shared storage cannot be swapped; copy the changed ranges instead")
+
+    def mark_dirty(self, range_start, range_end):
+        """
+        Record that an inclusive pixel range has changed, for every tracker.
+        """
+        with self.lock:
+            for index in range(len(self.trackers)):
+                offset = HEADER.size + index * self._tracker_size
+                count, overflow = RANGES.unpack_from(self._map, offset)
+                if count < self.capacity:
+                    RANGES.pack_into(self._map, offset + RANGES.size * (count + 1), range_start, range_end)
+                    RANGES.pack_into(self._map, offset, count + 1, overflow)
+                else:
+                    RANGES.pack_into(self._map, offset, count, 1)
+
+    def take_dirty(self, tracker='render'):
+        """
+        Return the merged list of ranges changed since the last call and reset it.
+
+        If more ranges were recorded than fit in the segment, the whole buffer is returned.
+        """
+        offset = HEADER.size + self.trackers.index(tracker) * self._tracker_size
+        with self.lock:
+            count, overflow = RANGES.unpack_from(self._map, offset)
+            ranges = [RANGES.unpack_from(self._map, offset + RANGES.size * (index + 1)) for index in range(count)]
+            RANGES.pack_into(self._map, offset, 0, 0)
+
+        if overflow:
+            return [(0, self.num_pixels - 1)]
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    def close(self):
+        self._buffer.release()
+        self._map.close()
+        os.close(self._fd)
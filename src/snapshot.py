@@ -0,0 +1,97 @@
+# src/snapshot.py
+
+import mmap
+import os
+import struct
+import threading
+
+MAGIC = b'LEDFB\x00\x00\x01'
+HEADER = struct.Struct('<8sI4x')
+
+
+class FramebufferSnapshot:
+    """
+    Compact on-disk copy of the framebuffer, kept in a memory-mapped file.
+
+    The file holds a 16 byte header (magic and pixel count) followed by the
+    raw framebuffer bytes. Saving copies only the changed ranges into the
+    mapping, so it costs no more than the change itself, and restoring is a
+    single copy out of it. The snapshot survives a crash of the process as
+    soon as it is written; flush() also syncs it to disk.
+    """
+
+    def __init__(self, path, num_pixels):
+        self.path = path
+        self.num_pixels = num_pixels
+        self.size = HEADER.size + num_pixels * 4
+        self.lock = threading.Lock()
+        self._map = None
+
+    def _open(self):
+        if self._map is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size != self.size:
+                    # A snapshot of a different strip length is useless; start over
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self.size)
+                self._map = mmap.mmap(fd, self.size)
+            finally:
+                os.close(fd)
+        return self._map
+
+    def valid(self):
+        """
+        Return whether the file holds a complete snapshot of a strip of this length.
+        """
+        if not os.path.exists(self.path) or os.path.getsize(self.path) != self.size:
+            return False
+        with self.lock:
+            magic, num_pixels = HEADER.unpack_from(self._open(), 0)
+        return magic == MAGIC and num_pixels == self.num_pixels
+
+    def load(self, framebuffer):
+        """
+        Copy the snapshot into a framebuffer.
+
+        Returns:
+        bool: Whether a snapshot was restored.
+        """
+        if not self.valid():
+            return False
+        with self.lock:
+            framebuffer.write(0, memoryview(self._open())[HEADER.size:])
+        return True
+
+    def save(self, framebuffer, ranges):
+        """
+        Copy the given inclusive pixel ranges of a framebuffer into the snapshot.
+
+        The first save after the file was created copies the whole buffer,
+        so the snapshot is complete before its header marks it valid. A
+        framebuffer of another length than the snapshot is not saved.
+        """
+        if len(framebuffer) != self.num_pixels:
+            return
+        with self.lock:
+            snapshot = self._open()
+            if HEADER.unpack_from(snapshot, 0)[0] != MAGIC:
+                ranges = [(0, self.num_pixels - 1)]
+            with framebuffer.lock:
+                for start, end in ranges:
+                    snapshot[HEADER.size + start * 4:HEADER.size + (end + 1) * 4] = framebuffer.view(start, end)
+            HEADER.pack_into(snapshot, 0, MAGIC, self.num_pixels)
+
+    def flush(self):
+        with self.lock:
+            if self._map is not None:
+                self._map.flush()
+
+    def close(self):
+        with self.lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
@@ -0,0 +1,71 @@
+# src/state_version.py
+
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Tables whose rows make up the entity responses; writes to them change the state version
+VERSIONED_TABLES = frozenset(['entity', 'light_state', 'current_light_state'])
+
+
+class StateVersion:
+    """
+    Monotonically increasing version of the entities and their light states.
+
+    Every commit that wrote an entity or a light state, whether through the
+    entity and color endpoints or directly, bumps the version; the session
+    events below detect those writes. The version backs the ETags and
+    cached bodies of the entity responses.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+
+    def bump(self):
+        with self.lock:
+            self.version += 1
+            return self.version
+
+    def etag(self, framebuffer=None):
+        """
+        Return an entity tag identifying the current state.
+
+        With a SharedFrameBuffer, the generations bumped by other processes
+        are part of the tag, so their changes also invalidate it.
+        """
+        parts = [self.version]
+        if framebuffer is not None and framebuffer.shared:
+            parts.extend((framebuffer.counter('entities'), framebuffer.counter('states')))
+        return 'v' + '-'.join(str(part) for part in parts)
+
+
+state_version = StateVersion()
+
+
+@event.listens_for(Session, 'after_flush')
+def _session_flushed(session, flush_context):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if getattr(instance, '__tablename__', None) in VERSIONED_TABLES:
+            session.info['state_changed'] = True
+            return
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _session_executed(orm_execute_state):
+    # Bulk statements such as insert(LightState) bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if getattr(table, 'name', None) in VERSIONED_TABLES:
+            orm_execute_state.session.info['state_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _session_committed(session):
+    if session.info.pop('state_changed', False):
+        state_version.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _session_rolled_back(session):
+    session.info.pop('state_changed', None)
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import func, cast, Integer
+from ..models import LightState, CurrentLightState
+from ..database import db
+
+def compact_light_state_history(now=None):
+    """
+    Apply the LightState retention policy from the app config.
+
+    - LIGHT_STATE_DOWNSAMPLE_AFTER_DAYS: history older than this is downsampled to the
+      last state of each entity per LIGHT_STATE_DOWNSAMPLE_BUCKET_SECONDS bucket.
+    - LIGHT_STATE_MAX_AGE_DAYS: history older than this is deleted.
+    - LIGHT_STATE_MAX_ROWS_PER_ENTITY: only this many of the newest states are kept per entity.
+
+    A setting of None disables its rule. The current state of every entity is always kept.
+    The caller commits the session.
+
+    Parameters:
+    now (datetime, optional): The reference time in UTC, defaults to the current time.
+
+    Returns:
+    int: The number of LightState rows deleted.
+    """
+
+    if now is None:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    config = current_app.config
+    deleted = 0
+
+    # Downsample old history to one state per entity and time bucket
+    downsample_after = config.get('LIGHT_STATE_DOWNSAMPLE_AFTER_DAYS')
+    bucket_seconds = config.get('LIGHT_STATE_DOWNSAMPLE_BUCKET_SECONDS')
+    if downsample_after is not None and bucket_seconds:
+        bucket = cast(func.strftime('%s', LightState.timestamp), Integer) // int(bucket_seconds)
+        deleted += _delete_ranked(
+            partition_by=(LightState.entity_id, bucket),
+            min_rank=2,
+            criteria=[LightState.timestamp < now - timedelta(days=downsample_after)]
+        )
+
+    # Delete history past the maximum age
+    max_age = config.get('LIGHT_STATE_MAX_AGE_DAYS')
+    if max_age is not None:
+        deleted += _delete(LightState.timestamp < now - timedelta(days=max_age))
+
+    # Keep only the newest rows of each entity
+    max_rows = config.get('LIGHT_STATE_MAX_ROWS_PER_ENTITY')
+    if max_rows is not None:
+        deleted += _delete_ranked(partition_by=(LightState.entity_id,), min_rank=max_rows + 1)
+
+    return deleted
+
+def _delete_ranked(partition_by, min_rank, criteria=()):
+    # Rank the states of each partition newest first and delete those ranked min_rank or lower
+    ranked = db.session.query(
+        LightState.id,
+        func.row_number().over(partition_by=partition_by, order_by=(LightState.timestamp.desc(), LightState.id.desc())).label('rank')
+    ).filter(*criteria).subquery()
+    return _delete(LightState.id.in_(db.session.query(ranked.c.id).filter(ranked.c.rank >= min_rank)))
+
+def _delete(criterion):
+    current_ids = db.session.query(CurrentLightState.light_state_id)
+    return LightState.query.filter(criterion, LightState.id.notin_(current_ids)).delete(synchronize_session=False)
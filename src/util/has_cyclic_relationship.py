@@ -1,37 +1,72 @@
-from ..models import Entity
-from flask import current_app
+from ..entity_index import entity_index
 
 def has_cyclic_relationship(start_id, current_id, is_first_call=True):
     """
     Checks for a cyclic relationship in the entity hierarchy.
 
+    Walks up the cached parent pointers of the entity index from current_id,
+    so the check costs O(depth) and runs no database queries.
+
     Parameters:
     start_id (int): The ID of the starting entity to check for cyclic relationships.
     current_id (int): The ID of the current entity in the hierarchy traversal.
+    is_first_call (bool): Unused; kept for compatibility with existing callers.
 
     Returns:
     bool: True if a cyclic relationship is detected, False otherwise.
     """
-    print(start_id, current_id, is_first_call)
-    is_cycle = False
-    # If it's not the first call and the start ID matches the current ID, a cycle is detected
-    start_entity = Entity.query.filter_by(id=start_id).first()
-    
-    # Fetch the current entity by its ID
-    current_entity = Entity.query.filter_by(id=current_id).first()
-
-    print('start_entity, current_entity, current_entity.parent_id')
-    print(start_entity.id, current_entity.id, current_entity.parent_id)
-
-    if current_entity.parent_id is None:
-        return False
-    
-    if current_entity.parent_id == current_entity.id:
-        return True
-   
-    if current_entity.parent_id == start_entity.id:
-        return True
-
-    # Continue traversing the hierarchy
-    if is_cycle is False:
-        return has_cyclic_relationship(start_id, current_entity.parent_id, is_first_call=False)
+
+    seen = set()
+    while current_id is not None:
+        # Reaching the starting entity again, or any entity twice, means the chain loops
+        if current_id == start_id or current_id in seen:
+            return True
+        seen.add(current_id)
+
+        current_entity = entity_index.get(current_id)
+        if not current_entity:
+            return False
+        current_id = current_entity.parent_id
+
+    return False
+
+def find_cyclic_assignments(assignments):
+    """
+    Validates many proposed parent assignments at once.
+
+    The proposed assignments are applied on top of the parent pointers in the
+    entity index and the resulting hierarchy is sorted topologically from its
+    roots. Entities that cannot be reached from a root are part of a cycle or
+    hang below one. This runs in time linear in the number of entities, which
+    suits bulk imports of large hierarchies.
+
+    Parameters:
+    assignments (dict): Proposed parent IDs (or None) keyed by entity ID. Entities that are
+                        not in the index yet, such as those of a bulk import, may be included.
+
+    Returns:
+    set: The IDs of the entities in assignments that would end up in a cyclic relationship.
+    """
+
+    parents = {entity.id: entity.parent_id for entity in entity_index.all()}
+    parents.update(assignments)
+
+    # Parents that do not exist leave their children at the top of the hierarchy
+    children = {}
+    roots = []
+    for entity_id, parent_id in parents.items():
+        if parent_id is None or parent_id not in parents:
+            roots.append(entity_id)
+        else:
+            children.setdefault(parent_id, []).append(entity_id)
+
+    reached = set(roots)
+    pending = roots
+    while pending:
+        entity_id = pending.pop()
+        for child_id in children.get(entity_id, ()):
+            if child_id not in reached:
+                reached.add(child_id)
+                pending.append(child_id)
+
+    return {entity_id for entity_id in assignments if entity_id not in reached}
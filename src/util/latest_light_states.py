@@ -0,0 +1,20 @@
+from ..models import CurrentLightState
+
+def latest_light_states(entity_ids):
+    """
+    Fetch the most recent light state of several entities in a single query.
+
+    Parameters:
+    entity_ids (iterable): The IDs of the entities to fetch the light state of.
+
+    Returns:
+    dict: The CurrentLightState keyed by entity ID. Entities without any state are left out.
+    """
+
+    entity_ids = list(entity_ids)
+    if not entity_ids:
+        return {}
+
+    # The rows are written by a database trigger, so refresh any copies the session already holds
+    states = CurrentLightState.query.filter(CurrentLightState.entity_id.in_(entity_ids)).populate_existing().all()
+    return {state.entity_id: state for state in states}
@@ -0,0 +1,34 @@
+def render_dirty_ranges(strip, framebuffer, color_correction=None):
+    """
+    Push the pixels changed since the last render to the LED strip.
+
+    Only the dirty ranges recorded by the framebuffer are sent to the strip,
+    so the number of driver calls depends on how much changed rather than on
+    the length of the strip. show() is called once, and only if something changed.
+
+    Parameters:
+    strip (PixelStrip): The LED strip to render to.
+    framebuffer (FrameBuffer): The in-memory pixel state.
+    color_correction (ColorCorrection, optional): Gamma and per-pixel brightness correction
+        applied to each range before it is sent. Without it the raw colors are sent.
+
+    Returns:
+    list: The inclusive (start, end) pixel ranges that were rendered.
+    """
+
+    ranges = framebuffer.take_dirty()
+    if not ranges:
+        return ranges
+
+    for start, end in ranges:
+        if color_correction is not None:
+            colors = memoryview(color_correction.apply(framebuffer.view(start, end))).cast('I')
+        else:
+            # The top byte of each packed word holds the brightness, not a color channel
+            colors = [color & 0xFFFFFF for color in framebuffer.colors(start, end)]
+
+        for offset, color in enumerate(colors):
+            strip.setPixelColor(start + offset, color)
+
+    strip.show()
+    return ranges
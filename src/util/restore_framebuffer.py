@@ -0,0 +1,36 @@
+from ..models import Address
+
+def restore_framebuffer(framebuffer, snapshot=None):
+    """
+    Restore the framebuffer to the pixel state saved before the last shutdown.
+
+    The memory-mapped snapshot is used when there is a valid one; otherwise
+    the pixels are read back from the Address table written by
+    saveStateToDatabase. The restored pixels are left dirty for the renderer,
+    so the strip is brought back with a single show(), but not for the
+    persister, as they are already saved.
+
+    Parameters:
+    framebuffer (FrameBuffer): The framebuffer to restore.
+    snapshot (FramebufferSnapshot, optional): The snapshot to restore from first.
+
+    Returns:
+    str: 'snapshot' or 'database' depending on where the pixels came from, or None if nothing was saved.
+    """
+
+    source = None
+    if snapshot is not None and snapshot.load(framebuffer):
+        source = 'snapshot'
+    else:
+        pixels = bytearray(len(framebuffer) * 4)
+        rows = Address.query.filter(Address.id >= 0, Address.id < len(framebuffer)).all()
+        for address in rows:
+            offset = address.id * 4
+            pixels[offset:offset + 4] = bytes((address.blue or 0, address.green or 0, address.red or 0, address.brightness or 0))
+        if rows:
+            framebuffer.write(0, pixels)
+            source = 'database'
+
+    if source:
+        framebuffer.take_dirty('persist')
+    return source
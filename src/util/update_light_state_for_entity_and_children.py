@@ -1,9 +1,17 @@
-from ..models import Entity, LightState
+from sqlalchemy import insert
+from ..models import LightState
 from ..database import db
+from ..entity_index import entity_index
+from .latest_light_states import latest_light_states
 
 def update_light_state_for_entity_and_children(entity_id, red, green, blue, brightness, is_on):
     """
-    Recursively updates the light state for a given entity and all its child entities.
+    Updates the light state for a given entity and all its child entities.
+
+    The subtree is resolved from the entity index and the current states of
+    all its entities are fetched in one query, so the work does not grow in
+    round-trips or recursion depth with the size of the hierarchy. New states
+    are added in a single bulk insert; the caller commits the session.
 
     Parameters:
     entity_id (int): The ID of the entity whose light state is to be updated.
@@ -14,24 +22,32 @@ def update_light_state_for_entity_and_children(entity_id, red, green, blue, brig
     is_on (bool): The state of the light (True for on, False for off).
 
     Returns:
-    None
+    list: The IDs of the entities whose light state changed.
     """
 
     # Fetch the entity by its ID
-    entity = Entity.query.filter_by(id=entity_id).first()
+    entity = entity_index.get(entity_id)
     if not entity:
-        return
-
-    # Update the light state of the current entity
-    current_state = LightState.query.filter_by(entity_id=entity.id).order_by(LightState.timestamp.desc()).first()
-    if not current_state or any([current_state.is_on != is_on,
-                                 current_state.red != red,
-                                 current_state.green != green,
-                                 current_state.blue != blue,
-                                 current_state.brightness != int(brightness)]):
-        new_state = LightState(entity_id=entity.id, is_on=is_on, red=red, green=green, blue=blue, brightness=int(brightness))
-        db.session.add(new_state)
-
-    # Recursively update the light state of all child entities
-    for child in entity.children:
-        update_light_state_for_entity_and_children(child.id, red, green, blue, brightness, is_on)
\ No newline at end of file
+        return []
+
+    # Compare the current state of the entity and all its descendants at once
+    subtree = entity_index.subtree(entity.id)
+    current_states = latest_light_states(subtree)
+
+    changed = []
+    for member_id in subtree:
+        current_state = current_states.get(member_id)
+        if not current_state or any([current_state.is_on != is_on,
+                                     current_state.red != red,
+                                     current_state.green != green,
+                                     current_state.blue != blue,
+                                     current_state.brightness != int(brightness)]):
+            changed.append(member_id)
+
+    if changed:
+        db.session.execute(insert(LightState), [
+            {'entity_id': member_id, 'is_on': is_on, 'red': red, 'green': green, 'blue': blue, 'brightness': int(brightness)}
+            for member_id in changed
+        ])
+
+    return changed
@@ -0,0 +1,157 @@
+import pytest
+import json
+from flask import url_for
+from unittest.mock import Mock
+
+from ...src.database import db
+from ...src import create_app
+from ...src.socket import socketio
+from ...src.models import Entity
+from ...src.renderer import Renderer
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        app.strip = Mock()
+        app.strip.numPixels.return_value = 100
+
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def init_entities(app):
+    with app.app_context():
+        db.session.add(Entity(id=1, name="World Map", start_addr=0, end_addr=99, parent_id=None))
+        db.session.add(Entity(id=2, name="South America", start_addr=0, end_addr=7, parent_id=1))
+        db.session.commit()
+
+@pytest.fixture
+def subscriber(app, init_entities):
+    socket_client = socketio.test_client(app, namespace='/ws-color')
+    socket_client.emit('subscribe', namespace='/ws-color')
+    return socket_client
+
+def set_color(client, app, entity, red):
+    with app.app_context():
+        url = url_for('color.set_color')
+    data = {'entity': entity, 'red': red, 'green': 0, 'blue': 0, 'brightness': 100, 'is_on': True}
+    return client.post(url, data=json.dumps(data), content_type='application/json')
+
+def events(socket_client, name):
+    return [event['args'][0] for event in socket_client.get_received('/ws-color') if event['name'] == name]
+
+def test_new_subscriber_gets_snapshot(app, subscriber):
+    snapshot = events(subscriber, 'snapshot')
+    assert len(snapshot) == 1
+    assert snapshot[0]['seq'] == 0
+    assert snapshot[0]['epoch'] == app.broadcaster.epoch
+
+def test_color_change_broadcasts_delta(app, client, subscriber):
+    subscriber.get_received('/ws-color')
+    set_color(client, app, 1, 255)
+
+    deltas = events(subscriber, 'delta')
+    assert len(deltas) == 1
+    assert deltas[0]['seq'] == 1
+    assert deltas[0]['states'] == [[1, True, 255, 0, 0, 100], [2, True, 255, 0, 0, 100]]
+
+def test_deltas_are_coalesced_per_frame(app, client, subscriber):
+    subscriber.get_received('/ws-color')
+    app.renderer = Renderer(app.strip, app.framebuffer)
+    app.renderer.sources.append(app.broadcaster.flush)
+
+    set_color(client, app, 2, 10)
+    set_color(client, app, 2, 20)
+    assert events(subscriber, 'delta') == []
+
+    app.renderer.render_frame()
+    deltas = events(subscriber, 'delta')
+    assert [delta['seq'] for delta in deltas] == [1]
+    assert deltas[0]['states'] == [[2, True, 20, 0, 0, 100]]
+
+def test_resume_sends_missed_deltas(app, client, init_entities):
+    set_color(client, app, 1, 1)
+    set_color(client, app, 2, 2)
+    set_color(client, app, 2, 3)
+
+    socket_client = socketio.test_client(app, namespace='/ws-color')
+    socket_client.emit('subscribe', {'epoch': app.broadcaster.epoch, 'seq': 1}, namespace='/ws-color')
+    received = socket_client.get_received('/ws-color')
+    assert [event['name'] for event in received] == ['delta', 'delta']
+    assert [event['args'][0]['seq'] for event in received] == [2, 3]
+
+def test_resume_too_far_behind_sends_snapshot(app, client, init_entities):
+    app.broadcaster._history.clear()
+    set_color(client, app, 1, 1)
+    set_color(client, app, 2, 2)
+    app.broadcaster._history.popleft()
+
+    socket_client = socketio.test_client(app, namespace='/ws-color')
+    socket_client.emit('subscribe', {'epoch': app.broadcaster.epoch, 'seq': 0}, namespace='/ws-color')
+    snapshot = events(socket_client, 'snapshot')
+    assert len(snapshot) == 1
+    assert snapshot[0]['seq'] == 2
+    assert snapshot[0]['states'] == [[1, True, 1, 0, 0, 100], [2, True, 2, 0, 0, 100]]
+
+def test_resume_from_other_epoch_sends_snapshot(app, init_entities):
+    socket_client = socketio.test_client(app, namespace='/ws-color')
+    socket_client.emit('subscribe', {'epoch': 'stale', 'seq': 0}, namespace='/ws-color')
+    assert len(events(socket_client, 'snapshot')) == 1
+
+def test_unsubscribed_clients_get_no_deltas(app, client, init_entities):
+    socket_client = socketio.test_client(app, namespace='/ws-color')
+    set_color(client, app, 1, 255)
+    assert events(socket_client, 'delta') == []
+
+def test_shared_log_broadcasts_from_renderer_process_only(tmp_path):
+    from unittest.mock import patch
+    from ...src import broadcast
+    from ...src.broadcast import DeltaBroadcaster, SharedDeltaLog
+    path = str(tmp_path / 'framebuffer.shm.deltas')
+    api = DeltaBroadcaster(Mock(renderer=None), log=SharedDeltaLog(path, 8))
+    other_api = DeltaBroadcaster(Mock(renderer=None), log=SharedDeltaLog(path, 8))
+    renderer = DeltaBroadcaster(Mock(renderer=Mock()), log=SharedDeltaLog(path, 8))
+
+    with patch.object(broadcast, 'socketio') as socket:
+        api.publish([1, 2], 255, 0, 0, 100, True)
+        other_api.publish([2], 0, 255, 0, 100, True)
+        assert api.flush() is None
+        assert other_api.flush() is None
+        socket.emit.assert_not_called()
+
+        # One delta, numbered once for every process
+        delta = renderer.flush()
+        assert delta == {'epoch': api.epoch, 'seq': 1, 'states': [[1, True, 255, 0, 0, 100], [2, True, 0, 255, 0, 100]]}
+        socket.emit.assert_called_once_with('delta', delta, namespace='/ws-color', to='subscribers')
+        assert api.seq == other_api.seq == 1
+
+        # A client resuming on another process gets the delta it missed
+        assert other_api.since(api.epoch, 0) == [delta]
+        assert other_api.since(api.epoch, 1) == []
+        assert other_api.since('stale', 0) is None
+
+def test_shared_log_overrun_starts_new_epoch(tmp_path):
+    from ...src.broadcast import SharedDeltaLog
+    path = str(tmp_path / 'framebuffer.shm.deltas')
+    log = SharedDeltaLog(path, 4)
+    log.append([[entity_id, True, 1, 2, 3, 100] for entity_id in range(2)])
+    assert log.sequence()['seq'] == 1
+    epoch = log.epoch
+
+    log.append([[entity_id, True, 1, 2, 3, 100] for entity_id in range(3)])
+    # The first delta was partly overwritten, the second is whole
+    assert log.since(epoch, 0) is None
+    assert log.sequence()['seq'] == 2
+    assert [delta['seq'] for delta in log.since(epoch, 1)] == [2]
+
+    log.append([[entity_id, True, 1, 2, 3, 100] for entity_id in range(5)])
+    assert log.since(epoch, 2) is None
+    assert log.sequence() is False
+    assert log.epoch != epoch
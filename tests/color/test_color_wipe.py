@@ -1,37 +1,57 @@
 import pytest
 from unittest.mock import Mock, call
+from ...src import create_app, db
+from ...src.framebuffer import FrameBuffer
 from ...src.endpoints.color import colorWipe
 
-def test_colorWipe():
-    # Create a mock strip object
-    mock_strip = Mock()
-    mock_strip.numPixels.return_value = 10  # Assuming the strip has 10 pixels
-
-    # Define the parameters for the colorWipe function
-    test_color = 123  # Example color
-    test_brightness = 100
-    range_start = 2
-    range_end = 5
-    wait_ms = 5
-
-    # Call the function with the mock strip and other parameters
-    colorWipe(mock_strip, test_color, test_brightness, range_start, range_end, wait_ms)
-
-    # Define expected calls to the mock_strip
-    expected_calls = [
-        call.setPixelColor(2, test_color),
-        call.setBrightness(test_brightness),
-        call.show(),
-        call.setPixelColor(3, test_color),
-        call.setBrightness(test_brightness),
-        call.show(),
-        call.setPixelColor(4, test_color),
-        call.setBrightness(test_brightness),
-        call.show(),
-        call.setPixelColor(5, test_color),
-        call.setBrightness(test_brightness),
-        call.show()
-    ]
-
-    # Check if the mock strip object was called as expected
-    mock_strip.assert_has_calls(expected_calls, any_order=False)
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        app.framebuffer = FrameBuffer(10)  # Assuming the strip has 10 pixels
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def test_colorWipe(app):
+    with app.app_context():
+        # Create a mock strip object
+        mock_strip = Mock()
+        mock_strip.numPixels.return_value = 10
+
+        # Define the parameters for the colorWipe function
+        test_color = 123  # Example color
+        test_brightness = 100
+        range_start = 2
+        range_end = 5
+        wait_ms = 5
+
+        # Call the function with the mock strip and other parameters
+        colorWipe(mock_strip, test_color, test_brightness, range_start, range_end, wait_ms)
+
+        # Only the pixels of the range are pushed, followed by a single show().
+        # Brightness is applied in software, so the hardware brightness is left alone.
+        expected_calls = [
+            call.setPixelColor(2, test_color),
+            call.setPixelColor(3, test_color),
+            call.setPixelColor(4, test_color),
+            call.setPixelColor(5, test_color),
+            call.show()
+        ]
+
+        # Check if the mock strip object was called as expected
+        assert mock_strip.mock_calls == expected_calls
+        assert app.framebuffer.get_pixel(2) == {'red': 0, 'green': 0, 'blue': 123, 'brightness': test_brightness}
+
+def test_colorWipe_scales_brightness_per_pixel(app):
+    with app.app_context():
+        mock_strip = Mock()
+
+        colorWipe(mock_strip, 0xC86400, 100, 0, 1)
+        colorWipe(mock_strip, 0xC86400, 50, 2, 3)
+
+        # Pixels keep their own brightness even though the strip brightness is global
+        assert mock_strip.setPixelColor.call_args_list[-2:] == [call(2, 0x643200), call(3, 0x643200)]
+        assert app.framebuffer.get_pixel(0)['brightness'] == 100
+        mock_strip.setBrightness.assert_not_called()
@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import Mock
+
+from ...src.database import db
+from ...src import create_app
+from ...src.socket import socketio
+from ...src.renderer import Renderer
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        app.strip = Mock()
+        app.strip.numPixels.return_value = 100
+
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def socket_client(app):
+    return socketio.test_client(app, namespace='/ws-color')
+
+def test_frame_is_shown(app, socket_client):
+    ack = socket_client.emit('frame', bytes((255, 0, 0)) * 100, namespace='/ws-color', callback=True)
+    assert ack == {'received': 1, 'dropped': 0}
+    assert app.framebuffer.get_pixel(99) == {'red': 255, 'green': 0, 'blue': 0, 'brightness': 100}
+    assert app.strip.show.call_count == 1
+
+def test_partial_frame(app, socket_client):
+    socket_client.emit('frame', bytes((0, 0, 255)) * 2, 10, namespace='/ws-color', callback=True)
+    assert app.framebuffer.get_pixel(9)['blue'] == 0
+    assert app.framebuffer.get_pixel(11)['blue'] == 255
+    assert app.framebuffer.get_pixel(12)['blue'] == 0
+
+def test_stale_frames_are_dropped(app, socket_client):
+    app.renderer = Renderer(app.strip, app.framebuffer)
+    app.renderer.sources.append(app.frame_stream.apply)
+
+    # Three frames arrive within one frame interval
+    for red in (1, 2, 3):
+        ack = socket_client.emit('frame', bytes((red, 0, 0)) * 100, namespace='/ws-color', callback=True)
+    assert ack == {'received': 3, 'dropped': 2}
+
+    app.renderer.render_frame()
+    assert app.strip.show.call_count == 1
+    assert app.renderer.front.get_pixel(0)['red'] == 3
+
+def test_disjoint_partial_frames_are_kept(app, socket_client):
+    app.renderer = Renderer(app.strip, app.framebuffer)
+    app.renderer.sources.append(app.frame_stream.apply)
+
+    socket_client.emit('frame', bytes((1, 0, 0)) * 10, 0, namespace='/ws-color', callback=True)
+    socket_client.emit('frame', bytes((2, 0, 0)) * 10, 50, namespace='/ws-color', callback=True)
+    # Covers the first frame but not the second
+    ack = socket_client.emit('frame', bytes((3, 0, 0)) * 20, 0, namespace='/ws-color', callback=True)
+    assert ack == {'received': 3, 'dropped': 1}
+
+    app.renderer.render_frame()
+    assert app.strip.show.call_count == 1
+    assert [app.renderer.front.get_pixel(index)['red'] for index in (0, 19, 20, 50, 59, 60)] == [3, 3, 0, 2, 2, 0]
+
+def test_frame_must_be_binary(app, socket_client):
+    socket_client.emit('frame', {'red': 1}, namespace='/ws-color')
+    received = socket_client.get_received('/ws-color')
+    assert received[-1]['name'] == 'error'
@@ -0,0 +1,50 @@
+import pytest
+from unittest.mock import Mock
+from ...src import create_app, db
+from ...src.framebuffer import FrameBuffer
+from ...src.models import Address
+from ...src.endpoints.color import colorWipe, saveStateToDatabase
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        app.framebuffer = FrameBuffer(10)
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def test_save_state_writes_only_changed_pixels(app):
+    with app.app_context():
+        app.framebuffer.set_range(2, 4, 255, 100, 50, 80)
+        assert saveStateToDatabase() == 3
+
+        assert Address.query.count() == 3
+        address = db.session.get(Address, 3)
+        assert (address.red, address.green, address.blue, address.brightness) == (255, 100, 50, 80)
+
+        # Nothing changed since the last save
+        assert saveStateToDatabase() == 0
+
+def test_save_state_updates_existing_rows(app):
+    with app.app_context():
+        app.framebuffer.set_range(0, 9, 1, 2, 3, 4)
+        saveStateToDatabase()
+        app.framebuffer.set_range(5, 5, 9, 9, 9, 9)
+        assert saveStateToDatabase() == 1
+
+        db.session.expunge_all()
+        assert Address.query.count() == 10
+        assert db.session.get(Address, 5).red == 9
+        assert db.session.get(Address, 4).red == 1
+
+def test_colorWipe_defers_to_running_persister(app):
+    with app.app_context():
+        app.persister.running = True
+        colorWipe(Mock(), 0xFF0000, 100, 0, 4)
+        assert Address.query.count() == 0
+
+        # Stopping the persister flushes what is pending
+        assert app.persister.stop() == 5
+        assert Address.query.count() == 5
@@ -90,3 +90,96 @@ def test_set_color_entity_not_found(client, app, set_color_url):
         assert response.status_code == 404
         assert 'Entity not found' in response.json['error']
 
+
+def test_set_color_transition(client, app, set_color_url):
+    with app.app_context():
+        db.session.add(Entity(id=2, name="Shelf", start_addr=0, end_addr=9, parent_id=None))
+        db.session.commit()
+        app.framebuffer.set_range(0, 9, 0, 0, 0, 100)
+        app.effects.running = True
+
+        data = {'entity': 2, 'red': 200, 'green': 0, 'blue': 100, 'brightness': 100, 'is_on': True, 'transition_ms': 1000}
+        response = client.post(set_color_url, data=json.dumps(data), content_type='application/json')
+        assert response.status_code == 200
+
+        # Only the final state is recorded, while the strip still shows the old color
+        states = LightState.query.filter_by(entity_id=2).all()
+        assert [(state.red, state.blue) for state in states] == [(200, 100)]
+        assert app.framebuffer.get_pixel(0) == {'red': 0, 'green': 0, 'blue': 0, 'brightness': 100}
+
+        started = app.effects.effects[2].started
+        app.effects.tick(now=started + 0.5)
+        assert app.framebuffer.get_pixel(9) == {'red': 100, 'green': 0, 'blue': 50, 'brightness': 100}
+
+        app.effects.tick(now=started + 1.0)
+        assert app.effects.effects == {}
+        assert app.framebuffer.get_pixel(9) == {'red': 200, 'green': 0, 'blue': 100, 'brightness': 100}
+
+def test_set_color_transition_without_frame_clock(client, app, set_color_url):
+    with app.app_context():
+        db.session.add(Entity(id=2, name="Shelf", start_addr=0, end_addr=9, parent_id=None))
+        db.session.commit()
+
+        data = {'entity': 2, 'red': 200, 'green': 0, 'blue': 100, 'brightness': 100, 'is_on': True, 'transition_ms': 1000}
+        response = client.post(set_color_url, data=json.dumps(data), content_type='application/json')
+        assert response.status_code == 200
+        assert app.effects.effects == {}
+        assert app.framebuffer.get_pixel(0) == {'red': 200, 'green': 0, 'blue': 100, 'brightness': 100}
+
+@pytest.mark.parametrize('transition_ms', [-1, 'slow'])
+def test_set_color_invalid_transition(client, app, set_color_url, transition_ms):
+    with app.app_context():
+        db.session.add(Entity(id=2, name="Shelf", start_addr=0, end_addr=9, parent_id=None))
+        db.session.commit()
+
+        data = {'entity': 2, 'red': 200, 'green': 0, 'blue': 100, 'brightness': 100, 'is_on': True, 'transition_ms': transition_ms}
+        response = client.post(set_color_url, data=json.dumps(data), content_type='application/json')
+        assert response.status_code == 400
+        assert LightState.query.filter_by(entity_id=2).count() == 0
+
+def test_transitions_and_effect_ticks_do_not_deadlock(app):
+    import sys
+    import threading
+    import time
+    from ...src.endpoints.color import paintEntity
+    from ...src.entity_index import entity_index
+    with app.app_context():
+        db.session.add(Entity(id=2, name="Shelf", start_addr=0, end_addr=9, parent_id=None))
+        db.session.commit()
+        entity = entity_index.get(2)
+    app.effects.running = True
+
+    deadline = time.monotonic() + 0.5
+    errors = []
+
+    def paint():
+        with app.app_context():
+            index = 0
+            while time.monotonic() < deadline:
+                try:
+                    paintEntity(entity, index % 256, 0, 0, 100, True, transition_ms=500)
+                except Exception as e:
+                    errors.append(e)
+                index += 1
+
+    def tick():
+        with app.app_context():
+            while time.monotonic() < deadline:
+                try:
+                    app.effects.tick()
+                except Exception as e:
+                    errors.append(e)
+
+    # Switch threads as often as possible so the painter and the ticker interleave inside their locks
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=paint, daemon=True), threading.Thread(target=tick, daemon=True)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+    finally:
+        sys.setswitchinterval(interval)
+    assert not any(thread.is_alive() for thread in threads)
+    assert errors == []
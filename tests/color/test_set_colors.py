@@ -0,0 +1,93 @@
+import pytest
+import json
+from flask import url_for
+from unittest.mock import Mock
+
+from ...src.database import db
+from ...src import create_app
+from ...src.socket import socketio
+from ...src.models import Entity, LightState
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        app.strip = Mock()
+        app.strip.numPixels.return_value = 100
+
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def init_entities(app):
+    with app.app_context():
+        db.session.add(Entity(id=1, name="World Map", start_addr=0, end_addr=99, parent_id=None))
+        db.session.add(Entity(id=2, name="South America", start_addr=0, end_addr=7, parent_id=1))
+        db.session.add(Entity(id=3, name="North America", start_addr=8, end_addr=27, parent_id=1))
+        db.session.commit()
+
+@pytest.fixture
+def set_colors_url(app):
+    with app.app_context():
+        return url_for('color.set_colors')
+
+def test_set_colors_valid(client, app, init_entities, set_colors_url):
+    with app.app_context():
+        data = {'colors': [
+            {'entity': 2, 'red': 255, 'green': 0, 'blue': 0, 'brightness': 100, 'is_on': True},
+            {'entity': 3, 'red': 0, 'green': 255, 'blue': 0, 'brightness': 50, 'is_on': True}
+        ]}
+        response = client.post(set_colors_url, data=json.dumps(data), content_type='application/json')
+        assert response.status_code == 200
+        assert response.json['updated'] == [2, 3]
+
+        # Both ranges are rendered as a single frame
+        assert app.strip.show.call_count == 1
+        assert app.strip.setPixelColor.call_count == 28
+        assert app.framebuffer.get_pixel(7)['red'] == 255
+        assert app.framebuffer.get_pixel(8) == {'red': 0, 'green': 255, 'blue': 0, 'brightness': 50}
+        assert LightState.query.filter_by(entity_id=1).count() == 0
+
+def test_set_colors_invalid_item_applies_nothing(client, app, init_entities, set_colors_url):
+    with app.app_context():
+        data = {'colors': [
+            {'entity': 2, 'red': 255, 'green': 0, 'blue': 0, 'brightness': 100, 'is_on': True},
+            {'entity': 3, 'red': 300, 'green': 0, 'blue': 0, 'brightness': 100, 'is_on': True}
+        ]}
+        response = client.post(set_colors_url, data=json.dumps(data), content_type='application/json')
+        assert response.status_code == 400
+        assert 'at index 1' in response.json['error']
+        assert LightState.query.count() == 0
+        app.strip.show.assert_not_called()
+
+def test_set_colors_entity_not_found(client, app, init_entities, set_colors_url):
+    with app.app_context():
+        data = {'colors': [{'entity': 999, 'red': 1, 'green': 1, 'blue': 1, 'brightness': 1, 'is_on': True}]}
+        response = client.post(set_colors_url, data=json.dumps(data), content_type='application/json')
+        assert response.status_code == 400
+        assert 'Entity not found' in response.json['error']
+
+def test_set_colors_missing_colors(client, app, set_colors_url):
+    with app.app_context():
+        response = client.post(set_colors_url, data=json.dumps({}), content_type='application/json')
+        assert response.status_code == 400
+        assert 'Missing colors' in response.json['error']
+
+def test_set_colors_socket_event(app, init_entities):
+    socket_client = socketio.test_client(app, namespace='/ws-color')
+    socket_client.emit('set_colors', {'colors': [
+        {'entity': 1, 'red': 10, 'green': 20, 'blue': 30, 'brightness': 100, 'is_on': True},
+        {'entity': 3, 'is_on': False}
+    ]}, namespace='/ws-color')
+
+    received = socket_client.get_received('/ws-color')
+    assert received[-1]['name'] == 'success'
+    assert received[-1]['args'][0]['updated'] == [1, 2, 3]
+    assert app.framebuffer.get_pixel(0)['red'] == 10
+    assert app.framebuffer.get_pixel(8)['red'] == 0
@@ -0,0 +1,141 @@
+import pytest
+import json
+from flask import url_for
+from unittest.mock import Mock
+
+from ...src.database import db
+from ...src import create_app
+from ...src.models import Entity, LightState
+from ...src.effects import Breathe
+from ...src.renderer import Renderer
+from ...src.endpoints.color import colorWipe
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        app.strip = Mock()
+        app.strip.numPixels.return_value = 100
+
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def init_entities(app):
+    with app.app_context():
+        db.session.add(Entity(id=1, name="World Map", start_addr=0, end_addr=99, parent_id=None))
+        db.session.add(Entity(id=2, name="South America", start_addr=0, end_addr=7, parent_id=1))
+        db.session.add(LightState(entity_id=1, is_on=True, red=0, green=0, blue=255, brightness=100))
+        db.session.commit()
+        app.compositor.load()
+
+def post(client, path, data):
+    return client.post(path, data=json.dumps(data), content_type='application/json')
+
+def test_start_and_list_effect(client, app, init_entities):
+    with app.app_context():
+        response = post(client, url_for('effect.manage_effect'), {'entity': 2, 'effect': 'breathe', 'red': 255, 'period': 2})
+        assert response.status_code == 201
+        assert response.json['effect']['period'] == 2.0
+
+        response = client.get(url_for('effect.manage_effect'))
+        assert [(effect['entity_id'], effect['effect']) for effect in response.json] == [(2, 'breathe')]
+
+def test_effect_is_drawn_each_frame(client, app, init_entities):
+    with app.app_context():
+        app.effects.start(2, Breathe(period=2.0, red=255, green=0, blue=0), now=0)
+        assert app.effects.tick(now=1.0) == 1
+        assert app.framebuffer.get_pixel(7) == {'red': 255, 'green': 0, 'blue': 0, 'brightness': 100}
+        assert app.framebuffer.get_pixel(8)['blue'] == 255
+
+        app.effects.tick(now=2.0)
+        assert app.framebuffer.get_pixel(7)['brightness'] == 0
+
+def test_effect_ends_after_duration(client, app, init_entities):
+    with app.app_context():
+        app.effects.start(2, Breathe(period=2.0, red=255, green=0, blue=0, duration=1.0), now=0)
+        app.effects.tick(now=0.5)
+        app.effects.tick(now=1.5)
+
+        # The entity shows its light state again
+        assert app.effects.describe() == []
+        assert app.framebuffer.get_pixel(7) == {'red': 0, 'green': 0, 'blue': 255, 'brightness': 100}
+
+def test_stop_effect(client, app, init_entities):
+    with app.app_context():
+        post(client, url_for('effect.manage_effect'), {'entity': 2, 'effect': 'chase', 'red': 255})
+        app.effects.tick()
+
+        response = client.delete(url_for('effect.manage_effect'), data=json.dumps({'entity': 2}), content_type='application/json')
+        assert response.status_code == 200
+        assert app.framebuffer.get_pixel(0)['blue'] == 255
+
+        response = client.delete(url_for('effect.manage_effect'), data=json.dumps({'entity': 2}), content_type='application/json')
+        assert response.status_code == 404
+
+def test_set_color_replaces_effect(client, app, init_entities):
+    with app.app_context():
+        post(client, url_for('effect.manage_effect'), {'entity': 2, 'effect': 'rainbow'})
+        post(client, url_for('color.set_color'), {'entity': 1, 'red': 0, 'green': 255, 'blue': 0, 'brightness': 100, 'is_on': True})
+        assert app.effects.describe() == []
+        app.effects.tick()
+        assert app.framebuffer.get_pixel(0)['green'] == 255
+
+def test_child_effect_shows_over_parent_effect(client, app, init_entities):
+    with app.app_context():
+        app.effects.start(2, Breathe(period=2.0, red=255, green=0, blue=0), now=0)
+        app.effects.start(1, Breathe(period=2.0, red=0, green=255, blue=0), now=0)
+        assert app.effects.tick(now=1.0) == 2
+        assert app.framebuffer.get_pixel(0)['red'] == 255
+        assert app.framebuffer.get_pixel(8)['green'] == 255
+
+def test_failing_effect_is_stopped(client, app, init_entities):
+    with app.app_context():
+        broken = Breathe(period=2.0, red=255, green=0, blue=0)
+        broken.frame = Mock(side_effect=OverflowError("cannot convert float infinity to integer"))
+        app.effects.start(2, broken, now=0)
+        app.effects.start(1, Breathe(period=2.0, red=0, green=255, blue=0), now=0)
+
+        # The other effect is still drawn, and the broken one is dropped
+        assert app.effects.tick(now=1.0) == 1
+        assert [effect['entity_id'] for effect in app.effects.describe()] == [1]
+        assert app.effects.tick(now=1.0) == 1
+        assert app.framebuffer.get_pixel(0)['green'] == 255
+
+@pytest.mark.parametrize('data, status', [
+    ({'entity': 99, 'effect': 'rainbow'}, 404),
+    ({'entity': 1, 'effect': 'sparkle'}, 400),
+    ({'entity': 1, 'effect': 'chase', 'width': 0}, 400),
+    ({'entity': 1, 'effect': 'chase', 'bogus': 1}, 400),
+    ({'entity': 1}, 400),
+    ({'entity': 1, 'effect': 'rainbow', 'cycles': 1e308}, 400),
+    ({'entity': 1, 'effect': 'chase', 'speed': float('inf')}, 400),
+    ({'entity': 1, 'effect': 'chase', 'spacing': 1e308}, 400),
+    ({'entity': 1, 'effect': 'twinkle', 'density': float('nan')}, 400),
+    ({'entity': 1, 'effect': 'breathe', 'period': 1e308}, 400),
+    ({'entity': 1, 'effect': 'breathe', 'red': float('inf')}, 400),
+    ({'entity': 1, 'effect': 'fade', 'duration_ms': float('inf')}, 400),
+])
+def test_invalid_effect(client, app, init_entities, data, status):
+    with app.app_context():
+        assert post(client, url_for('effect.manage_effect'), data).status_code == status
+
+def test_color_wipe_animates_on_frame_clock(app):
+    with app.app_context():
+        app.renderer = Renderer(app.strip, app.framebuffer)
+        colorWipe(app.strip, 0xFF0000, 100, 0, 9, wait_ms=10)
+        assert app.framebuffer.get_pixel(0)['red'] == 0
+
+        running = list(app.effects.effects.values())[0]
+        app.effects.tick(now=running.started + 0.045)
+        assert [app.framebuffer.get_pixel(index)['red'] for index in range(10)] == [255] * 5 + [0] * 5
+
+        app.effects.tick(now=running.started + 1)
+        assert app.framebuffer.get_pixel(9)['red'] == 255
+        assert app.effects.effects == {}
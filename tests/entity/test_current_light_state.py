@@ -0,0 +1,38 @@
+import pytest
+from ...src import create_app, db
+from ...src.models import Entity, LightState, CurrentLightState
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def test_current_light_state_follows_history(app):
+    with app.app_context():
+        db.session.add(Entity(id=1, name="Entity1", start_addr=0, end_addr=10))
+        db.session.add(LightState(entity_id=1, is_on=True, red=1))
+        db.session.commit()
+        assert db.session.get(CurrentLightState, 1).red == 1
+
+        db.session.add(LightState(entity_id=1, is_on=True, red=2))
+        db.session.commit()
+        assert CurrentLightState.query.count() == 1
+        assert db.session.get(CurrentLightState, 1).red == 2
+
+def test_current_light_state_is_backfilled(app):
+    with app.app_context():
+        db.session.add(Entity(id=1, name="Entity1", start_addr=0, end_addr=10))
+        db.session.add(LightState(entity_id=1, is_on=True, red=1))
+        db.session.add(LightState(entity_id=1, is_on=True, red=2))
+        db.session.commit()
+
+        # Recreate the projection as if upgrading a database that predates it
+        CurrentLightState.__table__.drop(db.engine)
+        db.session.expunge_all()
+        db.create_all()
+
+        assert db.session.get(CurrentLightState, 1).red == 2
@@ -0,0 +1,113 @@
+import json
+import pytest
+from sqlalchemy import event
+from flask import url_for
+from unittest.mock import Mock
+from ...src import create_app, db
+from ...src.models import Entity, LightState
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        app.strip = Mock()
+        db.session.add(Entity(id=1, name="Entity1", start_addr=0, end_addr=9, parent_id=None))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def urls(app):
+    with app.app_context():
+        return {'entity': url_for('entity.manage_entity'), 'color': url_for('color.set_color')}
+
+def count_statements(app, request):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = request()
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    return response, len(statements)
+
+def test_unchanged_poll_gets_304(app, client, urls):
+    response = client.get(urls['entity'])
+    assert response.status_code == 200
+    assert response.headers['ETag']
+
+    response, statements = count_statements(app, lambda: client.get(urls['entity'], headers={'If-None-Match': response.headers['ETag']}))
+    assert response.status_code == 304
+    assert response.data == b''
+    assert statements == 0
+
+def test_body_is_cached_until_state_changes(app, client, urls):
+    first = client.get(urls['entity'])
+    second, statements = count_statements(app, lambda: client.get(urls['entity']))
+    assert statements == 0
+    assert second.json == first.json
+    assert second.headers['ETag'] == first.headers['ETag']
+
+def test_entity_changes_invalidate(app, client, urls):
+    etag = client.get(urls['entity']).headers['ETag']
+    client.post(urls['entity'], data=json.dumps({'name': 'Entity2', 'start_addr': 10, 'end_addr': 19}), content_type='application/json')
+
+    response = client.get(urls['entity'], headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert [entity['name'] for entity in response.json] == ['Entity1', 'Entity2']
+
+def test_color_changes_invalidate(app, client, urls):
+    etag = client.get(urls['entity'], query_string={'id': 1}).headers['ETag']
+    client.post(urls['color'], data=json.dumps({'entity': 1, 'red': 255, 'green': 0, 'blue': 0, 'brightness': 100, 'is_on': True}),
+                content_type='application/json')
+
+    response = client.get(urls['entity'], query_string={'id': 1}, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['state']['red'] == 255
+
+def test_direct_database_changes_invalidate(app, client, urls):
+    client.get(urls['entity'])
+    with app.app_context():
+        db.session.add(LightState(entity_id=1, is_on=True, red=0, green=0, blue=77, brightness=100))
+        db.session.commit()
+    assert client.get(urls['entity']).json[0]['state']['blue'] == 77
+
+def test_rolled_back_changes_do_not_invalidate(app, client, urls):
+    etag = client.get(urls['entity']).headers['ETag']
+    with app.app_context():
+        db.session.add(Entity(id=5, name="Entity5", start_addr=0, end_addr=1, parent_id=None))
+        db.session.flush()
+        db.session.rollback()
+    assert client.get(urls['entity'], headers={'If-None-Match': etag}).status_code == 304
+
+def test_missing_entity(app, client, urls):
+    response = client.get(urls['entity'], query_string={'id': 99})
+    assert response.status_code == 404
+    assert client.get(urls['entity'], query_string={'id': 99}).status_code == 404
+    with app.app_context():
+        assert list(app.response_cache) == ['etag']
+
+def test_body_built_during_a_change_is_not_served_for_the_new_version(app):
+    from ...src.endpoints.entity import cached_response
+    from ...src.state_version import state_version
+    with app.app_context():
+        def stale_build():
+            # A commit lands and another request caches under the new version while this body is built
+            state_version.bump()
+            cached_response('other', lambda: ({}, 200))
+            return {'body': 'stale'}, 200
+
+        response, status = cached_response('entities', stale_build)
+        assert json.loads(response.get_data()) == {'body': 'stale'}
+
+        response, status = cached_response('entities', lambda: ({'body': 'fresh'}, 200))
+        assert json.loads(response.get_data()) == {'body': 'fresh'}
@@ -0,0 +1,88 @@
+import pytest
+from ...src import create_app, db
+from ...src.models import Entity
+from ...src.entity_index import entity_index
+from ...src.endpoints.entity import create_entity, update_entity, delete_entity
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def init_entities(app):
+    with app.app_context():
+        db.session.add(Entity(id=1, name="World Map", start_addr=1, end_addr=100, parent_id=None))
+        db.session.add(Entity(id=2, name="North America", start_addr=8, end_addr=28, parent_id=1))
+        db.session.add(Entity(id=3, name="Canada", start_addr=8, end_addr=15, parent_id=2))
+        db.session.add(Entity(id=4, name="Europe", start_addr=33, end_addr=35, parent_id=1))
+        db.session.commit()
+
+def test_entity_index_hierarchy(app, init_entities):
+    with app.app_context():
+        assert entity_index.get(3).name == "Canada"
+        assert entity_index.get('3').name == "Canada"
+        assert entity_index.get(999) is None
+        assert entity_index.children(1) == [2, 4]
+        assert entity_index.ancestors(3) == (2, 1)
+        assert entity_index.descendants(1) == {2, 3, 4}
+        assert entity_index.descendants(3) == set()
+
+def test_entity_index_follows_crud(app, init_entities):
+    with app.app_context():
+        response = create_entity({'name': 'France', 'start_addr': 33, 'end_addr': 34, 'parent_id': 4})
+        new_id = response[0].json['id']
+        assert entity_index.ancestors(new_id) == (4, 1)
+
+        update_entity({'id': 3, 'name': 'Canada', 'start_addr': 8, 'end_addr': 15, 'parent_id': 4})
+        assert entity_index.children(2) == []
+        assert entity_index.descendants(4) == {3, new_id}
+
+        delete_entity({'id': new_id})
+        assert entity_index.get(new_id) is None
+        assert entity_index.descendants(1) == {2, 3, 4}
+
+def test_entity_index_handles_cycles(app, init_entities):
+    with app.app_context():
+        entity = db.session.get(Entity, 1)
+        entity.parent_id = 3
+        db.session.commit()
+
+        assert entity_index.ancestors(1) == (3, 2)
+        assert entity_index.descendants(1) == {2, 3, 4}
+
+def test_entity_index_reloads_after_rollback(app, init_entities):
+    with app.app_context():
+        entity = db.session.get(Entity, 4)
+        entity.name = "Not Europe"
+        db.session.flush()
+        assert entity_index.get(4).name == "Not Europe"
+
+        db.session.rollback()
+        assert entity_index.get(4).name == "Europe"
+
+def test_entity_index_pixel_lookups(app, init_entities):
+    with app.app_context():
+        assert entity_index.entities_at(10) == [1, 2, 3]
+        assert entity_index.entities_at(30) == [1]
+        assert entity_index.overlapping(30, 34) == [1, 4]
+
+def test_entity_index_owners(app, init_entities):
+    with app.app_context():
+        # The deepest entity covering a pixel owns it
+        assert entity_index.owners(0, 40) == [(1, 7, 1), (8, 15, 3), (16, 28, 2), (29, 32, 1), (33, 35, 4), (36, 40, 1)]
+        assert entity_index.owners(101, 120) == []
+
+def test_create_entity_warns_about_overlaps(app, init_entities):
+    with app.app_context():
+        response = create_entity({'name': 'Mexico', 'start_addr': 20, 'end_addr': 34, 'parent_id': 2})
+        assert response[1] == 201
+        assert response[0].json['overlaps'] == [4]
+
+        response = update_entity({'id': 4, 'name': 'Europe', 'start_addr': 40, 'end_addr': 45, 'parent_id': 1})
+        assert response[1] == 200
+        assert 'overlaps' not in response[0].json
@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy import event
 from flask import jsonify
 from ...src import create_app, db
 from ...src.models import Entity, LightState
@@ -52,4 +53,34 @@ def test_get_entities_no_entities(app):
         response = get_entities()
         assert response[1] == 200
         entities_data = response[0].json
-        assert len(entities_data) == 0
\ No newline at end of file
+        assert len(entities_data) == 0
+
+def test_get_entities_single_query(app):
+    with app.app_context():
+        for entity_id in range(1, 51):
+            db.session.add(Entity(id=entity_id, name="Entity" + str(entity_id), start_addr=0, end_addr=10, parent_id=entity_id - 1 or None))
+            db.session.add(LightState(entity_id=entity_id, is_on=True, red=entity_id, green=0, blue=0, brightness=100))
+        db.session.commit()
+        db.session.expunge_all()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = get_entities()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert len(statements) == 1
+        entities_data = response[0].json
+        assert len(entities_data) == 50
+        assert entities_data[49]['parent_id'] == 49
+        assert entities_data[49]['state']['red'] == 50
+
+def test_get_entities_latest_state(app, init_entities):
+    with app.app_context():
+        db.session.add(LightState(entity_id=1, is_on=False, red=10, green=10, blue=10, brightness=50))
+        db.session.commit()
+
+        entities_data = get_entities()[0].json
+        assert entities_data[0]['state'] == {"is_on": False, "red": 10, "green": 10, "blue": 10, "brightness": 50}
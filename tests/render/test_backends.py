@@ -0,0 +1,60 @@
+import time
+import pytest
+from ...src.config import Config
+from ...src.channels import led_channels
+from ...src.framebuffer import FrameBuffer
+from ...src.backends import SimulatedStrip, create_strip, load_frames
+from ...src.util.render_dirty_ranges import render_dirty_ranges
+
+def config(**overrides):
+    values = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    values.update(overrides)
+    return values
+
+def test_show_records_frame():
+    strip = SimulatedStrip(3, pixel_time=0, reset_time=0)
+    strip.setPixelColor(1, 0xFF0000)
+    strip.show()
+
+    assert strip.shown == 1
+    assert strip.frames[-1][1] == bytes((0, 0, 0, 0, 0, 0, 0xFF, 0, 0, 0, 0, 0))
+    assert strip.getPixelColor(1) == 0xFF0000
+
+def test_show_models_wire_time():
+    strip = SimulatedStrip(1000, pixel_time=30e-6, reset_time=300e-6)
+    started = time.monotonic()
+    strip.show()
+    assert time.monotonic() - started >= 1000 * 30e-6 + 300e-6
+
+def test_frames_are_dumped(tmp_path):
+    path = str(tmp_path / 'frames.bin')
+    strip = SimulatedStrip(2, pixel_time=0, reset_time=0, dump_path=path)
+    strip.begin()
+    strip.setPixelColor(0, 0x123456)
+    strip.show()
+    strip.setPixelColor(1, 0xABCDEF)
+    strip.show()
+    strip.close()
+
+    frames = load_frames(path)
+    assert [list(colors) for _, colors in frames] == [[0x123456, 0], [0x123456, 0xABCDEF]]
+    assert frames[0][0] <= frames[1][0]
+
+def test_renders_framebuffer():
+    framebuffer = FrameBuffer(4)
+    strip = SimulatedStrip(4, pixel_time=0, reset_time=0)
+    framebuffer.set_range(1, 2, 0, 255, 0, 100)
+    render_dirty_ranges(strip, framebuffer)
+    assert [strip.getPixelColor(n) for n in range(4)] == [0, 0x00FF00, 0x00FF00, 0]
+    assert strip.shown == 1
+
+def test_create_simulated_strip(tmp_path):
+    values = config(LED_BACKEND='simulated', LED_COUNTS=[10, 20], SIMULATED_STRIP_DUMP=str(tmp_path / 'frames-{channel}.bin'))
+    strips = [create_strip(channel, values) for channel in led_channels(values)]
+    assert [strip.numPixels() for strip in strips] == [10, 20]
+    assert strips[1].dump_path.endswith('frames-1.bin')
+
+def test_unknown_backend():
+    values = config(LED_BACKEND='missing')
+    with pytest.raises(ValueError):
+        create_strip(led_channels(values)[0], values)
@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import Mock, call
+from ...src.config import Config
+from ...src.channels import led_channels, total_pixels, StripGroup
+from ...src.framebuffer import FrameBuffer
+from ...src.renderer import Renderer
+from ...src.hardware_worker import HardwareWorker
+
+def config(**overrides):
+    values = {key: getattr(Config, key) for key in dir(Config) if key.startswith('LED_')}
+    values.update(overrides)
+    return values
+
+def test_single_channel():
+    channels = led_channels(config())
+    assert len(channels) == 1
+    assert channels[0]['offset'] == 0
+    assert channels[0]['count'] == Config.LED_COUNTS
+
+def test_channels_share_one_address_space():
+    channels = led_channels(config(LED_COUNTS=[100, 50], LED_PIN=[18, 13], LED_CHANNEL=[0, 1]))
+    assert [(channel['offset'], channel['count'], channel['pin'], channel['channel']) for channel in channels] == [
+        (0, 100, 18, 0),
+        (100, 50, 13, 1)
+    ]
+    # Single values are shared by every channel
+    assert channels[1]['freq'] == Config.LED_FREQS
+    assert total_pixels(config(LED_COUNTS=[100, 50])) == 150
+
+def test_channel_setting_count_mismatch():
+    with pytest.raises(ValueError):
+        led_channels(config(LED_COUNTS=[100, 50], LED_PIN=[18]))
+
+def test_strip_group_maps_global_addresses():
+    strips = [Mock(), Mock()]
+    group = StripGroup(strips, [3, 2])
+    group.setPixelColor(2, 0xFF)
+    group.setPixelColor(3, 0xAA)
+    group.show()
+
+    assert group.numPixels() == 5
+    assert strips[0].mock_calls == [call.setPixelColor(2, 0xFF), call.show()]
+    assert strips[1].mock_calls == [call.setPixelColor(0, 0xAA), call.show()]
+
+def test_renderer_splits_frames_across_channels():
+    framebuffer = FrameBuffer(10)
+    workers = [HardwareWorker(Mock(), offset=0, num_pixels=6), HardwareWorker(Mock(), offset=6, num_pixels=4)]
+    renderer = Renderer(Mock(), framebuffer, workers=workers)
+
+    # An entity range spanning both strips
+    framebuffer.set_range(4, 7, 255, 0, 0, 100)
+    assert renderer.render_frame() == [(4, 7)]
+    for worker in workers:
+        worker.run_pending()
+
+    assert workers[0].strip.mock_calls == [call.setPixelColor(4, 0xFF0000), call.setPixelColor(5, 0xFF0000), call.show()]
+    assert workers[1].strip.mock_calls == [call.setPixelColor(0, 0xFF0000), call.setPixelColor(1, 0xFF0000), call.show()]
+
+def test_untouched_channel_is_not_shown():
+    framebuffer = FrameBuffer(10)
+    workers = [HardwareWorker(Mock(), offset=0, num_pixels=6), HardwareWorker(Mock(), offset=6, num_pixels=4)]
+    renderer = Renderer(Mock(), framebuffer, workers=workers)
+
+    framebuffer.set_range(8, 8, 0, 0, 255, 100)
+    renderer.render_frame()
+    for worker in workers:
+        worker.run_pending()
+
+    assert workers[0].strip.mock_calls == []
+    assert workers[1].strip.mock_calls == [call.setPixelColor(2, 0x0000FF), call.show()]
@@ -0,0 +1,29 @@
+import pytest
+from ...src.color_correction import ColorCorrection
+
+def pixel(red, green, blue, brightness):
+    return bytes((blue, green, red, brightness))
+
+def test_full_brightness_is_identity():
+    correction = ColorCorrection()
+    assert correction.apply(pixel(255, 100, 50, 100)) == pixel(255, 100, 50, 0)
+
+def test_brightness_is_applied_per_pixel():
+    correction = ColorCorrection()
+    pixels = pixel(200, 100, 0, 100) * 2 + pixel(200, 100, 0, 50) * 3 + pixel(200, 100, 0, 0)
+
+    assert correction.apply(pixels) == pixel(200, 100, 0, 0) * 2 + pixel(100, 50, 0, 0) * 3 + pixel(0, 0, 0, 0)
+
+def test_brightness_above_100_is_clamped():
+    correction = ColorCorrection()
+    assert correction.apply(pixel(10, 20, 30, 255)) == pixel(10, 20, 30, 0)
+
+def test_gamma_table():
+    correction = ColorCorrection(gamma=2.0)
+    assert correction.gamma_table[0] == 0
+    assert correction.gamma_table[128] == 64
+    assert correction.gamma_table[255] == 255
+    assert correction.apply(pixel(128, 255, 0, 100)) == pixel(64, 255, 0, 0)
+    # Full brightness, and anything above it, is gamma correction alone
+    assert correction.tables[100] is correction.gamma_table
+    assert correction.tables[255] is correction.gamma_table
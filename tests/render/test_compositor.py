@@ -0,0 +1,66 @@
+import pytest
+from ...src import create_app, db
+from ...src.framebuffer import FrameBuffer
+from ...src.models import Entity, LightState
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Entity(id=1, name="World Map", start_addr=0, end_addr=99, parent_id=None))
+        db.session.add(Entity(id=2, name="South America", start_addr=0, end_addr=7, parent_id=1))
+        db.session.add(Entity(id=3, name="North America", start_addr=8, end_addr=27, parent_id=1))
+        db.session.commit()
+        app.framebuffer = FrameBuffer(100)
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def test_child_layer_overrides_parent(app):
+    with app.app_context():
+        compositor = app.compositor
+        compositor.set_layer(3, 255, 0, 0, 100, True)
+        compositor.set_layer(1, 0, 0, 255, 100, True)
+
+        # North America stays red although the World Map was set after it
+        assert app.framebuffer.get_pixel(10)['red'] == 255
+        assert app.framebuffer.get_pixel(50)['blue'] == 255
+
+def test_layer_change_recomposes_only_its_range(app):
+    with app.app_context():
+        compositor = app.compositor
+        compositor.set_layer(1, 0, 0, 255, 100, True)
+        app.framebuffer.take_dirty()
+
+        compositor.set_layer(2, 0, 255, 0, 100, True)
+        assert app.framebuffer.take_dirty() == [(0, 7)]
+        assert app.framebuffer.get_pixel(7)['green'] == 255
+
+        # Turning the child off shows black, not the parent
+        compositor.set_layer(2, 0, 255, 0, 100, False)
+        assert app.framebuffer.get_pixel(7) == {'red': 0, 'green': 0, 'blue': 0, 'brightness': 0}
+
+def test_entity_changes_recompose_layers(app):
+    with app.app_context():
+        compositor = app.compositor
+        compositor.set_layer(1, 0, 0, 255, 100, True)
+        compositor.set_layer(3, 255, 0, 0, 100, True)
+
+        entity = db.session.get(Entity, 3)
+        entity.start_addr = 20
+        db.session.commit()
+
+        compositor.set_layer(2, 0, 255, 0, 100, True)
+        assert app.framebuffer.get_pixel(10)['blue'] == 255
+        assert app.framebuffer.get_pixel(20)['red'] == 255
+
+def test_load_composes_current_states(app):
+    with app.app_context():
+        db.session.add(LightState(entity_id=1, is_on=True, red=0, green=0, blue=255, brightness=100))
+        db.session.add(LightState(entity_id=3, is_on=True, red=255, green=0, blue=0, brightness=100))
+        db.session.commit()
+
+        app.compositor.load()
+        assert app.framebuffer.get_pixel(0)['blue'] == 255
+        assert app.framebuffer.get_pixel(8)['red'] == 255
@@ -0,0 +1,89 @@
+import pytest
+from ...src.effects import Fade, Breathe, Chase, Rainbow, Twinkle, Wipe, Crossfade
+
+def pixel(frame, index):
+    blue, green, red, brightness = frame[index * 4:index * 4 + 4]
+    return red, green, blue, brightness
+
+def test_fade_interpolates_from_current_pixels():
+    fade = Fade(duration=1.0, red=200, green=0, blue=0, brightness=100)
+    fade.begin(bytes((0, 0, 0, 0, 0, 0, 100, 100)))
+
+    assert fade.frame(0, 2) == bytes((0, 0, 0, 0, 0, 0, 100, 100))
+    assert pixel(fade.frame(0.5, 2), 0) == (100, 0, 0, 50)
+    assert pixel(fade.frame(0.5, 2), 1) == (150, 0, 0, 100)
+    assert fade.frame(1.0, 2) == bytes((0, 0, 200, 100)) * 2
+
+def test_breathe_pulses_brightness():
+    breathe = Breathe(period=2.0, min_brightness=10, red=1, green=2, blue=3, brightness=90)
+    assert pixel(breathe.frame(0, 3), 2) == (1, 2, 3, 10)
+    assert pixel(breathe.frame(1.0, 3), 2) == (1, 2, 3, 90)
+    assert breathe.frame(0.5, 3) == bytes((3, 2, 1, 50)) * 3
+
+def test_chase_moves_groups():
+    chase = Chase(width=2, spacing=4, speed=1.0, red=255, green=0, blue=0)
+    lit = lambda frame: [index for index in range(8) if pixel(frame, index)[0]]
+    assert lit(chase.frame(0, 8)) == [0, 1, 4, 5]
+    assert lit(chase.frame(1.0, 8)) == [1, 2, 5, 6]
+    assert lit(chase.frame(3.0, 8)) == [0, 3, 4, 7]
+    assert len(chase.frame(0, 7)) == 28
+
+def test_chase_spacing_longer_than_range():
+    chase = Chase(width=3, spacing=10, speed=1.0, red=255, green=0, blue=0)
+    lit = lambda frame: [index for index in range(8) if pixel(frame, index)[0]]
+    assert lit(chase.frame(0, 8)) == [0, 1, 2]
+    assert lit(chase.frame(6.0, 8)) == [6, 7]
+    assert lit(chase.frame(8.0, 8)) == [0]
+    assert lit(chase.frame(9.0, 8)) == [0, 1]
+
+    # The frame is sized by the range, not by the spacing
+    huge = Chase(width=10 ** 9, spacing=10 ** 9, speed=0, red=255, green=0, blue=0)
+    assert huge.frame(1.0, 4) == bytes((0, 0, 255, 100)) * 4
+
+def test_rainbow_spreads_and_turns():
+    rainbow = Rainbow(speed=0.25, cycles=1.0, brightness=80)
+    frame = rainbow.frame(0, 4)
+    assert pixel(frame, 0) == (0, 255, 0, 80)
+    # A quarter turn later every pixel shows the hue of its neighbour
+    assert pixel(rainbow.frame(1.0, 4), 0) == pixel(frame, 1)
+
+def test_twinkle_sparks_and_decays():
+    twinkle = Twinkle(density=1.0, decay=0.1, seed=1, red=255, green=255, blue=255, brightness=100)
+    frame = twinkle.frame(1.0, 100)
+    assert all(pixel(frame, index)[:3] == (255, 255, 255) for index in range(100))
+    lit = sum(1 for index in range(100) if pixel(frame, index)[3])
+    assert 50 <= lit <= 100
+
+    # With no new sparks, every level fades out
+    twinkle.density = 0
+    frame = twinkle.frame(3.0, 100)
+    assert all(pixel(frame, index)[3] == 0 for index in range(100))
+
+def test_wipe_paints_one_pixel_at_a_time():
+    wipe = Wipe(10, 4, red=0, green=0, blue=255)
+    wipe.begin(bytes((1, 1, 1, 1)) * 4)
+    assert wipe.duration == 0.04
+    assert wipe.frame(0.015, 4) == bytes((255, 0, 0, 100)) * 2 + bytes((1, 1, 1, 1)) * 2
+
+@pytest.mark.parametrize('effect, params', [
+    (Breathe, {'period': 0}),
+    (Chase, {'width': 5, 'spacing': 2}),
+    (Fade, {'red': 300}),
+    (Twinkle, {'decay': 0}),
+    (Fade, {'duration': 0}),
+])
+def test_invalid_parameters(effect, params):
+    with pytest.raises(ValueError):
+        effect(**params)
+
+def test_crossfade_blends_every_byte():
+    source = bytes((0, 10, 255, 100, 200, 0, 0, 0))
+    target = bytes((255, 10, 0, 50, 0, 0, 0, 100))
+    crossfade = Crossfade(source, duration=1.0)
+    crossfade.begin(target)
+
+    assert crossfade.frame(0, 2) == source
+    assert crossfade.frame(0.5, 2) == bytes((128, 10, 128, 75, 100, 0, 0, 50))
+    assert crossfade.frame(1.0, 2) == target
+    # A range that changed size shows the target or, failing that, nothing
+    assert crossfade.frame(0.5, 3) == bytes(12)
@@ -0,0 +1,40 @@
+import pytest
+from ...src.framebuffer import FrameBuffer
+
+@pytest.fixture
+def framebuffer():
+    return FrameBuffer(10)
+
+def test_set_range(framebuffer):
+    framebuffer.set_range(2, 4, 255, 100, 50, 80)
+
+    assert framebuffer.get_pixel(1) == {'red': 0, 'green': 0, 'blue': 0, 'brightness': 0}
+    assert framebuffer.get_pixel(2) == {'red': 255, 'green': 100, 'blue': 50, 'brightness': 80}
+    assert framebuffer.get_pixel(4) == {'red': 255, 'green': 100, 'blue': 50, 'brightness': 80}
+    assert framebuffer.get_pixel(5) == {'red': 0, 'green': 0, 'blue': 0, 'brightness': 0}
+
+def test_set_range_is_clipped(framebuffer):
+    assert framebuffer.set_range(8, 200, 1, 2, 3, 4) == (8, 9)
+    assert framebuffer.set_range(100, 200, 1, 2, 3, 4) is None
+
+def test_colors_view(framebuffer):
+    framebuffer.set_range(0, 0, 0x12, 0x34, 0x56, 0x64)
+    assert framebuffer.colors()[0] == 0x64123456
+    assert framebuffer.colors()[0] & 0xFFFFFF == 0x123456
+
+def test_write(framebuffer):
+    assert framebuffer.write(8, bytes((3, 2, 1, 100)) * 5) == (8, 9)
+    assert framebuffer.get_pixel(9) == {'red': 1, 'green': 2, 'blue': 3, 'brightness': 100}
+
+def test_take_dirty_merges_ranges(framebuffer):
+    framebuffer.set_range(5, 7, 1, 1, 1, 1)
+    framebuffer.set_range(0, 1, 1, 1, 1, 1)
+    framebuffer.set_range(2, 3, 1, 1, 1, 1)
+
+    assert framebuffer.take_dirty() == [(0, 3), (5, 7)]
+    assert framebuffer.take_dirty() == []
+
+def test_write_rgb(framebuffer):
+    assert framebuffer.write_rgb(8, bytes((1, 2, 3, 4, 5, 6, 7, 8, 9))) == (8, 9)
+    assert framebuffer.get_pixel(8) == {'red': 1, 'green': 2, 'blue': 3, 'brightness': 100}
+    assert framebuffer.get_pixel(9) == {'red': 4, 'green': 5, 'blue': 6, 'brightness': 100}
@@ -0,0 +1,84 @@
+import time
+import pytest
+from unittest.mock import Mock, call
+from ...src import create_app
+from ...src.framebuffer import FrameBuffer
+from ...src.renderer import Renderer
+from ...src.hardware_worker import HardwareWorker
+
+@pytest.fixture
+def framebuffer():
+    return FrameBuffer(10)
+
+@pytest.fixture
+def worker():
+    return HardwareWorker(Mock(), queue_size=1)
+
+@pytest.fixture
+def renderer(framebuffer, worker):
+    return Renderer(Mock(), framebuffer, workers=[worker])
+
+def test_commands_run_against_strip(worker):
+    assert worker.submit(lambda strip, value: strip.setBrightness(value), 50)
+    assert worker.run_pending() == 1
+    assert worker.strip.mock_calls == [call.setBrightness(50)]
+
+def test_full_queue_refuses_commands(worker):
+    assert worker.submit(lambda strip: strip.show())
+    assert worker.busy()
+    assert not worker.submit(lambda strip: strip.show())
+    assert worker.refused == 1
+
+def test_failing_command_does_not_stop_worker(worker):
+    worker.submit(lambda strip: 1 / 0)
+    worker.run_pending()
+    worker.submit(lambda strip: strip.show())
+    worker.run_pending()
+    assert worker.commands == 2
+    assert worker.strip.show.call_count == 1
+
+def test_renderer_hands_frames_to_worker(renderer, framebuffer, worker):
+    framebuffer.set_range(2, 3, 255, 0, 0, 100)
+    assert renderer.render_frame() == [(2, 3)]
+    renderer.strip.assert_not_called()
+    worker.strip.show.assert_not_called()
+
+    # The worker renders its own copy, so later writes do not leak into the frame
+    framebuffer.set_range(2, 3, 0, 255, 0, 100)
+    worker.run_pending()
+    assert worker.strip.mock_calls == [
+        call.setPixelColor(2, 0xFF0000),
+        call.setPixelColor(3, 0xFF0000),
+        call.show()
+    ]
+
+def test_renderer_coalesces_while_worker_busy(renderer, framebuffer, worker):
+    framebuffer.set_range(0, 0, 255, 0, 0, 100)
+    renderer.render_frame()
+    framebuffer.set_range(1, 1, 0, 255, 0, 100)
+    framebuffer.set_range(2, 2, 0, 0, 255, 100)
+    assert renderer.render_frame() == []
+    assert renderer.render_frame() == []
+
+    worker.run_pending()
+    assert renderer.render_frame() == [(1, 2)]
+    worker.run_pending()
+    assert worker.strip.show.call_count == 2
+    assert renderer.frames == 2
+
+@pytest.fixture
+def app():
+    # Background tasks are started through the Socket.IO server set up by create_app
+    return create_app()
+
+def test_worker_runs_in_background(app, worker):
+    worker.start()
+    try:
+        worker.submit(lambda strip: strip.show())
+        deadline = time.monotonic() + 2
+        while worker.commands == 0 and time.monotonic() < deadline:
+            time.sleep(0.001)
+    finally:
+        worker.stop()
+
+    assert worker.strip.show.call_count == 1
@@ -0,0 +1,94 @@
+import time
+import pytest
+from unittest.mock import Mock, call
+from ...src import create_app
+from ...src.framebuffer import FrameBuffer
+from ...src.renderer import Renderer
+
+@pytest.fixture
+def framebuffer():
+    return FrameBuffer(10)
+
+@pytest.fixture
+def renderer(framebuffer):
+    return Renderer(Mock(), framebuffer)
+
+def test_render_frame_coalesces_updates(renderer, framebuffer):
+    framebuffer.set_range(0, 1, 255, 0, 0, 100)
+    framebuffer.set_range(1, 2, 0, 255, 0, 100)
+    framebuffer.set_range(6, 6, 0, 0, 255, 100)
+
+    assert renderer.render_frame() == [(0, 2), (6, 6)]
+    assert renderer.strip.mock_calls == [
+        call.setPixelColor(0, 0xFF0000),
+        call.setPixelColor(1, 0x00FF00),
+        call.setPixelColor(2, 0x00FF00),
+        call.setPixelColor(6, 0x0000FF),
+        call.show()
+    ]
+    assert renderer.frames == 1
+
+def test_render_frame_without_changes(renderer):
+    assert renderer.render_frame() == []
+    assert renderer.strip.mock_calls == []
+
+def test_swap_keeps_buffers_in_sync(renderer, framebuffer):
+    framebuffer.set_range(3, 4, 1, 2, 3, 100)
+    renderer.render_frame()
+    framebuffer.set_range(4, 5, 4, 5, 6, 100)
+    renderer.render_frame()
+
+    assert renderer.front.snapshot() == framebuffer.snapshot()
+    assert framebuffer.get_pixel(3) == {'red': 1, 'green': 2, 'blue': 3, 'brightness': 100}
+    assert framebuffer.get_pixel(5) == {'red': 4, 'green': 5, 'blue': 6, 'brightness': 100}
+
+def test_front_buffer_dirty_ranges_stay_bounded(renderer, framebuffer):
+    for frame in range(100):
+        framebuffer.set_range(frame % 10, frame % 10, 1, 2, 3, 100)
+        renderer.render_frame()
+
+    assert {tracker: len(ranges) for tracker, ranges in renderer.front._dirty.items()} == {'render': 0}
+
+@pytest.fixture
+def app():
+    # Background tasks are started through the Socket.IO server set up by create_app
+    return create_app()
+
+def test_run_renders_in_background(app, renderer, framebuffer):
+    renderer.frame_interval = 0.001
+    renderer.start()
+    try:
+        framebuffer.set_range(0, 9, 255, 255, 255, 100)
+        deadline = time.monotonic() + 2
+        while renderer.frames == 0 and time.monotonic() < deadline:
+            time.sleep(0.001)
+    finally:
+        renderer.stop()
+
+    assert renderer.frames == 1
+    assert renderer.strip.show.call_count == 1
+
+def test_failing_source_does_not_stop_the_frame(renderer, framebuffer):
+    renderer.sources.append(Mock(side_effect=RuntimeError("broken")))
+    renderer.sources.append(lambda: framebuffer.set_range(0, 0, 255, 0, 0, 100))
+
+    assert renderer.render_frame() == [(0, 0)]
+    assert renderer.strip.show.call_count == 1
+
+def test_run_survives_failed_frames(app, renderer, framebuffer):
+    renderer.frame_interval = 0.001
+    renderer.strip.show.side_effect = [RuntimeError("strip unplugged"), None]
+    renderer.start()
+    try:
+        framebuffer.set_range(0, 0, 255, 0, 0, 100)
+        deadline = time.monotonic() + 2
+        while renderer.strip.show.call_count < 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        framebuffer.set_range(1, 1, 255, 0, 0, 100)
+        while renderer.frames == 0 and time.monotonic() < deadline:
+            time.sleep(0.001)
+    finally:
+        renderer.stop()
+
+    assert renderer.strip.show.call_count == 2
+    assert renderer.frames == 1
@@ -0,0 +1,204 @@
+import multiprocessing
+import pytest
+from unittest.mock import Mock, call
+from ...src import create_app, db
+from ...src.models import Entity, Address, LightState
+from ...src.shared_framebuffer import SharedFrameBuffer
+from ...src.renderer import Renderer
+from ...src.endpoints.color import paintEntity, showFrame
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'framebuffer.shm')
+
+def write_ranges(path, first, count):
+    framebuffer = SharedFrameBuffer(path, 100)
+    for pixel in range(first, first + count):
+        framebuffer.set_range(pixel, pixel, pixel, 0, 0, 100)
+    framebuffer.close()
+
+def test_writes_are_seen_by_other_handles(path):
+    writer = SharedFrameBuffer(path, 10)
+    reader = SharedFrameBuffer(path, 10)
+    writer.set_range(2, 3, 255, 0, 0, 100)
+
+    assert reader.get_pixel(3) == {'red': 255, 'green': 0, 'blue': 0, 'brightness': 100}
+    assert reader.snapshot() == writer.snapshot()
+    assert reader.take_dirty() == [(2, 3)]
+    assert writer.take_dirty() == []
+    assert writer.take_dirty('persist') == [(2, 3)]
+
+def test_sequence_is_even_between_writes(path):
+    framebuffer = SharedFrameBuffer(path, 10)
+    before = framebuffer.sequence()
+    framebuffer.set_range(0, 0, 1, 1, 1, 100)
+    assert framebuffer.sequence() > before
+    assert framebuffer.sequence() % 2 == 0
+
+def test_dirty_overflow_marks_everything(path):
+    framebuffer = SharedFrameBuffer(path, 10, capacity=2)
+    for pixel in (0, 4, 8):
+        framebuffer.set_range(pixel, pixel, 1, 1, 1, 100)
+    assert framebuffer.take_dirty() == [(0, 9)]
+    assert framebuffer.take_dirty() == []
+
+def test_counters(path):
+    first = SharedFrameBuffer(path, 10)
+    second = SharedFrameBuffer(path, 10)
+    assert first.bump('states') == 1
+    assert second.counter('states') == 1
+    assert second.counter('entities') == 0
+
+def test_other_layout_starts_blank(path):
+    SharedFrameBuffer(path, 10).set_range(0, 9, 1, 1, 1, 100)
+    framebuffer = SharedFrameBuffer(path, 20)
+    assert framebuffer.get_pixel(0)['red'] == 0
+    assert framebuffer.take_dirty() == []
+
+def test_processes_write_concurrently(path):
+    SharedFrameBuffer(path, 100)
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=write_ranges, args=(path, first, 25)) for first in range(0, 100, 25)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    framebuffer = SharedFrameBuffer(path, 100)
+    assert [framebuffer.get_pixel(pixel)['red'] for pixel in range(100)] == list(range(100))
+    assert framebuffer.take_dirty() == [(0, 99)]
+
+def test_shared_buffer_cannot_be_swapped(path):
+    from ...src.framebuffer import FrameBuffer
+    with pytest.raises(TypeError):
+        SharedFrameBuffer(path, 10).swap(FrameBuffer(10))
+
+def test_renderer_copies_from_shared_buffer(path):
+    writer = SharedFrameBuffer(path, 10)
+    renderer = Renderer(Mock(), SharedFrameBuffer(path, 10))
+    writer.set_range(1, 2, 0, 255, 0, 100)
+
+    assert renderer.render_frame() == [(1, 2)]
+    assert renderer.strip.mock_calls == [call.setPixelColor(1, 0x00FF00), call.setPixelColor(2, 0x00FF00), call.show()]
+
+    # Idle frames are skipped without taking the lock
+    sequence = writer.sequence()
+    assert renderer.render_frame() == []
+    assert writer.sequence() == sequence
+
+    writer.set_range(5, 5, 0, 0, 255, 100)
+    assert renderer.render_frame() == [(5, 5)]
+
+@pytest.fixture
+def app(path):
+    app = create_app({'FRAMEBUFFER_SHARED': path})
+    with app.app_context():
+        db.create_all()
+        app.strip = Mock()
+        db.session.add(Entity(id=1, name="World Map", start_addr=0, end_addr=99, parent_id=None))
+        db.session.add(Entity(id=2, name="South America", start_addr=0, end_addr=7, parent_id=1))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def test_show_frame_leaves_rendering_to_renderer_process(app):
+    with app.app_context():
+        paintEntity(db.session.get(Entity, 2), 255, 0, 0, 100, True)
+        showFrame(app.strip)
+        app.strip.show.assert_not_called()
+        assert Address.query.count() == 0
+        assert app.framebuffer.take_dirty() == [(0, 7)]
+
+def test_layers_follow_states_set_by_other_processes(app, path):
+    with app.app_context():
+        db.session.add(Entity(id=3, name="Equator", start_addr=5, end_addr=12, parent_id=None))
+        db.session.commit()
+        paintEntity(db.session.get(Entity, 1), 0, 0, 255, 100, True)
+
+        # Another process records a state for the child and bumps the generation
+        db.session.add(LightState(entity_id=2, red=255, green=0, blue=0, brightness=100, is_on=True))
+        db.session.commit()
+        SharedFrameBuffer(path, len(app.framebuffer)).bump('states')
+
+        # Recomposing an overlapping entity shows the child's color from the other process
+        paintEntity(db.session.get(Entity, 3), 0, 255, 0, 100, True)
+        assert app.framebuffer.get_pixel(7) == {'red': 255, 'green': 0, 'blue': 0, 'brightness': 100}
+        assert app.framebuffer.get_pixel(8)['green'] == 255
+
+def test_entity_changes_reach_other_processes(app, path):
+    from ...src.entity_index import entity_index
+    with app.app_context():
+        assert entity_index.get(3) is None
+
+        # Another process commits a new entity and bumps the generation
+        db.session.execute(Entity.__table__.insert().values(id=3, name="Africa", start_addr=30, end_addr=40, parent_id=1))
+        db.session.commit()
+        SharedFrameBuffer(path, len(app.framebuffer)).bump('entities')
+
+        assert entity_index.get(3).name == "Africa"
+
+def test_own_entity_commits_do_not_reload(app, path):
+    from unittest.mock import patch
+    from ...src.entity_index import entity_index
+    with app.app_context():
+        entity_index.get(1)
+        db.session.add(Entity(id=3, name="Africa", start_addr=30, end_addr=40, parent_id=1))
+        db.session.commit()
+
+        with patch.object(entity_index, 'load', wraps=entity_index.load) as load:
+            assert entity_index.get(3).name == "Africa"
+            load.assert_not_called()
+
+        # A change from another process in between is still picked up
+        db.session.execute(Entity.__table__.insert().values(id=4, name="Asia", start_addr=50, end_addr=60, parent_id=1))
+        SharedFrameBuffer(path, len(app.framebuffer)).bump('entities')
+        db.session.add(Entity(id=5, name="Europe", start_addr=70, end_addr=80, parent_id=1))
+        db.session.commit()
+        assert entity_index.get(4).name == "Asia"
+
+def test_painting_and_entity_commits_do_not_deadlock(app):
+    import sys
+    import threading
+    import time
+    from ...src.entity_index import entity_index
+    with app.app_context():
+        entity = entity_index.get(2)
+    deadline = time.monotonic() + 0.5
+    errors = []
+
+    def paint():
+        with app.app_context():
+            index = 0
+            while time.monotonic() < deadline:
+                try:
+                    paintEntity(entity, index % 256, 0, 0, 100, True)
+                except Exception as e:
+                    errors.append(e)
+                index += 1
+
+    def commit():
+        with app.app_context():
+            index = 0
+            while time.monotonic() < deadline:
+                try:
+                    db.session.get(Entity, 1).name = "World Map " + str(index)
+                    db.session.commit()
+                except Exception as e:
+                    errors.append(e)
+                index += 1
+
+    # Switch threads as often as possible so the painter and the committer interleave inside their locks
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=paint, daemon=True), threading.Thread(target=commit, daemon=True)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+    finally:
+        sys.setswitchinterval(interval)
+    assert not any(thread.is_alive() for thread in threads)
+    assert errors == []
@@ -0,0 +1,83 @@
+import os
+import pytest
+from ...src import create_app, db
+from ...src.framebuffer import FrameBuffer
+from ...src.models import Address
+from ...src.snapshot import FramebufferSnapshot
+from ...src.endpoints.color import saveStateToDatabase
+from ...src.util.restore_framebuffer import restore_framebuffer
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'FRAMEBUFFER_SNAPSHOT': str(tmp_path / 'framebuffer.snapshot')})
+    with app.app_context():
+        db.create_all()
+    yield app
+    app.snapshot.close()
+    with app.app_context():
+        db.drop_all()
+
+def test_snapshot_round_trip(tmp_path):
+    framebuffer = FrameBuffer(10)
+    framebuffer.set_range(2, 3, 255, 0, 0, 100)
+    snapshot = FramebufferSnapshot(str(tmp_path / 'snapshot'), 10)
+    assert not snapshot.valid()
+    snapshot.save(framebuffer, framebuffer.take_dirty())
+    snapshot.close()
+
+    restored = FrameBuffer(10)
+    assert FramebufferSnapshot(str(tmp_path / 'snapshot'), 10).load(restored)
+    assert restored.snapshot() == framebuffer.snapshot()
+
+def test_snapshot_saves_only_changed_ranges(tmp_path):
+    framebuffer = FrameBuffer(10)
+    snapshot = FramebufferSnapshot(str(tmp_path / 'snapshot'), 10)
+    snapshot.save(framebuffer, [])
+
+    # Changes outside the saved ranges are not copied
+    framebuffer.set_range(0, 0, 1, 1, 1, 100)
+    framebuffer.set_range(5, 5, 2, 2, 2, 100)
+    snapshot.save(framebuffer, [(5, 5)])
+
+    restored = FrameBuffer(10)
+    snapshot.load(restored)
+    assert restored.get_pixel(0)['red'] == 0
+    assert restored.get_pixel(5)['red'] == 2
+
+def test_snapshot_of_other_length_is_ignored(tmp_path):
+    framebuffer = FrameBuffer(10)
+    snapshot = FramebufferSnapshot(str(tmp_path / 'snapshot'), 10)
+    snapshot.save(framebuffer, [(0, 9)])
+    snapshot.close()
+
+    assert not FramebufferSnapshot(str(tmp_path / 'snapshot'), 20).load(FrameBuffer(20))
+
+def test_restore_from_snapshot(app):
+    with app.app_context():
+        app.framebuffer.set_range(0, 9, 10, 20, 30, 40)
+        saveStateToDatabase()
+        assert os.path.exists(app.snapshot.path)
+
+        framebuffer = FrameBuffer(len(app.framebuffer))
+        assert restore_framebuffer(framebuffer, app.snapshot) == 'snapshot'
+        assert framebuffer.snapshot() == app.framebuffer.snapshot()
+
+        # The whole strip is rendered in one frame, but not saved again
+        assert framebuffer.take_dirty() == [(0, len(framebuffer) - 1)]
+        assert framebuffer.take_dirty('persist') == []
+
+def test_restore_falls_back_to_database(app):
+    with app.app_context():
+        db.session.add(Address(id=4, red=1, green=2, blue=3, brightness=50))
+        db.session.commit()
+
+        framebuffer = FrameBuffer(len(app.framebuffer))
+        assert restore_framebuffer(framebuffer, app.snapshot) == 'database'
+        assert framebuffer.get_pixel(4) == {'red': 1, 'green': 2, 'blue': 3, 'brightness': 50}
+        assert framebuffer.get_pixel(3)['red'] == 0
+
+def test_restore_with_nothing_saved(app):
+    with app.app_context():
+        framebuffer = FrameBuffer(len(app.framebuffer))
+        assert restore_framebuffer(framebuffer, app.snapshot) is None
+        assert framebuffer.take_dirty() == []
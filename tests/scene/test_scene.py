@@ -0,0 +1,102 @@
+import pytest
+import json
+from flask import url_for
+from unittest.mock import Mock
+
+from ...src.database import db
+from ...src import create_app
+from ...src.models import Entity, LightState, Scene
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        app.strip = Mock()
+        app.strip.numPixels.return_value = 100
+
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def init_entities(app):
+    with app.app_context():
+        db.session.add(Entity(id=1, name="South America", start_addr=0, end_addr=7, parent_id=None))
+        db.session.add(Entity(id=2, name="North America", start_addr=8, end_addr=27, parent_id=None))
+        db.session.commit()
+
+def set_colors(client, colors):
+    return client.post(url_for('color.set_colors'), data=json.dumps({'colors': colors}), content_type='application/json')
+
+def test_capture_and_list_scene(client, app, init_entities):
+    with app.app_context():
+        set_colors(client, [{'entity': 1, 'red': 255, 'green': 0, 'blue': 0, 'brightness': 100, 'is_on': True}])
+
+        response = client.post(url_for('scene.manage_scene'), data=json.dumps({'name': 'Red'}), content_type='application/json')
+        assert response.status_code == 201
+        scene = db.session.get(Scene, response.json['id'])
+        assert scene.entity_states == [{'entity_id': 1, 'is_on': True, 'red': 255, 'green': 0, 'blue': 0, 'brightness': 100}]
+        # Runs of equal pixels compress far below four bytes per pixel
+        assert len(scene.frame) < 100
+
+        response = client.get(url_for('scene.manage_scene'))
+        assert response.status_code == 200
+        assert [scene['name'] for scene in response.json] == ['Red']
+
+def test_capture_scene_missing_name(client, app):
+    with app.app_context():
+        response = client.post(url_for('scene.manage_scene'), data=json.dumps({}), content_type='application/json')
+        assert response.status_code == 400
+
+def test_apply_scene(client, app, init_entities):
+    with app.app_context():
+        set_colors(client, [
+            {'entity': 1, 'red': 255, 'green': 0, 'blue': 0, 'brightness': 100, 'is_on': True},
+            {'entity': 2, 'red': 0, 'green': 0, 'blue': 255, 'brightness': 50, 'is_on': True}
+        ])
+        scene_id = client.post(url_for('scene.manage_scene'), data=json.dumps({'name': 'Look'}), content_type='application/json').json['id']
+
+        set_colors(client, [{'entity': 1, 'red': 0, 'green': 255, 'blue': 0, 'brightness': 100, 'is_on': True}])
+        app.strip.reset_mock()
+        history = LightState.query.count()
+
+        response = client.post(url_for('scene.apply_scene_endpoint'), data=json.dumps({'id': scene_id}), content_type='application/json')
+        assert response.status_code == 200
+        assert response.json['updated'] == [1]
+
+        # One frame, one new history row for the entity that changed
+        assert app.strip.show.call_count == 1
+        assert LightState.query.count() == history + 1
+        assert app.framebuffer.get_pixel(0) == {'red': 255, 'green': 0, 'blue': 0, 'brightness': 100}
+        assert app.framebuffer.get_pixel(8) == {'red': 0, 'green': 0, 'blue': 255, 'brightness': 50}
+
+def test_apply_scene_stops_effects(client, app, init_entities):
+    from ...src.effects import Breathe
+    with app.app_context():
+        set_colors(client, [{'entity': 1, 'red': 255, 'green': 0, 'blue': 0, 'brightness': 100, 'is_on': True}])
+        scene_id = client.post(url_for('scene.manage_scene'), data=json.dumps({'name': 'Red'}), content_type='application/json').json['id']
+
+        app.effects.start(1, Breathe(period=2.0, red=0, green=255, blue=0), now=0)
+        app.effects.tick(now=1.0)
+        client.post(url_for('scene.apply_scene_endpoint'), data=json.dumps({'id': scene_id}), content_type='application/json')
+
+        # The next frame leaves the scene in place
+        assert app.effects.tick(now=2.0) == 0
+        assert app.framebuffer.get_pixel(0) == {'red': 255, 'green': 0, 'blue': 0, 'brightness': 100}
+
+def test_apply_scene_not_found(client, app):
+    with app.app_context():
+        response = client.post(url_for('scene.apply_scene_endpoint'), data=json.dumps({'id': 999}), content_type='application/json')
+        assert response.status_code == 404
+
+def test_delete_scene(client, app):
+    with app.app_context():
+        scene_id = client.post(url_for('scene.manage_scene'), data=json.dumps({'name': 'Dark'}), content_type='application/json').json['id']
+        response = client.delete(url_for('scene.manage_scene'), data=json.dumps({'id': scene_id}), content_type='application/json')
+        assert response.status_code == 200
+        assert Scene.query.count() == 0
@@ -0,0 +1,80 @@
+import pytest
+from datetime import datetime, timedelta
+from ...src import create_app, db
+from ...src.models import Entity, LightState, CurrentLightState
+from ...src.util.compact_light_state_history import compact_light_state_history
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(
+        LIGHT_STATE_MAX_AGE_DAYS=30,
+        LIGHT_STATE_MAX_ROWS_PER_ENTITY=None,
+        LIGHT_STATE_DOWNSAMPLE_AFTER_DAYS=1,
+        LIGHT_STATE_DOWNSAMPLE_BUCKET_SECONDS=3600
+    )
+    with app.app_context():
+        db.create_all()
+        db.session.add(Entity(id=1, name="Entity1", start_addr=0, end_addr=10))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def add_state(red, age):
+    db.session.add(LightState(entity_id=1, is_on=True, red=red, timestamp=NOW - age))
+    db.session.commit()
+
+def remaining_reds():
+    return sorted(state.red for state in LightState.query.all())
+
+def test_compaction_keeps_recent_history(app):
+    with app.app_context():
+        for red in range(5):
+            add_state(red, timedelta(minutes=50 - red))
+
+        assert compact_light_state_history(NOW) == 0
+        assert remaining_reds() == [0, 1, 2, 3, 4]
+
+def test_compaction_downsamples_old_history(app):
+    with app.app_context():
+        # Three states within one hour two days ago, then one recent state
+        add_state(1, timedelta(days=2, minutes=50))
+        add_state(2, timedelta(days=2, minutes=40))
+        add_state(3, timedelta(days=2, minutes=30))
+        add_state(4, timedelta(minutes=5))
+
+        assert compact_light_state_history(NOW) == 2
+        db.session.commit()
+        assert remaining_reds() == [3, 4]
+
+def test_compaction_deletes_expired_history(app):
+    with app.app_context():
+        add_state(1, timedelta(days=40))
+        add_state(2, timedelta(days=10))
+
+        compact_light_state_history(NOW)
+        db.session.commit()
+        assert remaining_reds() == [2]
+
+def test_compaction_keeps_current_state(app):
+    with app.app_context():
+        add_state(1, timedelta(days=50))
+        add_state(2, timedelta(days=40))
+
+        compact_light_state_history(NOW)
+        db.session.commit()
+        assert remaining_reds() == [2]
+        assert db.session.get(CurrentLightState, 1).red == 2
+
+def test_compaction_caps_rows_per_entity(app):
+    app.config['LIGHT_STATE_MAX_ROWS_PER_ENTITY'] = 2
+    with app.app_context():
+        for red in range(5):
+            add_state(red, timedelta(minutes=50 - red))
+
+        assert compact_light_state_history(NOW) == 3
+        db.session.commit()
+        assert remaining_reds() == [3, 4]
@@ -2,7 +2,7 @@ import pytest
 from ...src import create_app
 from ...src.database import db
 from ...src.models import Entity
-from ...src.util.has_cyclic_relationship import has_cyclic_relationship
+from ...src.util.has_cyclic_relationship import has_cyclic_relationship, find_cyclic_assignments
 
 @pytest.fixture
 def app():
@@ -59,3 +59,32 @@ def test_has_cyclic_relationship_with_none_parent(app, init_entities):
 
         # Test the function with an entity that has a None parent
         assert not has_cyclic_relationship(orphan_entity.id, init_entities[0], is_first_call=True)
+
+def test_has_cyclic_relationship_with_self_parent(app, init_entities):
+    with app.app_context():
+        assert has_cyclic_relationship(init_entities[0], init_entities[0], is_first_call=True)
+
+def test_has_cyclic_relationship_deep_hierarchy(app):
+    with app.app_context():
+        for entity_id in range(1, 2001):
+            db.session.add(Entity(id=entity_id, name="Level", start_addr=1, end_addr=10, parent_id=entity_id - 1 or None))
+        db.session.commit()
+
+        assert has_cyclic_relationship(1, 2000)
+        assert not has_cyclic_relationship(2000, 1999)
+
+def test_find_cyclic_assignments(app, init_entities):
+    with app.app_context():
+        # Entity 4 is its own parent; moving 1 below 3 closes the loop 1 -> 2 -> 3
+        assert find_cyclic_assignments({1: 3, 5: None}) == {1}
+        assert find_cyclic_assignments({4: 1}) == set()
+        assert find_cyclic_assignments({4: 4}) == {4}
+
+def test_find_cyclic_assignments_bulk_import(app, init_entities):
+    with app.app_context():
+        # A new subtree below entity 3, plus a pair of new entities pointing at each other
+        assignments = {entity_id: entity_id - 1 for entity_id in range(11, 1000)}
+        assignments[10] = 3
+        assignments[2000] = 2001
+        assignments[2001] = 2000
+        assert find_cyclic_assignments(assignments) == {2000, 2001}
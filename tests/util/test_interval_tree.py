@@ -0,0 +1,40 @@
+import random
+import pytest
+from ...src.interval_tree import IntervalTree
+
+@pytest.fixture
+def entity_ranges():
+    # Ranges from entities.txt
+    return [(1, 100, 'World Map'), (1, 8, 'South America'), (8, 28, 'North America'), (29, 32, 'Greenland'),
+            (33, 35, 'Europe'), (36, 45, 'Africa'), (46, 80, 'Asia'), (81, 86, 'Australia'), (87, 100, 'Antarctica')]
+
+def test_interval_tree_at(entity_ranges):
+    tree = IntervalTree(entity_ranges)
+    assert sorted(tree.at(8)) == ['North America', 'South America', 'World Map']
+    assert sorted(tree.at(30)) == ['Greenland', 'World Map']
+    assert tree.at(0) == []
+    assert tree.at(101) == []
+
+def test_interval_tree_overlapping(entity_ranges):
+    tree = IntervalTree(entity_ranges)
+    assert sorted(tree.overlapping(30, 34)) == ['Europe', 'Greenland', 'World Map']
+    assert sorted(tree.overlapping(200, 300)) == []
+
+def test_interval_tree_empty():
+    tree = IntervalTree([])
+    assert len(tree) == 0
+    assert tree.at(5) == []
+
+def test_interval_tree_matches_scan():
+    generator = random.Random(7)
+    intervals = []
+    for value in range(300):
+        start = generator.randint(0, 1000)
+        intervals.append((start, start + generator.randint(0, 80), value))
+    tree = IntervalTree(intervals)
+
+    for _ in range(200):
+        start = generator.randint(-10, 1010)
+        end = start + generator.randint(0, 50)
+        expected = sorted(value for interval_start, interval_end, value in intervals if interval_start <= end and interval_end >= start)
+        assert sorted(tree.overlapping(start, end)) == expected
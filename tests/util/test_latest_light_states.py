@@ -0,0 +1,31 @@
+import pytest
+from ...src import create_app, db
+from ...src.models import Entity, LightState
+from ...src.util.latest_light_states import latest_light_states
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def test_latest_light_states(app):
+    with app.app_context():
+        db.session.add(Entity(id=1, name="Entity1", start_addr=0, end_addr=10))
+        db.session.add(Entity(id=2, name="Entity2", start_addr=0, end_addr=10))
+        db.session.add(LightState(entity_id=1, red=1))
+        db.session.add(LightState(entity_id=1, red=2))
+        db.session.add(LightState(entity_id=2, red=3))
+        db.session.commit()
+
+        states = latest_light_states([1, 2, 3])
+        assert set(states) == {1, 2}
+        assert states[1].red == 2
+        assert states[2].red == 3
+
+def test_latest_light_states_empty(app):
+    with app.app_context():
+        assert latest_light_states([]) == {}
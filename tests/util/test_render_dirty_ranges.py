@@ -0,0 +1,35 @@
+import pytest
+from unittest.mock import Mock, call
+from ...src.framebuffer import FrameBuffer
+from ...src.util.render_dirty_ranges import render_dirty_ranges
+
+def test_render_dirty_ranges():
+    mock_strip = Mock()
+    framebuffer = FrameBuffer(10)
+    framebuffer.set_range(2, 3, 0x12, 0x34, 0x56, 100)
+
+    assert render_dirty_ranges(mock_strip, framebuffer) == [(2, 3)]
+    assert mock_strip.mock_calls == [
+        call.setPixelColor(2, 0x123456),
+        call.setPixelColor(3, 0x123456),
+        call.show()
+    ]
+
+def test_render_dirty_ranges_nothing_changed():
+    mock_strip = Mock()
+    framebuffer = FrameBuffer(10)
+
+    assert render_dirty_ranges(mock_strip, framebuffer) == []
+    assert mock_strip.mock_calls == []
+
+@pytest.mark.parametrize('strip_length', [100, 1000, 10000])
+def test_render_dirty_ranges_scales_with_entity_size(strip_length):
+    mock_strip = Mock()
+    framebuffer = FrameBuffer(strip_length)
+
+    # The same 20 pixel entity on strips of different lengths
+    framebuffer.set_range(40, 59, 255, 0, 0, 100)
+    render_dirty_ranges(mock_strip, framebuffer)
+
+    assert mock_strip.setPixelColor.call_count == 20
+    assert mock_strip.show.call_count == 1
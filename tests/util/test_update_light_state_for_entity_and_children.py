@@ -47,4 +47,29 @@ def test_update_light_state_for_entity_and_children(app, init_entity_hierarchy):
         assert child_state.blue == 255
         assert child_state.brightness == int(255/2.55)
 
+def test_update_light_state_skips_unchanged_entities(app, init_entity_hierarchy):
+    with app.app_context():
+        db.session.add(LightState(entity_id=2, is_on=True, red=10, green=20, blue=30, brightness=50))
+        db.session.commit()
+
+        assert update_light_state_for_entity_and_children(1, 10, 20, 30, 50, True) == [1]
+        db.session.commit()
+        assert LightState.query.filter_by(entity_id=2).count() == 1
+
+        assert update_light_state_for_entity_and_children(1, 10, 20, 30, 50, True) == []
+
+def test_update_light_state_for_deep_hierarchy(app):
+    with app.app_context():
+        # Deeper than the default recursion limit
+        depth = 1500
+        for entity_id in range(1, depth + 1):
+            db.session.add(Entity(id=entity_id, name="Level " + str(entity_id), start_addr=0, end_addr=10, parent_id=entity_id - 1 or None))
+        db.session.commit()
+
+        changed = update_light_state_for_entity_and_children(1, 1, 2, 3, 4, True)
+        db.session.commit()
+
+        assert len(changed) == depth
+        assert LightState.query.filter_by(entity_id=depth).one().red == 1
+
 # Replace 'your_application' and 'your_module' with the actual names used in your project.